@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark of the per-turn overhead of the single agent.
+
+Compares the old approach (building the prompt, agent and executor on every turn)
+with the prebuilt executor from ``create_agent()``. The model answers instantly,
+so the timings are pure Python overhead (the prebuilt numbers also include the
+LangGraph invocation around the node).
+
+Usage:
+    python -m benchmarks.agent_overhead --turns 200 --history 0 10 50
+"""
+
+import argparse
+import statistics
+import time
+
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain.agents import AgentExecutor, create_openai_tools_agent
+
+from src.agents.single_agent import create_agent
+from src.tools.search_tools import search_web
+from src.tools.weather_tools import get_current_weather
+from src.tools.math_tools import calculate
+from benchmarks.fake_llm import InstantChatModel
+
+SYSTEM_MESSAGE = SystemMessage(content="You are a helpful AI assistant named LM Studio Agent.")
+
+
+def make_history(turns):
+    """Build a conversation history with the given number of user/assistant turns."""
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"Question number {i}"})
+        messages.append({"role": "assistant", "content": f"Answer number {i}"})
+    return messages
+
+
+def rebuild_per_turn(llm, messages, user_input):
+    """Run one turn the way the agent node used to: rebuild everything first."""
+    formatted_messages = [
+        SystemMessage(content=msg["content"]) if msg["role"] == "system" else
+        HumanMessage(content=msg["content"]) if msg["role"] == "user" else
+        AIMessage(content=msg["content"])
+        for msg in messages
+    ]
+    prompt = ChatPromptTemplate.from_messages([
+        SYSTEM_MESSAGE,
+        *formatted_messages,
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ])
+    tools = [search_web, get_current_weather, calculate]
+    agent = create_openai_tools_agent(llm, tools, prompt)
+    agent_executor = AgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=False,
+        handle_parsing_errors=True,
+        return_intermediate_steps=False
+    )
+    return agent_executor.invoke({"input": user_input})["output"]
+
+
+def time_turns(run_turn, turns):
+    """Time ``turns`` calls of ``run_turn`` and return the per-turn timings in seconds."""
+    timings = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        run_turn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200, help="Turns to time per configuration")
+    parser.add_argument("--history", type=int, nargs="+", default=[0, 10, 50],
+                        help="History lengths (in turns) to benchmark")
+    args = parser.parse_args()
+
+    llm = InstantChatModel()
+    agent = create_agent(llm=llm)
+
+    print(f"{'history':>8} {'rebuild (us/turn)':>18} {'prebuilt (us/turn)':>19} {'speedup':>8}")
+    for history_turns in args.history:
+        messages = make_history(history_turns) + [{"role": "user", "content": "Hello"}]
+        state = {"messages": messages, "user_input": "Hello"}
+
+        # Warm up both paths so imports and caches don't skew the first configuration
+        rebuild_per_turn(llm, messages, "Hello")
+        agent.invoke(state)
+
+        rebuild = time_turns(lambda: rebuild_per_turn(llm, messages, "Hello"), args.turns)
+        prebuilt = time_turns(lambda: agent.invoke(state), args.turns)
+
+        rebuild_us = statistics.median(rebuild) * 1e6
+        prebuilt_us = statistics.median(prebuilt) * 1e6
+        print(f"{history_turns:>8} {rebuild_us:>18.0f} {prebuilt_us:>19.0f} {rebuild_us / prebuilt_us:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
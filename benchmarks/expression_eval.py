@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Throughput of the calculate tool's expression engine compared with ``eval``.
+
+Evaluates a set of typical Math Agent expressions many times with plain ``eval``
+(which parses and compiles on every call) and with the whitelisted, compiled
+expressions from ``src/tools/expression.py`` (parsed and checked once, then served
+from the LRU). The "cold" row uses a fresh expression on every call, so it measures
+the cost of parsing and checking.
+
+Usage:
+    python -m benchmarks.expression_eval --repeat 20000
+"""
+
+import argparse
+import time
+
+from src.tools.expression import (MATH_CONSTANTS, MATH_FUNCTIONS, ExpressionError, compile_expression,
+                                  evaluate_batch, evaluate_expression)
+
+EXPRESSIONS = [
+    "25 * 16",
+    "1234 + 5678",
+    "sqrt(144)",
+    "3 * 12",
+    "240 * 15 / 100",
+    "(17 + 3) ** 2 / 4",
+    "sin(pi / 6) + cos(pi / 3)",
+    "log10(1000) * 2.5 - 1",
+]
+
+# Valid but deeply nested expressions, checked against eval before timing
+DEEP_EXPRESSIONS = [
+    "+".join(["1"] * 400),               # A long flat sum is a tree 400 levels deep
+    "-" * 990 + "1",
+    "+".join(["2"] * 300) + " + 2 ** 3",  # Rewritten for the guarded power helper
+    "*".join(["2"] * 300) + " * 2 ** 3",  # Every product rewritten for the guarded helpers
+    "pow(7, 3, 5) + 10 ** 30 * 3 // 7 % 1000",
+]
+
+# Expressions that must be refused (quickly) rather than computed
+REJECTED_EXPRESSIONS = [
+    "*".join(["9 ** 31000"] * 110),
+    "factorial(1000) * " * 20 + "1",
+    "1.5 ** 100000000",
+    "pow(3, 2 ** 5000, 7)",
+]
+
+# calculate_batch expressions, checked row by row against the scalar engine (batch values are floats)
+BATCH_EXPRESSIONS = [
+    ("min(x, 2, 3)", [1, 5, 9]),
+    ("max(x, 2, 3)", [1, 5, 9]),
+    ("gcd(x, 4)", [8, 6, 9]),
+    ("gcd(x, 12, 18)", [8, 6, 9]),
+    ("hypot(x, 4, 12)", [3, 5]),
+]
+
+
+def throughput(fn, expressions, repeat):
+    """Return evaluations per second of ``fn`` over ``repeat`` passes of ``expressions``."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for expression in expressions:
+            fn(expression)
+    return repeat * len(expressions) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20000, help="Passes over the expression set")
+    args = parser.parse_args()
+
+    namespace = {"__builtins__": {}, **MATH_CONSTANTS, **MATH_FUNCTIONS}
+    for expression in EXPRESSIONS + DEEP_EXPRESSIONS:
+        assert abs(eval(expression, namespace) - evaluate_expression(expression)) < 1e-9, expression
+    for expression in REJECTED_EXPRESSIONS:
+        try:
+            evaluate_expression(expression)
+        except ExpressionError:
+            continue
+        raise AssertionError(f"Not refused: {expression[:40]}...")
+    for expression, values in BATCH_EXPRESSIONS:
+        compiled = compile_expression(expression, ("x",))
+        expected = [compiled.evaluate({"x": float(value)}) for value in values]
+        assert list(evaluate_batch(expression, {"x": values})) == expected, expression
+
+    repeated_eval = throughput(lambda source: eval(source, namespace), EXPRESSIONS, args.repeat)
+    repeated_compiled = throughput(evaluate_expression, EXPRESSIONS, args.repeat)
+
+    # Unique expressions defeat the LRU, so every call parses and checks
+    cold_count = min(args.repeat, 2000)
+    cold = [f"{i} * 16 + sqrt({i})" for i in range(cold_count)]
+    compile_expression.cache_clear()
+    cold_eval = throughput(lambda source: eval(source, namespace), cold, 1)
+    cold_compiled = throughput(evaluate_expression, cold, 1)
+
+    print(f"{'workload':<22} {'eval (ops/s)':>14} {'compiled (ops/s)':>17} {'speedup':>8}")
+    print(f"{'repeated expressions':<22} {repeated_eval:>14,.0f} {repeated_compiled:>17,.0f} "
+          f"{repeated_compiled / repeated_eval:>7.1f}x")
+    print(f"{'unique expressions':<22} {cold_eval:>14,.0f} {cold_compiled:>17,.0f} {cold_compiled / cold_eval:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
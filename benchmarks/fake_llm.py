@@ -0,0 +1,29 @@
+"""
+Fake chat model that answers instantly, used to measure the Python overhead around model calls.
+"""
+
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class InstantChatModel(BaseChatModel):
+    """Chat model that returns a fixed reply without doing any work."""
+
+    reply: str = "Hello! How can I help you today?"
+
+    @property
+    def _llm_type(self) -> str:
+        return "instant-fake"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Benchmark of the cost of long histories in the team graph state.
+
+Runs turns through the team with an instant fake model, once with the history held
+as {"role", "content"} dicts (converted to LangChain messages on every turn, as the
+team used to do) and once as typed messages appended by the ``add_messages``
+reducer. Reports CPU time and memory allocated per turn, so only the Python-side
+history handling is measured.
+
+Usage:
+    python -m benchmarks.history_state --history 1000 --turns 50
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.agents.team_agent import create_team
+from benchmarks.fake_llm import InstantChatModel
+
+
+def make_history(turns, typed):
+    """Build a history with the given number of user/assistant turns."""
+    messages = []
+    for i in range(turns):
+        question = f"Question number {i}: what do you think about topic {i}?"
+        answer = f"Answer number {i}: here are a few thoughts about topic {i}."
+        if typed:
+            messages.extend([HumanMessage(content=question), AIMessage(content=answer)])
+        else:
+            messages.extend([{"role": "user", "content": question}, {"role": "assistant", "content": answer}])
+    return messages
+
+
+def run_turns(team, history, turns, typed):
+    """Run ``turns`` turns on top of ``history``; return CPU seconds and bytes allocated per turn."""
+    user_input = "Hello there!"
+    message = HumanMessage(content=user_input) if typed else {"role": "user", "content": user_input}
+    cpu, allocated = [], []
+    for _ in range(turns):
+        state = {"messages": history + [message], "user_input": user_input}
+        tracemalloc.start()
+        start = time.process_time()
+        team.invoke(state)
+        cpu.append(time.process_time() - start)
+        allocated.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return cpu, allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=int, default=1000, help="History length in turns")
+    parser.add_argument("--turns", type=int, default=50, help="Turns to measure per representation")
+    args = parser.parse_args()
+
+    # Greetings take the fast path to the conversation agent, so each turn makes one model call
+    team = create_team(llm=InstantChatModel())
+
+    print(f"History of {args.history} turns, {args.turns} turns measured (tracemalloc adds overhead to both)")
+    print(f"{'history':<16} {'CPU ms/turn':>12} {'peak KiB/turn':>14}")
+    results = {}
+    for name, typed in (("dicts", False), ("typed messages", True)):
+        history = make_history(args.history, typed)
+        run_turns(team, history, 3, typed)  # Warm up
+        cpu, allocated = run_turns(team, history, args.turns, typed)
+        results[name] = statistics.median(cpu)
+        print(f"{name:<16} {results[name] * 1000:>12.2f} {statistics.median(allocated) / 1024:>14.0f}")
+
+    print(f"\nTyped messages are {results['dicts'] / results['typed messages']:.1f}x faster per turn")
+
+
+if __name__ == "__main__":
+    main()
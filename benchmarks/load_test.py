@@ -0,0 +1,451 @@
+#!/usr/bin/env python
+"""
+Load test: simulated users holding multi-turn conversations with the agent team.
+
+Each user holds a conversation of a few turns, pausing between turns for a
+think time drawn from ``--think-dist`` (mean ``--think-time`` seconds). Each
+turn is a math, weather, research or chit-chat query drawn from ``--mix``.
+Follow-up turns often stay on the same topic ("What about Berlin?"). Users
+start spread over ``--ramp-up`` seconds. With ``--duration``, each user starts
+a new conversation when one ends, until the time is up.
+
+Targets:
+
+- in-process (default): the team graph runs in this process behind the same
+  admission limits as ``src.server.app`` (``--max-concurrency`` running,
+  ``--max-queue`` waiting, the rest rejected as busy), against the model stub
+  started in-process unless ``--base-url`` is given
+- ``--url http://host:8000``: a running ``src.server.app``, through ``POST
+  /v1/team/chat`` with one session per conversation
+
+The report gives throughput, latency percentiles per routed agent, error rates
+per query category and a timeline sampled every ``--sample-interval`` seconds:
+requests in flight, backend queue depth (the admission queue in-process,
+``/health`` over HTTP), model stub queue depth (``/stats``, with ``--stub-url``
+over HTTP), and in-process CPU use and resident memory (the in-process stub
+included). Those last figures are the ones to check against the
+``cpus``/``memory`` limits in ``docker-compose.prod.yml``.
+
+Usage:
+    python -m benchmarks.load_test --users 200 --turns 4 --think-time 3 --ramp-up 20
+    python -m benchmarks.load_test --users 300 --duration 120 -o load.json
+    python -m benchmarks.load_test --url http://localhost:8000 --stub-url http://localhost:1234 --users 100
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from src.agents.team_agent import TEAM_MODES
+from src.utils.metrics import LatencyRecorder, format_summary
+
+CATEGORIES = ("math", "weather", "research", "conversation")
+DEFAULT_MIX = "math=0.25,weather=0.25,research=0.3,conversation=0.2"
+THINK_DISTRIBUTIONS = ("exponential", "lognormal", "constant")
+
+# Query templates per category: openers start a topic, follow-ups continue it
+OPENERS = {
+    "math": ["What is {a} * {b}?", "Calculate {a} + {b}", "What is {p}% of {c}?",
+             "What's the square root of {square}?", "If I have {a} boxes of {b} eggs, how many eggs do I have?"],
+    "weather": ["What's the weather like in {city}?", "Is it raining in {city} right now?",
+                "Do I need a jacket in {city} today?", "What's the temperature in {city}?"],
+    "research": ["What's the capital of {country}?", "Who wrote {book}?", "When did {event}?",
+                 "Tell me about the history of {country}"],
+    "conversation": ["Hello, my name is {name}", "How are you doing today?",
+                     "What do you think about pineapple on pizza?", "Tell me a fun fact about yourself"],
+}
+FOLLOW_UPS = {
+    "math": ["And what is that divided by {d}?", "Now multiply that by {d}", "What about {a} * {d}?"],
+    "weather": ["What about {city}?", "And tomorrow?", "Should I bring an umbrella?"],
+    "research": ["Tell me more about that", "What about {country}?", "Why is that important?"],
+    "conversation": ["Thanks, that was helpful!", "Haha, good one", "What else do you like?"],
+}
+SLOTS = {
+    "city": ["Tokyo", "London", "Berlin", "New York", "Paris", "Sydney", "Cairo", "Toronto", "Mumbai", "Lima"],
+    "country": ["France", "Japan", "Australia", "Brazil", "Kenya", "Canada", "Norway", "India"],
+    "book": ["Pride and Prejudice", "Moby Dick", "War and Peace", "Dune", "The Hobbit"],
+    "event": ["the Berlin Wall fall", "the first Moon landing happen", "the Roman Empire end"],
+    "name": ["Sarah", "Ahmed", "Mei", "Lucas", "Priya", "Olu"],
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """``"math=0.3,weather=0.2,..."`` as normalized weights."""
+    weights = {}
+    for part in spec.split(","):
+        category, _, weight = part.partition("=")
+        category = category.strip()
+        if category not in CATEGORIES:
+            raise ValueError(f"Unknown category {category!r}; expected one of {', '.join(CATEGORIES)}")
+        weights[category] = float(weight)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("The query mix needs a positive weight")
+    return {category: weight / total for category, weight in weights.items()}
+
+
+class QueryGenerator:
+    """Draws the turns of one user's conversations from the category mix."""
+
+    def __init__(self, mix: Dict[str, float], rng: random.Random, follow_up: float = 0.5):
+        self.categories = list(mix)
+        self.weights = [mix[category] for category in self.categories]
+        self.rng = rng
+        self.follow_up = follow_up
+
+    def _fill(self, template: str) -> str:
+        rng = self.rng
+        values = {"a": rng.randint(2, 99), "b": rng.randint(2, 99), "c": rng.randint(10, 999),
+                  "d": rng.randint(2, 12), "p": rng.choice([5, 10, 15, 20, 25]), "square": rng.randint(2, 40) ** 2}
+        values.update({slot: rng.choice(options) for slot, options in SLOTS.items()})
+        return template.format(**values)
+
+    def next(self, previous: Optional[str]) -> Tuple[str, str]:
+        """The category and text of the next turn after a turn of category ``previous``."""
+        if previous is not None and self.rng.random() < self.follow_up:
+            return previous, self._fill(self.rng.choice(FOLLOW_UPS[previous]))
+        category = self.rng.choices(self.categories, self.weights)[0]
+        return category, self._fill(self.rng.choice(OPENERS[category]))
+
+
+def think_time(rng: random.Random, distribution: str, mean: float) -> float:
+    if mean <= 0:
+        return 0.0
+    if distribution == "exponential":
+        return rng.expovariate(1 / mean)
+    if distribution == "lognormal":
+        # sigma 1 gives the long tail of users who wander off; mu keeps the mean at ``mean``
+        return rng.lognormvariate(math.log(mean) - 0.5, 1.0)
+    return mean
+
+
+class InProcessTarget:
+    """The team graph in this process, behind the server's admission limits."""
+
+    def __init__(self, graph, max_concurrency: int = 8, max_queue: int = 64, timeout: float = 300.0):
+        self.graph = graph
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.queued = 0
+
+    def new_session(self, session_id: str) -> Dict[str, Any]:
+        return {"messages": []}
+
+    async def turn(self, session: Dict[str, Any], message: str) -> str:
+        """Run one turn; return the agent that answered."""
+        if self._semaphore.locked() and self.queued >= self.max_queue:
+            raise RuntimeError("Busy: the admission queue is full")
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.active += 1
+        try:
+            state = {"messages": session["messages"] + [HumanMessage(content=message)], "user_input": message}
+            result = await asyncio.wait_for(self.graph.ainvoke(state), self.timeout)
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+        session["messages"] = result["messages"]
+        return result["current_agent"]
+
+    async def backend(self) -> Dict[str, Any]:
+        return {"active": self.active, "queued": self.queued}
+
+    async def close(self) -> None:
+        pass
+
+
+class HTTPTarget:
+    """A running ``src.server.app``; conversation state lives in its sessions."""
+
+    def __init__(self, url: str, users: int, timeout: float = 300.0):
+        import httpx
+
+        self.client = httpx.AsyncClient(base_url=url.rstrip("/"), timeout=timeout,
+                                        limits=httpx.Limits(max_connections=users + 8))
+
+    def new_session(self, session_id: str) -> Dict[str, Any]:
+        return {"session_id": session_id}
+
+    async def turn(self, session: Dict[str, Any], message: str) -> str:
+        response = await self.client.post("/v1/team/chat", json={"message": message,
+                                                                   "session_id": session["session_id"]})
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.json().get('error', '')}")
+        return response.json()["agent"]
+
+    async def backend(self) -> Dict[str, Any]:
+        health = (await self.client.get("/health")).json()
+        return {"active": health["active_requests"], "queued": health["queued_requests"]}
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def resident_mb() -> Optional[float]:
+    """Current resident memory of this process (Linux only)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class LoadTest:
+    """Runs the simulated users against a target and samples the load; see the module docstring."""
+
+    def __init__(self, target, users: int = 100, turns: int = 4, mix: Optional[Dict[str, float]] = None,
+                 think_dist: str = "exponential", think_mean: float = 3.0, ramp_up: float = 10.0,
+                 duration: Optional[float] = None, sample_interval: float = 1.0, stub=None,
+                 stub_url: Optional[str] = None, in_process: bool = True, seed: int = 0):
+        self.target = target
+        self.users = users
+        self.turns = turns
+        self.mix = mix or parse_mix(DEFAULT_MIX)
+        self.think_dist = think_dist
+        self.think_mean = think_mean
+        self.ramp_up = ramp_up
+        self.duration = duration
+        self.sample_interval = sample_interval
+        self.stub = stub
+        self.stub_url = stub_url
+        self.in_process = in_process
+        self.seed = seed
+        self.latencies = LatencyRecorder()
+        self.by_agent: Dict[str, LatencyRecorder] = defaultdict(LatencyRecorder)
+        self.turns_by_category: Dict[str, int] = defaultdict(int)
+        self.errors_by_category: Dict[str, int] = defaultdict(int)
+        self.error_messages: Dict[str, int] = defaultdict(int)
+        self.conversations = 0
+        self.in_flight = 0
+        self.timeline: List[Dict[str, Any]] = []
+
+    async def _conversation(self, user: int, number: int, queries: QueryGenerator, rng: random.Random) -> None:
+        session = self.target.new_session(f"load-{self.seed}-{user}-{number}")
+        # Conversation lengths vary around the mean, from one turn to twice the mean
+        turns = rng.randint(1, max(1, 2 * self.turns - 1))
+        category = None
+        for turn in range(turns):
+            if turn:
+                await asyncio.sleep(think_time(rng, self.think_dist, self.think_mean))
+            category, message = queries.next(category)
+            self.turns_by_category[category] += 1
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                agent = await self.target.turn(session, message)
+            except Exception as e:
+                self.errors_by_category[category] += 1
+                self.error_messages[f"{type(e).__name__}: {e}"[:120]] += 1
+                return  # A user who gets an error gives up on the conversation
+            finally:
+                self.in_flight -= 1
+            seconds = time.perf_counter() - started
+            self.latencies.record(seconds)
+            self.by_agent[agent].record(seconds)
+        self.conversations += 1
+
+    async def _user(self, user: int, deadline: Optional[float]) -> None:
+        rng = random.Random(f"{self.seed}-{user}")
+        queries = QueryGenerator(self.mix, rng)
+        await asyncio.sleep(self.ramp_up * user / self.users)
+        number = 0
+        while True:
+            await self._conversation(user, number, queries, rng)
+            number += 1
+            if deadline is None or time.perf_counter() >= deadline:
+                return
+            await asyncio.sleep(think_time(rng, self.think_dist, self.think_mean))
+
+    async def _stub_stats(self) -> Optional[Dict[str, Any]]:
+        if self.stub is not None:
+            return self.stub.stats()
+        if self.stub_url:
+            return (await self.target.client.get(self.stub_url.rstrip("/") + "/stats")).json()
+        return None
+
+    async def _sample(self, started: float) -> None:
+        last_wall, last_cpu, last_count = started, sum(os.times()[:2]), 0
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            now, cpu, count = time.perf_counter(), sum(os.times()[:2]), len(self.latencies)
+            sample: Dict[str, Any] = {
+                "t": round(now - started, 2),
+                "in_flight": self.in_flight,
+                "throughput": round((count - last_count) / (now - last_wall), 2),
+                "errors": sum(self.errors_by_category.values()),
+            }
+            try:
+                sample["backend"] = await self.target.backend()
+                stub = await self._stub_stats()
+                if stub is not None:
+                    sample["stub"] = {"active": stub["active"], "queued": stub["queued"]}
+            except Exception as e:
+                sample["poll_error"] = f"{type(e).__name__}: {e}"
+            if self.in_process:
+                sample["cpu"] = round((cpu - last_cpu) / (now - last_wall), 3)  # Cores in use
+                sample["rss_mb"] = resident_mb()
+            self.timeline.append(sample)
+            last_wall, last_cpu, last_count = now, cpu, count
+            print(f"[{sample['t']:>6.1f}s] {format_summary(self.latencies.summary())}, "
+                  f"{self.in_flight} in flight, backend {sample.get('backend')}, stub {sample.get('stub')}"
+                  + (f", cpu {sample['cpu']:.2f}" if "cpu" in sample else ""))
+
+    async def run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        deadline = started + self.duration if self.duration else None
+        sampler = asyncio.ensure_future(self._sample(started))
+        try:
+            await asyncio.gather(*(self._user(user, deadline) for user in range(self.users)))
+        finally:
+            sampler.cancel()
+            await self.target.close()
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        turns = sum(self.turns_by_category.values())
+        errors = sum(self.errors_by_category.values())
+
+        def series(key: str, field: Optional[str] = None) -> List[float]:
+            values = [sample.get(key) for sample in self.timeline]
+            if field is not None:
+                values = [value.get(field) if isinstance(value, dict) else None for value in values]
+            return [value for value in values if value is not None]
+
+        def peak(key: str, field: Optional[str] = None) -> Optional[float]:
+            values = series(key, field)
+            return max(values) if values else None
+
+        return {
+            "elapsed": round(elapsed, 2),
+            "users": self.users,
+            "conversations": self.conversations,
+            "turns": turns,
+            "errors": errors,
+            "error_rate": errors / turns if turns else 0.0,
+            "overall": self.latencies.summary(elapsed=elapsed),
+            "agents": {agent: recorder.summary(elapsed=elapsed) for agent, recorder in sorted(self.by_agent.items())},
+            "categories": {category: {"turns": self.turns_by_category[category],
+                                      "errors": self.errors_by_category[category],
+                                      "error_rate": self.errors_by_category[category] / self.turns_by_category[category]}
+                           for category in sorted(self.turns_by_category)},
+            "error_messages": dict(sorted(self.error_messages.items(), key=lambda item: -item[1])),
+            "peaks": {
+                "in_flight": peak("in_flight"),
+                "backend_queued": peak("backend", "queued"),
+                "stub_queued": peak("stub", "queued"),
+                "cpu": peak("cpu"),
+                "rss_mb": peak("rss_mb"),
+            },
+            "mean_cpu": sum(series("cpu")) / len(series("cpu")) if series("cpu") else None,
+            "timeline": self.timeline,
+        }
+
+
+def json_safe(value: Any) -> Any:
+    """Replace the NaN of empty summaries with None so the report is valid JSON."""
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [json_safe(item) for item in value]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    overall = report["overall"]
+    print(f"\n{report['users']} users, {report['conversations']} conversations completed, {report['turns']} turns "
+          f"in {report['elapsed']:.1f}s: {overall['throughput']:.2f} turns/s, "
+          f"{report['errors']} errors ({report['error_rate']:.1%})")
+    print(f"{'agent':<14} {'turns':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for agent, summary in list(report["agents"].items()) + [("all", overall)]:
+        print(f"{agent:<14} {summary['count']:>6} {summary['mean_ms']:>6.0f}ms {summary['p50_ms']:>6.0f}ms "
+              f"{summary['p95_ms']:>6.0f}ms {summary['p99_ms']:>6.0f}ms")
+    print(f"{'category':<14} {'turns':>6} {'errors':>7} {'rate':>7}")
+    for category, counts in report["categories"].items():
+        print(f"{category:<14} {counts['turns']:>6} {counts['errors']:>7} {counts['error_rate']:>7.1%}")
+    for message, count in list(report["error_messages"].items())[:5]:
+        print(f"  {count} x {message}")
+    peaks = report["peaks"]
+    print(f"Peaks: {peaks['in_flight']} in flight, backend queue {peaks['backend_queued']}, "
+          f"stub queue {peaks['stub_queued']}")
+    if report["mean_cpu"] is not None:
+        print(f"This process: {report['mean_cpu']:.2f} cores on average, {peaks['cpu']:.2f} at peak, "
+              f"peak resident memory {peaks['rss_mb'] or 0:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100, help="Simulated users")
+    parser.add_argument("--turns", type=int, default=4, help="Mean turns per conversation")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Query category weights")
+    parser.add_argument("--think-dist", choices=THINK_DISTRIBUTIONS, default="exponential",
+                        help="Distribution of the pause between turns")
+    parser.add_argument("--think-time", type=float, default=3.0, help="Mean seconds between turns")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="Seconds over which the users start")
+    parser.add_argument("--duration", type=float, help="Keep users starting new conversations for this long")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between timeline samples")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for queries and think times")
+    parser.add_argument("-o", "--output", help="Write the report and timeline as JSON")
+    parser.add_argument("--url", help="Load a running src.server.app instead of the in-process team")
+    parser.add_argument("--stub-url", help="Model stub to poll for queue depth in --url mode")
+    parser.add_argument("--base-url", help="In-process: use this model endpoint instead of the in-process stub")
+    parser.add_argument("--mode", choices=TEAM_MODES, default="router", help="In-process team mode")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="In-process: turns running at once")
+    parser.add_argument("--max-queue", type=int, default=64, help="In-process: turns waiting before rejection")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds per turn")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Stub seconds before the first token")
+    parser.add_argument("--tps", type=float, default=40.0, help="Stub tokens per second")
+    parser.add_argument("--slots", type=int, default=4, help="Stub concurrent generations")
+    args = parser.parse_args()
+
+    stub = None
+    if args.url:
+        target = HTTPTarget(args.url, args.users, args.timeout)
+        print(f"Load testing {args.url}")
+    else:
+        from src.agents.team_agent import create_team
+        from src.llm.factory import create_llm
+        from src.testing.stub_server import StubServer
+
+        base_url = args.base_url
+        if base_url is None:
+            stub = StubServer(ttft=args.ttft, tps=args.tps, slots=args.slots, seed=args.seed)
+            base_url = stub.start_in_thread()
+        print(f"Load testing the in-process team against {base_url}")
+        llm = create_llm(temperature=0.7, base_url=base_url)
+        target = InProcessTarget(create_team(llm=llm, mode=args.mode), args.max_concurrency, args.max_queue,
+                                 args.timeout)
+
+    load_test = LoadTest(target, users=args.users, turns=args.turns, mix=parse_mix(args.mix),
+                         think_dist=args.think_dist, think_mean=args.think_time, ramp_up=args.ramp_up,
+                         duration=args.duration, sample_interval=args.sample_interval, stub=stub,
+                         stub_url=args.stub_url, in_process=not args.url, seed=args.seed)
+    try:
+        report = asyncio.run(load_test.run())
+    finally:
+        if stub is not None:
+            stub.stop_thread()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(json_safe(report), f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
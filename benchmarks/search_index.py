@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""
+Benchmark of the BM25 search index on a synthetic corpus.
+
+Generates a corpus of documents whose words follow a Zipf distribution (the most
+frequent ranks are the tokenizer's stopwords, as in real text), builds the index,
+then reports the time to open it, the query latency percentiles for top-k queries
+made of words taken from random documents, and the time of an incremental update.
+
+With ``--shards`` the corpus is split over a sharded index that is queried by a
+pool of worker processes; the report then includes each worker's open shards,
+evictions and resident memory.
+
+Usage:
+    python -m benchmarks.search_index --docs 1000000
+    python -m benchmarks.search_index --docs 100000 --queries 2000 --keep /tmp/search_bench
+    python -m benchmarks.search_index --docs 1000000 --shards 8 --workers 4 --max-open-shards 1
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from src.search.index import SearchIndex, build_index
+from src.search.sharded import ShardedSearchIndex, build_sharded_index
+from src.search.segment import STOPWORDS
+
+LETTERS = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+
+
+def make_vocabulary(size, rng):
+    """Stopwords first (the most frequent ranks), then random pronounceable-ish words."""
+    words = sorted(STOPWORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(LETTERS, rng.integers(4, 11)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return np.array(words, dtype=object)
+
+
+def write_corpus(directory, n_docs, vocabulary, rng, chunk=100_000, prefix="docs"):
+    """Write ``n_docs`` synthetic documents as JSONL files of ``chunk`` documents each."""
+    # Zipf-like rank probabilities over the vocabulary
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1) ** 1.05
+    weights /= weights.sum()
+    os.makedirs(directory, exist_ok=True)
+    for first in range(0, n_docs, chunk):
+        count = min(chunk, n_docs - first)
+        lengths = rng.integers(20, 80, count)
+        words = vocabulary[rng.choice(len(vocabulary), int(lengths.sum()), p=weights)]
+        ends = np.cumsum(lengths)
+        with open(os.path.join(directory, f"{prefix}-{first // chunk:05d}.jsonl"), "w", encoding="utf-8") as f:
+            for i, end in enumerate(ends):
+                doc_words = words[end - lengths[i]:end]
+                f.write(json.dumps({"id": f"{prefix}-{first + i}", "title": " ".join(doc_words[:4]),
+                                    "text": " ".join(doc_words)}) + "\n")
+
+
+def make_queries(indexes, n_queries, rng):
+    """Build 1-3 word queries from the words of random documents of the given indexes."""
+    queries = []
+    segments = [segment for index in indexes for segment in index._snapshot.segments]
+    while len(queries) < n_queries:
+        segment = segments[rng.integers(len(segments))]
+        words = [word for word in segment.document(int(rng.integers(segment.n_docs)))["text"].split()
+                 if word not in STOPWORDS]
+        if words:
+            picked = rng.choice(len(words), min(len(words), int(rng.integers(1, 4))), replace=False)
+            queries.append(" ".join(words[i] for i in picked))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=1_000_000, help="Documents in the corpus")
+    parser.add_argument("--vocabulary", type=int, default=200_000, help="Distinct words in the corpus")
+    parser.add_argument("--queries", type=int, default=5000, help="Queries to time")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--keep", help="Directory for the corpus and index (kept afterwards)")
+    parser.add_argument("--shards", type=int, default=0, help="Split the index over this many shards")
+    parser.add_argument("--workers", type=int, help="Worker processes for a sharded index")
+    parser.add_argument("--max-open-shards", type=int, help="Shards each worker keeps open at most")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    workdir = args.keep or tempfile.mkdtemp(prefix="search_bench_")
+    corpus, index_path = os.path.join(workdir, "corpus"), os.path.join(workdir, "index")
+    try:
+        vocabulary = make_vocabulary(args.vocabulary, rng)
+        if os.path.exists(corpus):
+            # Drop the update file of an earlier run kept with --keep
+            for name in os.listdir(corpus):
+                if name.startswith("update-"):
+                    os.remove(os.path.join(corpus, name))
+        else:
+            start = time.perf_counter()
+            write_corpus(corpus, args.docs, vocabulary, rng)
+            print(f"Generated {args.docs} documents in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        if args.shards:
+            index_path += f"-{args.shards}-shards"
+            index = build_sharded_index(corpus, index_path, args.shards)
+            stats = {"documents": index.stats()["documents"], "shards": args.shards}
+        else:
+            index = build_index(corpus, index_path)
+            stats = index.stats()
+        build_seconds = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(directory, name))
+                   for directory, _, names in os.walk(index_path) for name in names)
+        print(f"Built index in {build_seconds:.1f}s ({args.docs / build_seconds:,.0f} docs/s), "
+              f"{size / 2 ** 20:.0f} MiB on disk: {stats}")
+
+        start = time.perf_counter()
+        if args.shards:
+            index = ShardedSearchIndex(index_path, workers=args.workers, max_open_shards=args.max_open_shards)
+            index.warm_up()
+            print(f"Started {index.workers} workers and opened {args.shards} shards in "
+                  f"{(time.perf_counter() - start) * 1000:.0f}ms")
+            sources = [SearchIndex(path) for path in index.shard_paths]
+        else:
+            index = SearchIndex(index_path)
+            print(f"Opened index in {(time.perf_counter() - start) * 1000:.2f}ms")
+            sources = [index]
+
+        queries = make_queries(sources, args.queries, rng)
+        for query in queries[:200]:
+            index.search(query, args.k)  # Warm up the page cache
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, args.k)
+            latencies.append(time.perf_counter() - start)
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+        print(f"Top-{args.k} query latency over {len(queries)} queries: "
+              f"p50 {p50:.3f}ms, p95 {p95:.3f}ms, p99 {p99:.3f}ms")
+        if args.shards:
+            for cache in index.stats().get("worker_caches", []):
+                print(f"  worker {cache['pid']}: {cache['open_shards']} shards open, {cache['opened']} opened, "
+                      f"{cache['evicted']} evicted, {(cache['resident_bytes'] or 0) / 2 ** 20:.0f} MiB resident")
+
+        # Incremental update: one new file of 1,000 documents
+        write_corpus(corpus, 1000, vocabulary, rng, prefix="update")
+        start = time.perf_counter()
+        changes = index.update_from_corpus(corpus)
+        print(f"Incremental update in {(time.perf_counter() - start) * 1000:.0f}ms: {changes}")
+        if args.shards:
+            index.close()
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+"""
+End-to-end benchmark suite for the agent graphs, against the local model stub.
+
+``run`` starts ``src.testing.stub_server`` in-process (or uses ``--base-url``)
+and measures, for the single agent, the router and fused teams, the
+``langsmith_example`` poem chain and the ``main.py`` invocation modes:
+
+- turn latency percentiles, and per-node latency for the graphs
+- Python overhead: turn time outside the chat model calls
+- memory per session: bytes retained by a session's state after some turns
+- throughput and latency with N concurrent sessions (``ainvoke`` on one loop)
+
+Results are written as JSON. ``compare`` checks a result file against a saved
+baseline and exits non-zero if any metric got worse by more than the
+threshold (higher is better for throughput, lower for everything else).
+
+Usage:
+    python -m benchmarks.suite run -o results.json --turns 20 --sessions 1 8 32
+    python -m benchmarks.suite compare baseline.json results.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+
+from benchmarks.team_modes import LABELED_QUERIES
+from src.agents.single_agent import create_agent
+from src.agents.team_agent import create_team
+from src.examples.langsmith_example import create_poem_chain
+from src.llm.factory import create_llm
+from src.testing.stub_server import StubServer
+from src.utils.metrics import LatencyRecorder, percentiles
+
+QUERIES = [query for query, _ in LABELED_QUERIES]
+TOPICS = ["coding", "the sea", "autumn", "coffee", "mountains"]
+
+
+class TimingCollector(BaseCallbackHandler):
+    """Times LangGraph nodes and chat model calls from the callbacks of a run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._starts: Dict[Any, Any] = {}
+        self.nodes: Dict[str, List[float]] = defaultdict(list)
+        self.model_seconds = 0.0
+        self.model_calls = 0
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        # A node's own run carries its name; runs nested inside the node carry it in the metadata too
+        node = (metadata or {}).get("langgraph_node")
+        if node is not None and kwargs.get("name") == node:
+            with self._lock:
+                self._starts[run_id] = (node, time.perf_counter())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        with self._lock:
+            self._starts[run_id] = (None, time.perf_counter())
+
+    def _finish(self, run_id) -> None:
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+            if started is None:
+                return
+            node, start = started
+            seconds = time.perf_counter() - start
+            if node is None:
+                self.model_seconds += seconds
+                self.model_calls += 1
+            else:
+                self.nodes[node].append(seconds)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    """Mean and p50/p95/p99 in milliseconds."""
+    summary = {"mean_ms": sum(seconds) / len(seconds) * 1000 if seconds else 0.0}
+    summary.update({f"{name}_ms": value * 1000 for name, value in percentiles(seconds).items()})
+    return summary
+
+
+def time_turns(run_turn: Callable[[str, Dict[str, Any]], Any], inputs: List[str], turns: int) -> Dict[str, Any]:
+    """Run ``turns`` turns (cycling through ``inputs``) and report latency, overhead and node timings."""
+    run_turn(inputs[0], {})  # Warm up connections and lazily built state
+    collector = TimingCollector()
+    latencies, overheads = [], []
+    for i in range(turns):
+        model_before = collector.model_seconds
+        start = time.perf_counter()
+        run_turn(inputs[i % len(inputs)], {"callbacks": [collector]})
+        seconds = time.perf_counter() - start
+        latencies.append(seconds)
+        overheads.append(seconds - (collector.model_seconds - model_before))
+    result = {
+        "latency": summarize(latencies),
+        "overhead": summarize(overheads),
+        "model_calls_per_turn": collector.model_calls / turns,
+    }
+    if collector.nodes:
+        result["nodes"] = {node: summarize(times) for node, times in sorted(collector.nodes.items())}
+    return result
+
+
+def turn_state(query: str, history: Optional[List[Any]] = None) -> Dict[str, Any]:
+    return {"messages": (history or []) + [HumanMessage(content=query)], "user_input": query}
+
+
+def graph_turn(graph) -> Callable[[str, Dict[str, Any]], Any]:
+    return lambda query, config: graph.invoke(turn_state(query), config)
+
+
+def main_modes(llm) -> Dict[str, Callable[[str, Dict[str, Any]], Any]]:
+    """The chat model invocation methods shown in main.py."""
+
+    async def astream(text, config):
+        async for _ in llm.astream(text, config):
+            pass
+
+    async def astream_events(text, config):
+        async for _ in llm.astream_events(text, config, version="v2"):
+            pass
+
+    return {
+        "invoke_string": lambda text, config: llm.invoke(text, config),
+        "invoke_openai_format": lambda text, config: llm.invoke([{"role": "user", "content": text}], config),
+        "invoke_messages": lambda text, config: llm.invoke([HumanMessage(content=text)], config),
+        "invoke_system_user": lambda text, config: llm.invoke(
+            [SystemMessage(content="Translate the following from English into Italian"), HumanMessage(content=text)],
+            config),
+        "stream": lambda text, config: list(llm.stream(text, config)),
+        "astream": lambda text, config: asyncio.run(astream(text, config)),
+        "astream_events": lambda text, config: asyncio.run(astream_events(text, config)),
+    }
+
+
+def session_memory(graph, sessions: int, turns: int) -> Dict[str, float]:
+    """Bytes retained per session after ``turns`` turns each, measured with tracemalloc."""
+    graph.invoke(turn_state(QUERIES[0]))  # Keep one-time allocations out of the measurement
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        states = []
+        for s in range(sessions):
+            state = turn_state(QUERIES[s % len(QUERIES)])
+            for t in range(turns):
+                state = graph.invoke(state)
+                if t + 1 < turns:
+                    query = QUERIES[(s + t + 1) % len(QUERIES)]
+                    state = turn_state(query, state["messages"])
+            states.append(state)
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return {"bytes_per_session": retained / sessions, "turns_per_session": turns}
+
+
+async def concurrent_sessions(graph, sessions: int, turns: int) -> Dict[str, float]:
+    """Run ``sessions`` conversations of ``turns`` turns at once and report throughput and latency."""
+    recorder = LatencyRecorder()
+
+    async def session(s: int) -> None:
+        history: List[Any] = []
+        for t in range(turns):
+            start = time.perf_counter()
+            state = await graph.ainvoke(turn_state(QUERIES[(s + t) % len(QUERIES)], history))
+            recorder.record(time.perf_counter() - start)
+            history = state["messages"]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(s) for s in range(sessions)))
+    summary = recorder.summary(elapsed=time.perf_counter() - start)
+    return {"throughput": summary["throughput"], **{name: value for name, value in summary.items()
+                                                   if name.endswith("_ms")}}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> Dict[str, Any]:
+    stub = None
+    base_url = args.base_url
+    if base_url is None:
+        stub = StubServer(ttft=args.ttft, tps=args.tps, slots=args.slots)
+        base_url = stub.start_in_thread()
+    print(f"Benchmarking against {base_url}")
+
+    llm = create_llm(temperature=0.0, base_url=base_url, cache=False)
+    graphs = {
+        "single_agent": create_agent(llm=llm),
+        "team_router": create_team(llm=llm, mode="router"),
+        "team_fused": create_team(llm=llm, mode="fused"),
+    }
+    results: Dict[str, Any] = {"scenarios": {}, "memory": {}, "concurrency": {}}
+    try:
+        for name, graph in graphs.items():
+            results["scenarios"][name] = time_turns(graph_turn(graph), QUERIES, args.turns)
+            print(f"{name}: {json.dumps(results['scenarios'][name]['latency'])}")
+
+        chain = RunnableLambda(create_poem_chain(llm))
+        results["scenarios"]["langsmith_chain"] = time_turns(chain.invoke, TOPICS, args.turns)
+        for mode, run_turn in main_modes(llm).items():
+            results["scenarios"][f"main.{mode}"] = time_turns(run_turn, ["Say hello in English"], args.turns)
+        print("langsmith_chain and main.py modes done")
+
+        for name in ("single_agent", "team_router"):
+            results["memory"][name] = session_memory(graphs[name], args.memory_sessions, args.memory_turns)
+            print(f"{name}: {results['memory'][name]['bytes_per_session'] / 1024:.1f} KiB per session")
+
+        for sessions in args.sessions:
+            stats = asyncio.run(concurrent_sessions(graphs["team_router"], sessions, args.session_turns))
+            results["concurrency"][f"team_router.sessions_{sessions}"] = stats
+            print(f"team_router with {sessions} sessions: {stats['throughput']:.1f} turns/s, "
+                  f"p95 {stats['p95_ms']:.0f}ms")
+    finally:
+        if stub is not None:
+            results["stub"] = stub.stats()
+            stub.stop_thread()
+
+    results["meta"] = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "base_url": args.base_url or "in-process stub",
+        "stub": {"ttft": args.ttft, "tps": args.tps, "slots": args.slots},
+        "turns": args.turns,
+    }
+    return results
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Numeric benchmark metrics as ``{"scenarios.team_router.latency.p95_ms": ...}``."""
+    flat = {}
+    for key, value in results.items():
+        if key in ("meta", "stub"):
+            continue
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Per-metric relative changes; ``regression`` marks metrics worse by more than ``threshold``."""
+    old, new = flatten(baseline), flatten(current)
+    changes = []
+    for key in sorted(old.keys() & new.keys()):
+        if key.endswith(("model_calls_per_turn", "turns_per_session")) or old[key] == 0:
+            continue
+        change = (new[key] - old[key]) / abs(old[key])
+        worse = -change if key.endswith("throughput") else change
+        changes.append({"metric": key, "baseline": old[key], "current": new[key], "change": change,
+                        "regression": worse > threshold, "improvement": worse < -threshold})
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the suite and write the results as JSON")
+    run_parser.add_argument("-o", "--output", default="benchmark_results.json", help="Where to write the results")
+    run_parser.add_argument("--base-url", help="Use this endpoint instead of starting the stub in-process")
+    run_parser.add_argument("--ttft", type=float, default=0.02, help="Stub seconds before the first token")
+    run_parser.add_argument("--tps", type=float, default=500.0, help="Stub tokens per second")
+    run_parser.add_argument("--slots", type=int, default=8, help="Stub concurrent generations")
+    run_parser.add_argument("--turns", type=int, default=20, help="Timed turns per scenario")
+    run_parser.add_argument("--memory-sessions", type=int, default=20, help="Sessions for the memory measurement")
+    run_parser.add_argument("--memory-turns", type=int, default=3, help="Turns per session for the memory measurement")
+    run_parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32],
+                            help="Concurrent session counts for the throughput measurement")
+    run_parser.add_argument("--session-turns", type=int, default=3, help="Turns per concurrent session")
+    run_parser.add_argument("--baseline", help="Compare against this baseline after the run")
+    run_parser.add_argument("--threshold", type=float, default=0.15, help="Relative change counted as a regression")
+
+    compare_parser = subparsers.add_parser("compare", help="Flag regressions against a saved baseline")
+    compare_parser.add_argument("baseline", help="Baseline results JSON")
+    compare_parser.add_argument("current", help="Results JSON to check")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="Relative change counted as a regression")
+    compare_parser.add_argument("--all", action="store_true", help="Show every metric, not only the changed ones")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run(args)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+        if not args.baseline:
+            return
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        current, show_all = results, False
+    else:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+        show_all = args.all
+
+    changes = compare(baseline, current, args.threshold)
+    regressions = [change for change in changes if change["regression"]]
+    print(f"{'metric':<60} {'baseline':>12} {'current':>12} {'change':>8}")
+    for change in changes:
+        if show_all or change["regression"] or change["improvement"]:
+            flag = "REGRESSION" if change["regression"] else "improved" if change["improvement"] else ""
+            print(f"{change['metric']:<60} {change['baseline']:>12.2f} {change['current']:>12.2f} "
+                  f"{change['change']:>+8.1%} {flag}")
+    print(f"{len(regressions)} regressions, {sum(c['improvement'] for c in changes)} improvements "
+          f"out of {len(changes)} metrics (threshold {args.threshold:.0%})")
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
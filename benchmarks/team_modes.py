@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Compare the two-hop router team with the fused single-call team.
+
+Runs a labeled set of queries through both team modes against an OpenAI-compatible
+endpoint (LM Studio by default) and reports latency, LLM calls per query and routing
+accuracy. Routing accuracy needs a real model behind the endpoint.
+
+Usage:
+    python -m benchmarks.team_modes --base-url http://localhost:1234/v1 --repeat 3
+"""
+
+import argparse
+import statistics
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.agents.team_agent import create_team
+from src.llm.factory import create_llm
+
+# Queries labeled with the agent that should handle them
+LABELED_QUERIES = [
+    ("Hello, my name is Sarah", "conversation"),
+    ("How are you doing today?", "conversation"),
+    ("What do you think about pineapple on pizza?", "conversation"),
+    ("Tell me a fun fact about yourself", "conversation"),
+    ("Thanks, that was helpful!", "conversation"),
+    ("What's the capital of France?", "research"),
+    ("Who wrote Pride and Prejudice?", "research"),
+    ("What is the capital of Australia?", "research"),
+    ("When did the Berlin Wall fall?", "research"),
+    ("What's the capital of Japan?", "research"),
+    ("Calculate 25 * 16", "math"),
+    ("What is 1234 + 5678?", "math"),
+    ("What's the square root of 144?", "math"),
+    ("If I have 3 boxes of 12 eggs, how many eggs do I have?", "math"),
+    ("What is 15% of 240?", "math"),
+    ("What's the weather like in Tokyo?", "weather"),
+    ("Is it raining in London right now?", "weather"),
+    ("Do I need a jacket in Berlin today?", "weather"),
+    ("What's the temperature in New York?", "weather"),
+    ("How's the weather in Paris?", "weather"),
+]
+
+
+class LLMCallCounter(BaseCallbackHandler):
+    """Count chat model calls made during a run."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+
+
+def run_mode(team, repeat):
+    """Run every labeled query through a team and collect latency, calls and accuracy."""
+    latencies, calls, correct, errors = [], [], 0, 0
+    for _ in range(repeat):
+        for query, expected in LABELED_QUERIES:
+            counter = LLMCallCounter()
+            state = {"messages": [{"role": "user", "content": query}], "user_input": query}
+            start = time.perf_counter()
+            try:
+                result = team.invoke(state, config={"callbacks": [counter]})
+            except Exception as e:
+                errors += 1
+                print(f"  error on {query!r}: {e}")
+                continue
+            latencies.append(time.perf_counter() - start)
+            calls.append(counter.calls)
+            correct += result["current_agent"] == expected
+    return latencies, calls, correct, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="OpenAI-compatible endpoint (default: LOCAL_MODEL_BASE_URL or LM Studio)")
+    parser.add_argument("--model", help="Model name to request (default: LOCAL_MODEL_NAME or local-model)")
+    parser.add_argument("--repeat", type=int, default=1, help="How many times to run the query set")
+    parser.add_argument("--fast-routing", action="store_true",
+                        help="Also benchmark the router team with the fast-path router enabled")
+    args = parser.parse_args()
+
+    llm = create_llm(temperature=0.7, base_url=args.base_url, model_name=args.model)
+
+    teams = [
+        ("router (two-hop)", create_team(llm=llm, fast_routing=False)),
+        ("fused (single call)", create_team(llm=llm, mode="fused")),
+    ]
+    if args.fast_routing:
+        teams.insert(1, ("router + fast path", create_team(llm=llm)))
+
+    print(f"{'mode':<22} {'p50 (s)':>8} {'mean (s)':>9} {'calls/query':>12} {'accuracy':>9} {'errors':>7}")
+    for name, team in teams:
+        latencies, calls, correct, errors = run_mode(team, args.repeat)
+        total = len(LABELED_QUERIES) * args.repeat
+        if not latencies:
+            print(f"{name:<22} {'-':>8} {'-':>9} {'-':>12} {'-':>9} {errors:>7}")
+            continue
+        print(f"{name:<22} {statistics.median(latencies):>8.2f} {statistics.mean(latencies):>9.2f} "
+              f"{statistics.mean(calls):>12.2f} {correct / total:>9.0%} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,10 @@ if [ -z "$LANGSMITH_API_KEY" ]; then
   echo "Warning: LANGSMITH_API_KEY is not set. LangSmith tracing will not work."
 fi
 
-# Run the specified command or default to chat_model_example.py
+# Run the specified command or default to the HTTP server
 if [ $# -eq 0 ]; then
-  echo "Running default application (chat_model_example.py)"
-  exec python -m src.examples.chat_model_example
+  echo "Running default application (HTTP server on port 8000)"
+  exec python -m src.server.app
 else
   echo "Running command: $@"
   exec "$@"
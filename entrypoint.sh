@@ -6,10 +6,10 @@ if [ -z "$LANGSMITH_API_KEY" ]; then
   echo "Warning: LANGSMITH_API_KEY is not set. LangSmith tracing will not work."
 fi
 
-# Run the specified command or default to main.py
+# Run the specified command or default to the HTTP server
 if [ $# -eq 0 ]; then
-  echo "Running default application (main.py)"
-  exec python main.py
+  echo "Running default application (HTTP server on port 8000)"
+  exec python -m src.server.app
 else
   echo "Running command: $@"
   exec "$@"
@@ -94,35 +94,35 @@ def create_agent():
         "their name and asking how you can help them. Do not use tools for personal introductions."
     ))
 
+    # Create the prompt skeleton once; the history is filled in on every turn
+    prompt = ChatPromptTemplate.from_messages([
+        system_message,
+        MessagesPlaceholder(variable_name="chat_history"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ])
+
+    # Create the agent (this serializes the tool schemas once)
+    agent = create_openai_tools_agent(llm, tools, prompt)
+
+    # Create the agent executor (without memory since we're handling it in the graph)
+    agent_executor = AgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=False,  # Set to False to avoid duplicate output
+        handle_parsing_errors=True,
+        return_intermediate_steps=False
+    )
+
     # Define the agent node function
     def agent_node(state: AgentState) -> dict:
-        # Extract messages from state
-        messages = state["messages"]
-
-        # Create the prompt with the current messages
-        prompt = ChatPromptTemplate.from_messages([
-            system_message,
-            *messages,
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
-
-        # Create the agent
-        agent = create_openai_tools_agent(llm, tools, prompt)
-
-        # Create the agent executor (without memory since we're handling it in the graph)
-        agent_executor = AgentExecutor(
-            agent=agent,
-            tools=tools,
-            verbose=False,  # Set to False to avoid duplicate output
-            handle_parsing_errors=True,
-            return_intermediate_steps=False
-        )
-
         # Get the user's last message
         user_message = state["user_input"]
 
-        # Run the agent
-        response = agent_executor.invoke({"input": user_message})
+        # Run the agent with the conversation history
+        response = agent_executor.invoke({
+            "input": user_message,
+            "chat_history": state["messages"],
+        })
 
         # Update the state with the agent's response
         return {"agent_output": response["output"]}
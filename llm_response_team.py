@@ -66,16 +66,58 @@ def calculate(expression: str) -> str:
     except Exception as e:
         return f"Error calculating {expression}: {str(e)}"
 
-def create_team():
-    """Create a team of agents with the local LM Studio model using LangGraph for orchestration."""
+def create_specialist(llm, system_message: SystemMessage, tools: List[Any]) -> AgentExecutor:
+    """Build a tool-using specialist pipeline (prompt, agent and executor) once.
+
+    The returned executor keeps no per-call state, so one instance can be shared
+    across turns and across concurrent sessions; the history is passed in through
+    the ``chat_history`` placeholder on every call.
+    """
+
+    # Create the prompt skeleton for the specialist
+    prompt = ChatPromptTemplate.from_messages([
+        system_message,
+        MessagesPlaceholder(variable_name="chat_history"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ])
+
+    # Create the agent (this serializes the tool schemas once)
+    agent = create_openai_tools_agent(llm, tools, prompt)
+
+    # Create the agent executor
+    return AgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=False,
+        handle_parsing_errors=True,
+        return_intermediate_steps=False
+    )
+
+def format_history(messages: List[Dict[str, Any]]) -> List[Any]:
+    """Convert the {"role", "content"} history dicts into LangChain messages."""
+    return [
+        HumanMessage(content=msg["content"]) if msg["role"] == "user" else
+        SystemMessage(content=msg["content"]) if msg["role"] == "system" else
+        HumanMessage(content=msg["content"])
+        for msg in messages
+    ]
+
+def create_team(llm=None):
+    """Create a team of agents with the local LM Studio model using LangGraph for orchestration.
+
+    Every specialist pipeline is built once here. The compiled graph holds no
+    per-session state, so a single team can serve all turns and concurrent sessions.
+    Pass ``llm`` to use a different chat model (e.g. in benchmarks).
+    """
 
     # Initialize the model with LM Studio
-    llm = ChatOpenAI(
-        model_name="local-model",
-        openai_api_base="http://localhost:1234/v1",
-        openai_api_key="not-needed",
-        temperature=0.7
-    )
+    if llm is None:
+        llm = ChatOpenAI(
+            model_name="local-model",
+            openai_api_base="http://localhost:1234/v1",
+            openai_api_key="not-needed",
+            temperature=0.7
+        )
 
     # Each agent will use its own specific tools
 
@@ -114,6 +156,17 @@ def create_team():
         "When users introduce themselves, acknowledge them by name in your response."
     ))
 
+    # Build the specialist pipelines once
+    research_executor = create_specialist(llm, research_system_message, [search_web])
+    math_executor = create_specialist(llm, math_system_message, [calculate])
+    weather_executor = create_specialist(llm, weather_system_message, [get_current_weather])
+    conversation_prompt = ChatPromptTemplate.from_messages([
+        conversation_system_message,
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{input}"),
+    ])
+    conversation_chain = conversation_prompt | llm
+
     # Define the router agent function
     def router_agent(state: TeamState) -> Dict[str, Any]:
         # Get the user's input
@@ -141,139 +194,44 @@ def create_team():
 
     # Define the research agent function
     def research_agent(state: TeamState) -> Dict[str, Any]:
-        # Get the user's input and conversation history
-        user_input = state["user_input"]
-        messages = state["messages"]
-
-        # Convert messages to the correct format
-        formatted_messages = [
-            HumanMessage(content=msg["content"]) if msg["role"] == "user" else
-            SystemMessage(content=msg["content"]) if msg["role"] == "system" else
-            HumanMessage(content=msg["content"])
-            for msg in messages
-        ]
-
-        # Create the prompt for the research agent
-        prompt = ChatPromptTemplate.from_messages([
-            research_system_message,
-            *formatted_messages,
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
-
-        # Create the agent
-        agent = create_openai_tools_agent(llm, [search_web], prompt)
-
-        # Create the agent executor
-        agent_executor = AgentExecutor(
-            agent=agent,
-            tools=[search_web],
-            verbose=Truehello,
-            handle_parsing_errors=True,
-            return_intermediate_steps=False
-        )
-
-        # Run the agent
-        response = agent_executor.invoke({"input": user_input})
+        # Run the prebuilt research pipeline with the conversation history
+        response = research_executor.invoke({
+            "input": state["user_input"],
+            "chat_history": format_history(state["messages"]),
+        })
 
         # Return the final response
         return {"final_response": response["output"]}
 
     # Define the math agent function
     def math_agent(state: TeamState) -> Dict[str, Any]:
-        # Get the user's input and conversation history
-        user_input = state["user_input"]
-        messages = state["messages"]
-
-        # Convert messages to the correct format
-        formatted_messages = [
-            HumanMessage(content=msg["content"]) if msg["role"] == "user" else
-            SystemMessage(content=msg["content"]) if msg["role"] == "system" else
-            HumanMessage(content=msg["content"])
-            for msg in messages
-        ]
-
-        # Create the prompt for the math agent
-        prompt = ChatPromptTemplate.from_messages([
-            math_system_message,
-            *formatted_messages,
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
-
-        # Create the agent
-        agent = create_openai_tools_agent(llm, [calculate], prompt)
-
-        # Create the agent executor
-        agent_executor = AgentExecutor(
-            agent=agent,
-            tools=[calculate],
-            verbose=False,
-            handle_parsing_errors=True,
-            return_intermediate_steps=False
-        )
-
-        # Run the agent
-        response = agent_executor.invoke({"input": user_input})
+        # Run the prebuilt math pipeline with the conversation history
+        response = math_executor.invoke({
+            "input": state["user_input"],
+            "chat_history": format_history(state["messages"]),
+        })
 
         # Return the final response
         return {"final_response": response["output"]}
 
     # Define the weather agent function
     def weather_agent(state: TeamState) -> Dict[str, Any]:
-        # Get the user's input and conversation history
-        user_input = state["user_input"]
-        messages = state["messages"]
-
-        # Convert messages to the correct format
-        formatted_messages = [
-            HumanMessage(content=msg["content"]) if msg["role"] == "user" else
-            SystemMessage(content=msg["content"]) if msg["role"] == "system" else
-            HumanMessage(content=msg["content"])
-            for msg in messages
-        ]
-
-        # Create the prompt for the weather agent
-        prompt = ChatPromptTemplate.from_messages([
-            weather_system_message,
-            *formatted_messages,
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
-
-        # Create the agent
-        agent = create_openai_tools_agent(llm, [get_current_weather], prompt)
-
-        # Create the agent executor
-        agent_executor = AgentExecutor(
-            agent=agent,
-            tools=[get_current_weather],
-            verbose=False,
-            handle_parsing_errors=True,
-            return_intermediate_steps=False
-        )
-
-        # Run the agent
-        response = agent_executor.invoke({"input": user_input})
+        # Run the prebuilt weather pipeline with the conversation history
+        response = weather_executor.invoke({
+            "input": state["user_input"],
+            "chat_history": format_history(state["messages"]),
+        })
 
         # Return the final response
         return {"final_response": response["output"]}
 
     # Define the conversation agent function
     def conversation_agent(state: TeamState) -> Dict[str, Any]:
-        # Get the user's input and conversation history
-        user_input = state["user_input"]
-        messages = state["messages"]
-
-        # Create a list of messages for the conversation agent
-        conversation_messages = [
-            conversation_system_message,
-            *[HumanMessage(content=msg["content"]) if msg["role"] == "user" else
-              SystemMessage(content=msg["content"]) if msg["role"] == "system" else
-              HumanMessage(content=msg["content"])
-              for msg in messages],
-            HumanMessage(content=user_input)
-        ]
-
         # Get the response directly (no tools needed)
-        response = llm.invoke(conversation_messages)
+        response = conversation_chain.invoke({
+            "chat_history": format_history(state["messages"]),
+            "input": state["user_input"],
+        })
 
         # Return the final response
         return {"final_response": response.content}
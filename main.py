@@ -12,7 +12,7 @@ try:
 except ImportError:
     print("python-dotenv not installed. Run: pip install python-dotenv")
 
-from langchain_openai import ChatOpenAI
+from src.llm.factory import create_llm
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessageChunk
 
 # Import LangSmith tracing utilities if available
@@ -93,11 +93,7 @@ def main():
         langsmith_enabled = setup_langsmith()
 
         # Initialize the model
-        llm = ChatOpenAI(
-            model_name="local-model",
-            openai_api_base="http://localhost:1234/v1",
-            openai_api_key="not-needed"
-        )
+        llm = create_llm(temperature=None)
 
         # Enable tracing context if LangSmith is configured and available
         trace_context = None
@@ -175,7 +171,7 @@ try:
 except ImportError:
     print("python-dotenv not installed. Run: pip install python-dotenv")
 
-from langchain_openai import ChatOpenAI
+from src.llm.factory import create_llm
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessageChunk
 
 # Import LangSmith tracing utilities if available
@@ -256,11 +252,7 @@ def main():
         langsmith_enabled = setup_langsmith()
 
         # Initialize the model
-        llm = ChatOpenAI(
-            model_name="local-model",
-            openai_api_base="http://localhost:1234/v1",
-            openai_api_key="not-needed"
-        )
+        llm = create_llm(temperature=None)
 
         # Enable tracing context if LangSmith is configured and available
         trace_context = None
@@ -0,0 +1,178 @@
+"""
+Bounded conversation memory for the agent graphs.
+
+The history sent to the model is kept within a token budget: the most recent turns
+stay verbatim and older turns are folded into a rolling summary. Summaries are
+written by the model on a background thread after a response has been shown, so
+they never add latency to a turn; a finished summary is applied before the next one.
+Turns too long for the budget on their own are shortened instead.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+# Rough characters-per-token ratio for English text (no tokenizer needed)
+CHARS_PER_TOKEN = 4
+
+# Shortest a message is cut to when a single turn is over the budget
+MIN_TRIMMED_CHARS = 200
+TRIM_MARKER = " [...]"
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an AI assistant. "
+    "Update the summary with the new messages below. Keep names, facts the user shared, "
+    "decisions and open questions; drop small talk. Reply with the summary only, in at most "
+    "{max_words} words."
+)
+
+
+def message_role(message: Any) -> str:
+    """Return the role of a {"role", "content"} dict or a LangChain message."""
+    if isinstance(message, dict):
+        return message["role"]
+    return {"human": "user", "ai": "assistant"}.get(message.type, message.type)
+
+
+def message_content(message: Any) -> str:
+    content = message["content"] if isinstance(message, dict) else message.content
+    return content if isinstance(content, str) else str(content)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def with_content(message: Any, content: str) -> Any:
+    """Return a copy of a {"role", "content"} dict or a LangChain message with new content."""
+    if isinstance(message, dict):
+        return {**message, "content": content}
+    return message.model_copy(update={"content": content})
+
+
+def summary_messages(state: Dict[str, Any]) -> List[SystemMessage]:
+    """Return the summary of earlier turns as a system message, or nothing if there is none."""
+    summary = state.get("summary")
+    if not summary:
+        return []
+    return [SystemMessage(content=f"Summary of the earlier conversation: {summary}")]
+
+
+class ConversationMemory:
+    """Keeps one conversation's ``messages`` and ``summary`` within a token budget.
+
+    Call ``prepare(state)`` before running a turn and ``update(state)`` after the
+    assistant's reply has been appended. ``state["messages"]`` must only be appended
+    to between the two, since folded turns are removed from the front of the list.
+    """
+
+    def __init__(self, llm, max_tokens: int = 2000, keep_turns: int = 4, summary_words: int = 150,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.summary_words = summary_words
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory")
+        self._owns_executor = executor is None
+        self._lock = threading.Lock()
+        self._pending: Optional[Future] = None
+        self._pending_count = 0  # Messages folded into the pending summary
+        self.summaries = 0
+
+    def history_tokens(self, state: Dict[str, Any]) -> int:
+        """Estimate the prompt tokens used by the summary and the verbatim history."""
+        tokens = estimate_tokens(state.get("summary") or "")
+        return tokens + sum(estimate_tokens(message_content(m)) for m in state["messages"])
+
+    def _window_start(self, messages: List[Any], budget: int) -> int:
+        """Index of the first message of the last ``keep_turns`` turns, or of fewer turns if
+        those don't fit in ``budget`` tokens (the newest turn is always kept)."""
+        turns = tokens = 0
+        start = 0
+        for index in range(len(messages) - 1, -1, -1):
+            tokens += estimate_tokens(message_content(messages[index]))
+            if message_role(messages[index]) != "user":
+                continue
+            if turns and tokens > budget:
+                return start  # This turn no longer fits
+            turns += 1
+            start = index
+            if turns == self.keep_turns:
+                return index
+        return 0
+
+    def _trim(self, messages: List[Any], start: int, budget: int) -> None:
+        """Shorten the longest messages from ``start`` on until they fit in ``budget`` tokens."""
+        window = len(messages) - start
+        if window <= 0 or sum(estimate_tokens(message_content(m)) for m in messages[start:]) <= budget:
+            return
+        share = max(budget * CHARS_PER_TOKEN // window, MIN_TRIMMED_CHARS)
+        for index in range(start, len(messages)):
+            content = message_content(messages[index])
+            if len(content) > share:
+                messages[index] = with_content(messages[index], content[:share - len(TRIM_MARKER)] + TRIM_MARKER)
+
+    def prepare(self, state: Dict[str, Any]) -> None:
+        """Apply a finished background summary to the state without waiting for a running one."""
+        with self._lock:
+            if self._pending is None or not self._pending.done():
+                return
+            future, count = self._pending, self._pending_count
+            self._pending = None
+
+        try:
+            summary = future.result()
+        except Exception as e:
+            # Keep the full history; the turns will be folded again on the next update
+            print(f"[Memory: summarization failed: {e}]")
+            return
+        state["summary"] = summary
+        del state["messages"][:count]
+        self.summaries += 1
+
+    def update(self, state: Dict[str, Any]) -> None:
+        """Start folding older turns into the summary if the history is over budget.
+
+        The verbatim window shrinks below ``keep_turns`` turns when they don't fit next
+        to the summary, and a newest turn that doesn't fit on its own is shortened.
+        """
+        if self.history_tokens(state) <= self.max_tokens:
+            return
+        messages = state["messages"]
+        # Leave room for the summary the folded turns become (about 4 tokens per 3 words)
+        budget = max(self.max_tokens - self.summary_words * 4 // 3, 0)
+        with self._lock:
+            if self._pending is not None:
+                return  # One summary at a time; the next update catches up
+            split = self._window_start(messages, budget)
+            if split > 0:
+                folded = list(messages[:split])
+                self._pending_count = split
+                self._pending = self._executor.submit(self.summarize, state.get("summary"), folded)
+        # Messages being folded are left alone; they are removed when the summary is applied
+        self._trim(messages, split, budget)
+
+    def summarize(self, summary: Optional[str], messages: List[Any]) -> str:
+        """Fold ``messages`` into ``summary`` with the model."""
+        transcript = "\n".join(f"{message_role(m)}: {message_content(m)}" for m in messages)
+        response = self.llm.invoke([
+            SystemMessage(content=SUMMARY_PROMPT.format(max_words=self.summary_words)),
+            HumanMessage(content=f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"),
+        ])
+        return message_content(response).strip()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until a running summary has finished (useful in scripts and benchmarks)."""
+        with self._lock:
+            pending = self._pending
+        if pending is not None:
+            try:
+                pending.result(timeout)
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        if self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
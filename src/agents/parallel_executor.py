@@ -0,0 +1,114 @@
+"""
+Agent executor that runs the tool calls of one model turn concurrently.
+
+When the model asks for several tools at once (e.g. search_web and calculate),
+``AgentExecutor`` runs them one after another. ``ParallelAgentExecutor`` runs them
+at the same time and hands the observations back in the order the model asked
+for them, so the scratchpad of the next step is the same as with sequential runs:
+
+- Sync (``invoke``): the calls go to a shared, bounded thread pool
+  (``TOOL_WORKERS`` threads, default 8). A turn with a single call runs inline.
+- Async (``ainvoke``): the calls are awaited together with asyncio; async tools
+  run on the event loop and sync tools on the loop's bounded default executor.
+
+Each call gets a timeout (``tool_timeout``, or a per-tool value from
+``tool_timeouts``). A call that times out is reported to the model as an error
+observation instead of failing the turn. A thread that has already started
+cannot be interrupted, so a timed-out sync tool finishes in the background and
+its result is discarded; a timed-out async tool is cancelled.
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Iterator, Optional, Union
+
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+
+# Seconds a tool call may take unless the executor sets its own timeouts
+DEFAULT_TOOL_TIMEOUT = 30.0
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_tool_pool() -> ThreadPoolExecutor:
+    """The thread pool shared by every parallel executor, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(int(os.getenv("TOOL_WORKERS", "8")), thread_name_prefix="tool")
+        return _pool
+
+
+class _PendingStep:
+    """A tool call collected from ``_perform_agent_action``, run later by ``_iter_next_step``."""
+
+    def __init__(self, action: AgentAction, run: Callable[[], AgentStep]):
+        self.action = action
+        self.run = run
+
+
+class ParallelAgentExecutor(AgentExecutor):
+    """AgentExecutor that runs the tool calls of one model turn concurrently; see the module docstring."""
+
+    tool_timeout: Optional[float] = DEFAULT_TOOL_TIMEOUT
+    """Seconds a tool call may take (None for no limit)."""
+    tool_timeouts: Dict[str, float] = {}
+    """Per-tool overrides of ``tool_timeout``, by tool name."""
+
+    def timeout_for(self, tool_name: str) -> Optional[float]:
+        return self.tool_timeouts.get(tool_name, self.tool_timeout)
+
+    def _timeout_step(self, action: AgentAction) -> AgentStep:
+        return AgentStep(action=action, observation=(
+            f"Error: {action.tool} did not finish within {self.timeout_for(action.tool):g} seconds."))
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        # Defer the call: the base class asks for the tools one by one, and they are run together below
+        def run() -> AgentStep:
+            return super(ParallelAgentExecutor, self)._perform_agent_action(
+                name_to_tool_map, color_mapping, agent_action, run_manager)
+
+        return _PendingStep(agent_action, run)
+
+    def _iter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps,
+                        run_manager=None) -> Iterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        # The base class plans, yields the actions, then one (here deferred) step per action
+        pending = []
+        for output in super()._iter_next_step(name_to_tool_map, color_mapping, inputs, intermediate_steps,
+                                              run_manager):
+            if isinstance(output, _PendingStep):
+                pending.append(output)
+            else:
+                yield output
+
+        if len(pending) == 1 and self.timeout_for(pending[0].action.tool) is None:
+            yield pending[0].run()
+            return
+
+        # Start every call, then collect the observations in the order the model asked for them
+        pool = get_tool_pool()
+        started = time.monotonic()
+        futures = [pool.submit(contextvars.copy_context().run, step.run) for step in pending]
+        for step, future in zip(pending, futures):
+            timeout = self.timeout_for(step.action.tool)
+            try:
+                yield future.result(None if timeout is None else max(0.0, started + timeout - time.monotonic()))
+            except FutureTimeoutError:
+                future.cancel()
+                yield self._timeout_step(step.action)
+
+    async def _aperform_agent_action(self, name_to_tool_map, color_mapping, agent_action,
+                                     run_manager=None) -> AgentStep:
+        # The base class already gathers the calls of a turn, in order; this adds the timeout
+        step = super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+        try:
+            return await asyncio.wait_for(step, self.timeout_for(agent_action.tool))
+        except asyncio.TimeoutError:
+            return self._timeout_step(agent_action)
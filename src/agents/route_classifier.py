@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+"""
+Learned local routing classifier for the agent team.
+
+Hashed word/character n-gram features feed a multinomial logistic regression written
+in plain NumPy. The model is trained offline from the JSONL routing log that the team
+graph writes, and predicts a route in microseconds instead of a full LLM generation.
+
+Usage:
+    python -m src.agents.route_classifier train --log logs/routing.jsonl --out models/router.npz
+    python -m src.agents.route_classifier evaluate --log logs/routing.jsonl --model models/router.npz
+    python -m src.agents.route_classifier predict --model models/router.npz "What is 2 + 2?"
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.agents.routing import AGENT_NAMES
+
+# Default size of the hashed feature space
+DEFAULT_N_FEATURES = 2 ** 18
+
+# Routing-log sources that are used as training labels by default; the classifier's
+# own decisions are skipped so it never learns from itself
+DEFAULT_TRAIN_SOURCES = ("llm", "fast")
+
+WORD_PATTERN = re.compile(r"[a-z]+|\d+|\*\*|[-+*/%^=?]")
+
+
+def extract_features(text: str, n_features: int = DEFAULT_N_FEATURES) -> Tuple[np.ndarray, np.ndarray]:
+    """Hash a query into sparse (indices, values) features.
+
+    Features are word unigrams and bigrams plus character trigrams of each word,
+    weighted by log term frequency and L2-normalized.
+    """
+    tokens = WORD_PATTERN.findall(text.lower())
+    grams = [f"w:{token}" for token in tokens]
+    grams.extend(f"b:{first} {second}" for first, second in zip(tokens, tokens[1:]))
+    for token in tokens:
+        if token.isalpha() and len(token) > 2:
+            padded = f"<{token}>"
+            grams.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    # Hash the n-grams and merge collisions/repeats into term frequencies
+    hashed = np.fromiter((zlib.crc32(gram.encode("utf-8")) % n_features for gram in grams),
+                         dtype=np.int64, count=len(grams))
+    indices, counts = np.unique(hashed, return_counts=True)
+    values = np.log1p(counts).astype(np.float32)
+    values /= np.linalg.norm(values)
+    return indices, values
+
+
+def check_labels(labels: Iterable[str]) -> None:
+    """Raise ValueError unless the labels name at least two of the team's specialists.
+
+    A single class makes every prediction certain, and a label that is not a
+    specialist would be routed to a node the team graph does not have.
+    """
+    label_set = set(labels)
+    unknown = sorted(label_set - set(AGENT_NAMES))
+    if unknown:
+        raise ValueError(f"Unknown routing labels {unknown}; expected agent names from {AGENT_NAMES}")
+    if len(label_set) < 2:
+        raise ValueError(f"Routing needs decisions for at least two agents, got {sorted(label_set)}")
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=-1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class RouteClassifier:
+    """Multinomial logistic regression over hashed n-gram features."""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, labels: Sequence[str],
+                 n_features: int = DEFAULT_N_FEATURES):
+        self.weights = weights          # (n_features, n_labels)
+        self.bias = bias                # (n_labels,)
+        self.labels = list(labels)
+        self.n_features = n_features
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        """Return the probability of each label for a query."""
+        indices, values = extract_features(text, self.n_features)
+        scores = values @ self.weights[indices] + self.bias
+        return _softmax(scores)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Return the most likely label and its probability."""
+        probabilities = self.predict_proba(text)
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(probabilities[best])
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[str], n_features: int = DEFAULT_N_FEATURES,
+              epochs: int = 200, learning_rate: float = 5.0, l2: float = 1e-4) -> "RouteClassifier":
+        """Fit the classifier with full-batch gradient descent on sparse features."""
+        check_labels(labels)
+        label_names = [name for name in AGENT_NAMES if name in set(labels)]
+        label_index = {name: i for i, name in enumerate(label_names)}
+        targets = np.array([label_index[label] for label in labels], dtype=np.int64)
+
+        # Build a CSR-style sparse design matrix
+        rows, indices, values = [], [], []
+        for row, text in enumerate(texts):
+            row_indices, row_values = extract_features(text, n_features)
+            rows.append(np.full(len(row_indices), row, dtype=np.int64))
+            indices.append(row_indices)
+            values.append(row_values)
+        rows = np.concatenate(rows)
+        indices = np.concatenate(indices)
+        values = np.concatenate(values)
+
+        # Only train the weight rows that actually occur in the data
+        used, columns = np.unique(indices, return_inverse=True)
+        n_samples, n_labels = len(texts), len(label_names)
+        weights = np.zeros((len(used), n_labels), dtype=np.float64)
+        bias = np.zeros(n_labels, dtype=np.float64)
+        one_hot = np.eye(n_labels)[targets]
+
+        for _ in range(epochs):
+            # Forward pass: scores = X @ W + b
+            scores = np.zeros((n_samples, n_labels))
+            np.add.at(scores, rows, values[:, None] * weights[columns])
+            error = (_softmax(scores + bias) - one_hot) / n_samples
+
+            # Backward pass: dW = X.T @ error
+            gradient = np.zeros_like(weights)
+            np.add.at(gradient, columns, values[:, None] * error[rows])
+            weights -= learning_rate * (gradient + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+
+        full_weights = np.zeros((n_features, n_labels), dtype=np.float32)
+        full_weights[used] = weights
+        return cls(full_weights, bias.astype(np.float32), label_names, n_features)
+
+    def save(self, path: str) -> None:
+        """Save the model as a compact .npz file (only non-zero weight rows are stored)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        rows = np.flatnonzero(np.any(self.weights != 0, axis=1))
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                rows=rows.astype(np.int64),
+                weights=self.weights[rows],
+                bias=self.bias,
+                labels=np.array(self.labels),
+                n_features=np.array(self.n_features),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "RouteClassifier":
+        """Load a model saved with ``save()``."""
+        with np.load(path) as data:
+            n_features = int(data["n_features"])
+            weights = np.zeros((n_features, len(data["labels"])), dtype=np.float32)
+            weights[data["rows"]] = data["weights"]
+            return cls(weights, data["bias"], [str(label) for label in data["labels"]], n_features)
+
+
+class RouteModel:
+    """Lazily loaded classifier with a confidence threshold for the team router.
+
+    The model file is only read on the first ``route()`` call. If it does not exist
+    every query falls back to the LLM router.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.8):
+        self.path = path
+        self.threshold = threshold
+        self._classifier: Optional[RouteClassifier] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._fallbacks = 0
+
+    def _get_classifier(self) -> Optional[RouteClassifier]:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    if os.path.exists(self.path):
+                        classifier = RouteClassifier.load(self.path)
+                        try:
+                            check_labels(classifier.labels)
+                            self._classifier = classifier
+                        except ValueError as e:
+                            print(f"Ignoring routing model {self.path}: {e}; using the LLM router")
+                    else:
+                        print(f"Routing model {self.path} not found; using the LLM router")
+                    self._loaded = True
+        return self._classifier
+
+    def route(self, text: str) -> Optional[str]:
+        """Return the predicted agent, or None when the model is missing or unsure."""
+        classifier = self._get_classifier()
+        agent_name, probability = classifier.predict(text) if classifier else (None, 0.0)
+        with self._lock:
+            if agent_name is not None and probability >= self.threshold:
+                self._hits += 1
+                return agent_name
+            self._fallbacks += 1
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit and fallback counters and rates."""
+        with self._lock:
+            total = self._hits + self._fallbacks
+            return {
+                "hits": self._hits,
+                "fallbacks": self._fallbacks,
+                "hit_rate": self._hits / total if total else 0.0,
+                "fallback_rate": self._fallbacks / total if total else 0.0,
+            }
+
+
+class RoutingLog:
+    """Thread-safe JSONL log of routing decisions, used as training data."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, user_input: str, current_agent: str, source: str) -> None:
+        """Append one ``(user_input, current_agent)`` decision and where it came from."""
+        line = json.dumps({
+            "user_input": user_input,
+            "current_agent": current_agent,
+            "source": source,
+            "timestamp": time.time(),
+        })
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def read_routing_log(path: str, sources: Iterable[str] = DEFAULT_TRAIN_SOURCES) -> Tuple[List[str], List[str]]:
+    """Read ``(user_input, current_agent)`` pairs from a routing log."""
+    sources = set(sources)
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("source", "llm") not in sources:
+                continue
+            if record.get("user_input") and record.get("current_agent"):
+                texts.append(record["user_input"])
+                labels.append(record["current_agent"])
+    return texts, labels
+
+
+def _split(texts, labels, holdout, seed=0):
+    order = np.random.default_rng(seed).permutation(len(texts))
+    cut = int(len(texts) * (1 - holdout))
+    train_ids, test_ids = order[:cut], order[cut:]
+    return ([texts[i] for i in train_ids], [labels[i] for i in train_ids],
+            [texts[i] for i in test_ids], [labels[i] for i in test_ids])
+
+
+def _evaluate(classifier, texts, labels, threshold):
+    if not texts:
+        return
+    predictions = [classifier.predict(text) for text in texts]
+    confident = [(agent, label) for (agent, probability), label in zip(predictions, labels)
+                 if probability >= threshold]
+    accuracy = sum(agent == label for (agent, _), label in zip(predictions, labels)) / len(texts)
+    print(f"Accuracy: {accuracy:.1%} on {len(texts)} queries")
+    if confident:
+        confident_accuracy = sum(agent == label for agent, label in confident) / len(confident)
+        print(f"Above threshold {threshold}: {len(confident) / len(texts):.1%} coverage, "
+              f"{confident_accuracy:.1%} accuracy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="Train a model from a routing log")
+    train_parser.add_argument("--log", required=True, help="JSONL routing log written by the team graph")
+    train_parser.add_argument("--out", required=True, help="Where to write the .npz model")
+    train_parser.add_argument("--sources", nargs="+", default=list(DEFAULT_TRAIN_SOURCES),
+                              help="Decision sources to train on")
+    train_parser.add_argument("--features", type=int, default=DEFAULT_N_FEATURES, help="Hashed feature space size")
+    train_parser.add_argument("--epochs", type=int, default=200)
+    train_parser.add_argument("--holdout", type=float, default=0.2, help="Fraction held out for evaluation")
+    train_parser.add_argument("--threshold", type=float, default=0.8, help="Threshold to report coverage for")
+
+    eval_parser = subparsers.add_parser("evaluate", help="Evaluate a model on a routing log")
+    eval_parser.add_argument("--log", required=True)
+    eval_parser.add_argument("--model", required=True)
+    eval_parser.add_argument("--sources", nargs="+", default=list(DEFAULT_TRAIN_SOURCES))
+    eval_parser.add_argument("--threshold", type=float, default=0.8)
+
+    predict_parser = subparsers.add_parser("predict", help="Route a single query")
+    predict_parser.add_argument("--model", required=True)
+    predict_parser.add_argument("query")
+
+    args = parser.parse_args()
+
+    if args.command == "train":
+        texts, labels = read_routing_log(args.log, args.sources)
+        if not texts:
+            parser.error(f"No usable routing decisions in {args.log}")
+        try:
+            check_labels(labels)
+        except ValueError as e:
+            parser.error(f"Cannot train on {args.log}: {e}")
+        train_texts, train_labels, test_texts, test_labels = _split(texts, labels, args.holdout)
+        if len(set(train_labels)) < 2:
+            # Too few decisions for a holdout that leaves every agent in the training split
+            train_texts, train_labels, test_texts, test_labels = texts, labels, [], []
+        start = time.perf_counter()
+        classifier = RouteClassifier.train(train_texts, train_labels, args.features, epochs=args.epochs)
+        print(f"Trained on {len(train_texts)} decisions in {time.perf_counter() - start:.2f}s")
+        _evaluate(classifier, test_texts, test_labels, args.threshold)
+
+        # Refit on everything before saving
+        if test_texts:
+            classifier = RouteClassifier.train(texts, labels, args.features, epochs=args.epochs)
+        classifier.save(args.out)
+        print(f"Saved model to {args.out}")
+    elif args.command == "evaluate":
+        texts, labels = read_routing_log(args.log, args.sources)
+        _evaluate(RouteClassifier.load(args.model), texts, labels, args.threshold)
+    else:
+        classifier = RouteClassifier.load(args.model)
+        start = time.perf_counter()
+        agent_name, probability = classifier.predict(args.query)
+        elapsed = time.perf_counter() - start
+        print(f"{agent_name} ({probability:.2f}) in {elapsed * 1e6:.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Deterministic routing helpers for the agent team.
+
+The fast-path router recognises obvious math, weather, research and greeting queries
+with keywords, regular expressions and arithmetic-expression detection, so the team
+can skip the LLM router round trip for them. Anything it is unsure about falls back
+to the LLM router.
+"""
+
+import re
+import threading
+from typing import Any, Dict, NamedTuple, Optional
+
+# The specialist agents a query can be routed to
+AGENT_NAMES = ("research", "math", "weather", "conversation")
+
+# Matches an agent name anywhere in the LLM router's output
+AGENT_NAME_PATTERN = re.compile(r"\b(research|math|weather|conversation)\b", re.IGNORECASE)
+
+# A bare arithmetic expression, optionally wrapped in "what is ...?" / "calculate ..."
+ARITHMETIC_PATTERN = re.compile(
+    r"^\s*(?:(?:what\s+is|what's|whats|calculate|compute|evaluate|solve)\s+)?"
+    r"(?P<expr>[-+*/%^().\d\s]*\d\s*(?:\*\*|[-+*/%^])\s*[-+(.\d][-+*/%^().\d\s]*)"
+    r"\s*[?.!=]*\s*$",
+    re.IGNORECASE,
+)
+
+# Math vocabulary that only counts when the query also contains a number
+MATH_KEYWORD_PATTERN = re.compile(
+    r"\b(calculate|compute|evaluate|solve|sum of|product of|square root|sqrt|cube root|"
+    r"percent(?:age)? of|plus|minus|times|multiplied by|divided by|to the power of|squared|cubed|"
+    r"factorial|logarithm|log of|average of|mean of)\b",
+    re.IGNORECASE,
+)
+NUMBER_PATTERN = re.compile(r"\d")
+
+# An arithmetic operation embedded in a longer sentence
+EMBEDDED_ARITHMETIC_PATTERN = re.compile(r"\d\s*(?:\*\*|[-+*/%^])\s*\(?\d")
+
+WEATHER_STRONG_PATTERN = re.compile(r"\b(weather|forecast)\b", re.IGNORECASE)
+WEATHER_WEAK_PATTERN = re.compile(
+    r"\b(temperature|raining|rain|snowing|snow|sunny|cloudy|humid(?:ity)?|windy|degrees outside|umbrella)\b",
+    re.IGNORECASE,
+)
+
+RESEARCH_PATTERN = re.compile(
+    r"\b(capital of|population of|who (?:is|was|wrote|invented|discovered|founded)|"
+    r"when (?:did|was|is)|where is|what year|how (?:tall|old|far|big|many people))\b",
+    re.IGNORECASE,
+)
+
+GREETING_PATTERN = re.compile(
+    r"^\s*(?:hi|hello|hey|hiya|howdy|greetings|yo|good\s+(?:morning|afternoon|evening|night)|"
+    r"thanks|thank\s+you|thx|cheers|bye|goodbye|see\s+you|how\s+are\s+you(?:\s+doing)?(?:\s+today)?|"
+    r"nice\s+to\s+meet\s+you)(?:\s+(?:there|everyone|again|so\s+much|a\s+lot))?[\s!.,?]*$",
+    re.IGNORECASE,
+)
+INTRODUCTION_PATTERN = re.compile(
+    r"^\s*(?:(?:hi|hello|hey)[\s,!.]+)?(?:my\s+name\s+is|my\s+name's|i\s+am|i'm|call\s+me)\s+[a-z][\w'-]*[\s!.]*$",
+    re.IGNORECASE,
+)
+
+
+class RouteDecision(NamedTuple):
+    """The fast-path router's decision for a single query."""
+    agent: str          # The most likely agent
+    confidence: float   # Confidence in [0, 1]
+    reason: str         # Which rule produced the decision
+
+
+def parse_agent_name(text: str) -> str:
+    """Normalize the LLM router's answer to one of the agent names."""
+    match = AGENT_NAME_PATTERN.search(text or "")
+    return match.group(1).lower() if match else "conversation"
+
+
+class FastRouter:
+    """Zero-LLM pre-router with confidence scoring and hit/fallback counters.
+
+    ``route()`` returns an agent name when the rules are at least ``threshold``
+    confident, and ``None`` when the caller should fall back to the LLM router.
+    The counters are safe to update from concurrent sessions.
+    """
+
+    def __init__(self, threshold: float = 0.85):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._fallbacks = 0
+        self._hits_by_agent = {name: 0 for name in AGENT_NAMES}
+
+    def score(self, text: str) -> Dict[str, float]:
+        """Score how strongly the query matches each agent's rules."""
+        scores = {name: 0.0 for name in AGENT_NAMES}
+        has_number = bool(NUMBER_PATTERN.search(text))
+
+        # Arithmetic expressions and math vocabulary
+        if ARITHMETIC_PATTERN.match(text):
+            scores["math"] = 0.98
+        elif has_number and MATH_KEYWORD_PATTERN.search(text):
+            scores["math"] = 0.9
+        elif EMBEDDED_ARITHMETIC_PATTERN.search(text):
+            scores["math"] = 0.75
+
+        # Weather vocabulary
+        if WEATHER_STRONG_PATTERN.search(text):
+            scores["weather"] = 0.95
+        elif WEATHER_WEAK_PATTERN.search(text):
+            scores["weather"] = 0.6
+
+        # Factual lookups are only a hint; open questions still go to the LLM router
+        if RESEARCH_PATTERN.search(text):
+            scores["research"] = 0.7
+
+        # Greetings, thanks and self-introductions
+        if GREETING_PATTERN.match(text):
+            scores["conversation"] = 0.97
+        elif INTRODUCTION_PATTERN.match(text):
+            scores["conversation"] = 0.9
+
+        return scores
+
+    def classify(self, text: str) -> RouteDecision:
+        """Pick the best-scoring agent and discount the confidence when rules conflict."""
+        scores = self.score(text or "")
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (best, best_score), (_, runner_up) = ranked[0], ranked[1]
+        if best_score == 0.0:
+            return RouteDecision("conversation", 0.0, "no rule matched")
+
+        # Competing matches (e.g. "weather in Paris and 3 * 4") make the decision uncertain
+        confidence = best_score - runner_up / 2
+        return RouteDecision(best, confidence, f"{best} rules")
+
+    def route(self, text: str) -> Optional[str]:
+        """Return the agent for a confident decision, or None to fall back to the LLM router."""
+        decision = self.classify(text)
+        with self._lock:
+            if decision.confidence >= self.threshold:
+                self._hits += 1
+                self._hits_by_agent[decision.agent] += 1
+                return decision.agent
+            self._fallbacks += 1
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit and fallback counters and rates."""
+        with self._lock:
+            total = self._hits + self._fallbacks
+            return {
+                "hits": self._hits,
+                "fallbacks": self._fallbacks,
+                "hit_rate": self._hits / total if total else 0.0,
+                "fallback_rate": self._fallbacks / total if total else 0.0,
+                "hits_by_agent": dict(self._hits_by_agent),
+            }
+
+    def reset_stats(self) -> None:
+        """Reset all counters to zero."""
+        with self._lock:
+            self._hits = 0
+            self._fallbacks = 0
+            self._hits_by_agent = {name: 0 for name in AGENT_NAMES}
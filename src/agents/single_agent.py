@@ -12,37 +12,52 @@ except ImportError:
     print("python-dotenv not installed. Run: pip install python-dotenv")
 
 # Import LangChain components
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage
+from langchain_core.messages import AnyMessage, AIMessage, HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.agents import AgentExecutor, create_openai_tools_agent
+from langchain_core.runnables import RunnableLambda
+from langchain.agents import create_openai_tools_agent
 
 # Import LangGraph components for memory
 from langgraph.graph import END, StateGraph
-from typing import Dict, Any, TypedDict, Optional, List
+from langgraph.graph.message import add_messages
+from typing import Annotated, TypedDict, Optional, List
 
-# Import tools
+# Import the model factory and tools
+from src.llm.factory import create_llm, get_base_url
 from src.tools.search_tools import search_web
 from src.tools.weather_tools import get_current_weather
 from src.tools.math_tools import calculate
 
+# Import the streaming and memory helpers
+from src.agents.memory import ConversationMemory, summary_messages
+from src.agents.parallel_executor import ParallelAgentExecutor
+from src.agents.streaming import print_token, stream_turn
+
 # Define the state type for our LangGraph
 class AgentState(TypedDict):
     """State for the agent conversation."""
-    messages: List[Dict[str, Any]]  # The conversation history
+    # The conversation history; the agent node returns only its reply, which add_messages appends
+    messages: Annotated[List[AnyMessage], add_messages]
     user_input: Optional[str]       # The current user input
     agent_output: Optional[str]     # The agent's response
+    summary: Optional[str]          # Rolling summary of turns dropped from messages
 
-def create_agent():
-    """Create a LangChain agent with the local LM Studio model using LangGraph for memory."""
-    
-    # Initialize the model with LM Studio
-    llm = ChatOpenAI(
-        model_name="local-model",
-        openai_api_base="http://localhost:1234/v1",
-        openai_api_key="not-needed",
-        temperature=0.7
-    )
+def create_agent(llm=None):
+    """Create a LangChain agent with the local LM Studio model using LangGraph for memory.
+
+    The prompt, tool bindings and agent executor are built once here and shared by
+    every turn; the conversation history is passed in through a MessagesPlaceholder.
+    Pass ``llm`` to use a different chat model (e.g. in benchmarks). The agent node
+    has a native async implementation, so the graph supports ``ainvoke``, ``astream``
+    and ``astream_events`` with many sessions on one event loop.
+    """
+    
+    # Initialize the model with LM Studio (or LOCAL_MODEL_BASE_URL)
+    if llm is None:
+        llm = create_llm(temperature=0.7)
+    
+    # Define the tools the agent can use
+    tools = [search_web, get_current_weather, calculate]
     
     # Create the system message
     system_message = SystemMessage(content=(
@@ -59,52 +74,50 @@ def create_agent():
         "their name and asking how you can help them. Do not use tools for personal introductions."
     ))
     
+    # Create the prompt skeleton once; the history is filled in on every turn
+    prompt = ChatPromptTemplate.from_messages([
+        system_message,
+        MessagesPlaceholder(variable_name="chat_history"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ])
+    
+    # Create the agent (this serializes the tool schemas once)
+    agent = create_openai_tools_agent(llm, tools, prompt)
+    
+    # Create the agent executor (without memory since we're handling it in the graph);
+    # tool calls the model makes in one turn run concurrently
+    agent_executor = ParallelAgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=False,  # Set to False to avoid duplicate output
+        handle_parsing_errors=True,
+        return_intermediate_steps=False
+    )
+    
     # Define the agent node function
     def agent_node(state: AgentState) -> dict:
-        # Extract messages from state
-        messages = state["messages"]
-        
-        # Convert messages to the correct format
-        formatted_messages = [
-            SystemMessage(content=msg["content"]) if msg["role"] == "system" else
-            HumanMessage(content=msg["content"]) if msg["role"] == "user" else
-            AIMessage(content=msg["content"])
-            for msg in messages
-        ]
-        
-        # Create the prompt with the current messages
-        prompt = ChatPromptTemplate.from_messages([
-            system_message,
-            *formatted_messages,
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
-        
-        # Create the agent
-        agent = create_openai_tools_agent(llm, [search_web, get_current_weather, calculate], prompt)
-        
-        # Create the agent executor (without memory since we're handling it in the graph)
-        agent_executor = AgentExecutor(
-            agent=agent,
-            tools=[search_web, get_current_weather, calculate],
-            verbose=False,  # Set to False to avoid duplicate output
-            handle_parsing_errors=True,
-            return_intermediate_steps=False
-        )
-        
-        # Get the user's last message
-        user_message = state["user_input"]
+        # Run the agent with the user's last message; the history is already LangChain messages
+        response = agent_executor.invoke({
+            "input": state["user_input"],
+            "chat_history": summary_messages(state) + state["messages"],
+        })
         
-        # Run the agent
-        response = agent_executor.invoke({"input": user_message})
-        
-        # Update the state with the agent's response
-        return {"agent_output": response["output"]}
+        # Update the state with the agent's response and append it to the history
+        return {"agent_output": response["output"], "messages": [AIMessage(content=response["output"])]}
+    
+    # Define the async version of the agent node
+    async def aagent_node(state: AgentState) -> dict:
+        response = await agent_executor.ainvoke({
+            "input": state["user_input"],
+            "chat_history": summary_messages(state) + state["messages"],
+        })
+        return {"agent_output": response["output"], "messages": [AIMessage(content=response["output"])]}
     
     # Create the graph
     workflow = StateGraph(AgentState)
     
     # Add the agent node
-    workflow.add_node("agent", agent_node)
+    workflow.add_node("agent", RunnableLambda(agent_node, afunc=aagent_node))
     
     # Set the entry point
     workflow.set_entry_point("agent")
@@ -117,18 +130,27 @@ def create_agent():
     
     return app
 
-def chat_loop():
-    """Run an interactive chat loop with the agent using LangGraph for memory."""
+def chat_loop(stream: bool = False, max_history_tokens: int = 2000):
+    """Run an interactive chat loop with the agent using LangGraph for memory.
+
+    With ``stream=True`` the agent's tokens are printed as they are generated and each
+    turn reports its time to first token (TTFT) and tokens per second. Once the history
+    exceeds ``max_history_tokens``, older turns are folded into a summary.
+    """
     
     print("\n=== LM Studio Agent Chat ===")
     print("Type 'exit' or 'quit' to end the conversation.")
     
+    memory = None
     try:
         # Create the agent
         agent = create_agent()
         
+        # Keep the history within budget; summaries are written in the background
+        memory = ConversationMemory(create_llm(temperature=0.0), max_tokens=max_history_tokens)
+        
         # Initialize the conversation state
-        state = {"messages": []}
+        state = {"messages": [], "summary": None}
         
         # Chat loop
         while True:
@@ -140,25 +162,39 @@ def chat_loop():
                 print("\nAI: Goodbye! Have a great day!")
                 break
             
-            # Add the user message to the state (using the correct format for LangChain)
-            state["messages"].append({"role": "user", "content": user_input})
+            # Fold older turns into the summary if a background summary has finished
+            memory.prepare(state)
+            
+            # Add the user message to the state
+            state["messages"].append(HumanMessage(content=user_input))
             
             # Update the state with the user input
             state["user_input"] = user_input
             
             # Get response from agent
             try:
-                # Invoke the agent with the current state
-                new_state = agent.invoke(state)
-                
-                # Get the agent's response
-                agent_response = new_state["agent_output"]
+                if stream:
+                    # Print the agent's tokens as they arrive
+                    print("\nAI: ", end="", flush=True)
+                    new_state, turn_stats = stream_turn(agent, state, print_token)
+                    agent_response = new_state["agent_output"]
+                    print(agent_response if turn_stats.tokens == 0 else "")
+                    print(turn_stats.summary())
+                else:
+                    # Invoke the agent with the current state
+                    new_state = agent.invoke(state)
+                    
+                    # Get the agent's response
+                    agent_response = new_state["agent_output"]
+                    
+                    # Display the response
+                    print(f"\nAI: {agent_response}")
                 
-                # Add the agent's response to the messages (using the correct format for LangChain)
-                state["messages"].append({"role": "assistant", "content": agent_response})
+                # The graph appended the agent's response to the messages
+                state["messages"] = new_state["messages"]
                 
-                # Display the response
-                print(f"\nAI: {agent_response}")
+                # Start summarizing older turns now that the response has been shown
+                memory.update(state)
             except Exception as e:
                 print(f"\nError: {str(e)}")
                 print("AI: I'm sorry, I encountered an error. Please try again.")
@@ -168,11 +204,23 @@ def chat_loop():
     except Exception as e:
         print(f"\n\nAn error occurred: {str(e)}")
     
+    if memory is not None:
+        memory.close()
+    
     print("\nThank you for chatting!")
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Chat with the LM Studio agent.")
+    parser.add_argument("--stream", action="store_true",
+                        help="Print tokens as they are generated and report TTFT and tokens/sec")
+    parser.add_argument("--max-history-tokens", type=int, default=2000,
+                        help="Token budget for the history before older turns are summarized")
+    args = parser.parse_args()
+    
     # Check if LM Studio is running
-    print("Connecting to LM Studio at http://localhost:1234/v1...")
+    print(f"Connecting to LM Studio at {get_base_url()}...")
     
     # Start the chat loop
-    chat_loop()
+    chat_loop(stream=args.stream, max_history_tokens=args.max_history_tokens)
@@ -0,0 +1,144 @@
+"""
+Speculative execution of a specialist agent concurrently with the router.
+
+While the LLM router decides where a query should go, the most likely specialist is
+already running on a worker thread (or as an asyncio task in the async graph). If the
+router agrees, its result is used and the router round trip is hidden; if not, the
+speculative work is cancelled and counted as wasted. A thread that has already
+started cannot be interrupted, so its result is discarded instead; an asyncio task is
+cancelled mid-flight, which also aborts its pending model request.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class SpeculationStats:
+    """Thread-safe counters for speculative execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.launched = 0
+        self.hits = 0
+        self.misses = 0
+        self.speculative_seconds = 0.0  # Worker time spent on all speculative runs
+        self.wasted_seconds = 0.0       # Worker time spent on runs whose result was discarded
+
+    def record(self, hit: bool, seconds: float) -> None:
+        """Record the outcome and worker time of one finished speculation."""
+        with self._lock:
+            self.speculative_seconds += seconds
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.wasted_seconds += seconds
+
+    def record_launch(self) -> None:
+        with self._lock:
+            self.launched += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the counters, hit rate and wasted-work ratio."""
+        with self._lock:
+            resolved = self.hits + self.misses
+            return {
+                "launched": self.launched,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / resolved if resolved else 0.0,
+                "speculative_seconds": self.speculative_seconds,
+                "wasted_seconds": self.wasted_seconds,
+                "wasted_work_ratio": (self.wasted_seconds / self.speculative_seconds
+                                      if self.speculative_seconds else 0.0),
+            }
+
+
+class Speculation:
+    """A specialist run started before the routing decision is known."""
+
+    def __init__(self, agent_name: str, runner: "SpeculativeRunner", fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 state: Dict[str, Any]):
+        self.agent_name = agent_name
+        self._stats = runner.stats
+        self._hit: Optional[bool] = None
+        self._seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+        # Run in a copy of the current context so callbacks and tracing still attach to this run
+        context = contextvars.copy_context()
+        self._future = runner.executor.submit(context.run, self._run, fn, state)
+        self._stats.record_launch()
+
+    def _run(self, fn, state):
+        started = time.perf_counter()
+        try:
+            return fn(state)
+        finally:
+            # If the outcome is already known, record it now that the worker time is known
+            with self._lock:
+                self._seconds = time.perf_counter() - started
+                if self._hit is not None:
+                    self._stats.record(self._hit, self._seconds)
+
+    def resolve(self, routed_agent: str) -> Optional[Dict[str, Any]]:
+        """Return the speculative result if the router agrees, otherwise cancel it and return None."""
+        hit = routed_agent == self.agent_name
+
+        # Never-started work is cancelled outright; running work cannot be interrupted
+        if not hit and self._future.cancel():
+            self._stats.record(False, 0.0)
+            return None
+
+        with self._lock:
+            self._hit = hit
+            if self._seconds is not None:
+                self._stats.record(hit, self._seconds)
+        return self._future.result() if hit else None
+
+
+class AsyncSpeculation:
+    """A specialist coroutine started as a task before the routing decision is known."""
+
+    def __init__(self, agent_name: str, runner: "SpeculativeRunner",
+                 fn: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]], state: Dict[str, Any]):
+        self.agent_name = agent_name
+        self._stats = runner.stats
+        self._started = time.perf_counter()
+        self._task = asyncio.ensure_future(fn(state))
+        self._stats.record_launch()
+
+    async def resolve(self, routed_agent: str) -> Optional[Dict[str, Any]]:
+        """Return the speculative result if the router agrees, otherwise cancel the task and return None."""
+        if routed_agent != self.agent_name:
+            # Cancelling stops the work, so only the time spent so far is wasted
+            self._task.cancel()
+            self._stats.record(False, time.perf_counter() - self._started)
+            return None
+
+        try:
+            return await self._task
+        finally:
+            self._stats.record(True, time.perf_counter() - self._started)
+
+
+class SpeculativeRunner:
+    """Thread pool that runs speculative specialist calls for a team."""
+
+    def __init__(self, max_workers: int = 4, stats: Optional[SpeculationStats] = None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative")
+        self.stats = stats if stats is not None else SpeculationStats()
+
+    def start(self, agent_name: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+              state: Dict[str, Any]) -> Speculation:
+        """Start running ``fn(state)`` for ``agent_name`` in the background."""
+        return Speculation(agent_name, self, fn, state)
+
+    def start_async(self, agent_name: str, fn: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                    state: Dict[str, Any]) -> AsyncSpeculation:
+        """Start ``await fn(state)`` for ``agent_name`` as a task on the running event loop."""
+        return AsyncSpeculation(agent_name, self, fn, state)
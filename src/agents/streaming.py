@@ -0,0 +1,91 @@
+"""
+Token streaming for the agent graphs.
+
+Drives a compiled graph with ``stream_mode=["messages", "values"]`` so specialist
+tokens can be shown as soon as the model produces them, while the router's output
+(an internal routing decision) is suppressed. Each turn reports its time to first
+token and generation speed.
+"""
+
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Nodes whose model output is internal and never shown to the user
+HIDDEN_NODES = {"router"}
+
+
+def token_text(chunk, metadata: Dict[str, Any], hidden_nodes=HIDDEN_NODES) -> Optional[str]:
+    """Return the visible text of a streamed message chunk, or None if it should not be shown."""
+    if metadata.get("langgraph_node") in hidden_nodes:
+        return None
+    # Only incremental model chunks are tokens: complete messages are either tool results or
+    # replies written to the state, which repeat text that was already streamed
+    if chunk.type != "AIMessageChunk" or not isinstance(chunk.content, str):
+        return None
+    return chunk.content or None
+
+
+class TurnStats:
+    """Timing of one streamed turn."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.tokens = 0  # Streamed chunks; OpenAI-compatible servers send about one token per chunk
+
+    def record_token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        self.tokens += 1
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from the start of the turn to the first visible token."""
+        return self.first_token - self.started if self.first_token is not None else None
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Generation speed after the first token."""
+        if self.first_token is None or self.finished is None or self.tokens < 2:
+            return None
+        elapsed = self.finished - self.first_token
+        return (self.tokens - 1) / elapsed if elapsed > 0 else None
+
+    def summary(self) -> str:
+        total = (self.finished or time.perf_counter()) - self.started
+        if self.ttft is None:
+            return f"[No tokens streamed, {total:.2f}s total]"
+        speed = f"{self.tokens_per_second:.1f} tok/s" if self.tokens_per_second else "- tok/s"
+        return f"[TTFT {self.ttft:.2f}s, {self.tokens} tokens, {speed}, {total:.2f}s total]"
+
+
+def stream_turn(graph, state: Dict[str, Any], on_token: Callable[[str], None],
+                hidden_nodes=HIDDEN_NODES) -> Tuple[Dict[str, Any], TurnStats]:
+    """Run one turn through ``graph``, passing visible tokens to ``on_token`` as they arrive.
+
+    Returns the final graph state and the turn's timing. Answers that were produced
+    without streaming (e.g. a speculative specialist result) produce no tokens; the
+    caller should show the final response in that case.
+    """
+    stats = TurnStats()
+    final_state: Dict[str, Any] = {}
+    for mode, payload in graph.stream(state, stream_mode=["messages", "values"]):
+        if mode == "values":
+            final_state = payload
+            continue
+        chunk, metadata = payload
+        text = token_text(chunk, metadata, hidden_nodes)
+        if text is not None:
+            stats.record_token()
+            on_token(text)
+    stats.finish()
+    return final_state, stats
+
+
+def print_token(text: str) -> None:
+    """Print a token without a newline and flush so it shows up immediately."""
+    print(text, end="", flush=True)
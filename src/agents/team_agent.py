@@ -3,6 +3,8 @@
 Team agent implementation with multiple specialized agents working together with LM Studio model.
 """
 
+import os
+
 # Load environment variables from .env file
 try:
     from dotenv import load_dotenv
@@ -12,39 +14,247 @@ except ImportError:
     print("python-dotenv not installed. Run: pip install python-dotenv")
 
 # Import LangChain components
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.messages import AnyMessage, SystemMessage, HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableLambda
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 
 # Import LangGraph components for orchestration and memory
 from langgraph.graph import END, StateGraph
-from typing import Dict, Any, TypedDict, Optional, List
+from langgraph.graph.message import add_messages
+from typing import Annotated, Dict, Any, TypedDict, Optional, List
 
-# Import tools
+# Import the model factory and tools
+from src.llm.factory import create_llm, get_base_url
+from src.llm.semantic_cache import SemanticCache
 from src.tools.search_tools import search_web
-from src.tools.weather_tools import get_current_weather
-from src.tools.math_tools import calculate
+from src.tools.weather_tools import get_current_weather, get_weather_batch
+from src.tools.math_tools import calculate, calculate_batch
+
+# Import routing helpers
+from src.agents.routing import FastRouter, parse_agent_name
+from src.agents.route_classifier import RouteModel, RoutingLog
+from src.agents.memory import ConversationMemory, summary_messages
+from src.agents.parallel_executor import ParallelAgentExecutor
+from src.agents.speculative import SpeculativeRunner
+from src.agents.streaming import print_token, stream_turn
 
 # Define the state type for our LangGraph
 class TeamState(TypedDict):
     """State for the multi-agent conversation."""
-    messages: List[Dict[str, Any]]  # The conversation history
+    # The conversation history; nodes return only new messages, which add_messages appends
+    messages: Annotated[List[AnyMessage], add_messages]
     user_input: Optional[str]       # The current user input
     current_agent: Optional[str]    # The agent currently processing
     final_response: Optional[str]   # The final response to the user
+    summary: Optional[str]          # Rolling summary of turns dropped from messages
+
+# The specialist each tool belongs to (used to derive the route in fused mode)
+TOOL_ROUTES = {
+    "search_web": "research",
+    "calculate": "math",
+    "calculate_batch": "math",
+    "get_current_weather": "weather",
+    "get_weather_batch": "weather",
+}
+
+# Team modes supported by create_team
+TEAM_MODES = ("router", "fused")
+
+# Specialists whose answers depend only on the query, so they can be served from the semantic cache
+# (weather answers go stale within hours and the conversation agent depends on the history)
+SEMANTIC_CACHE_AGENTS = ("research", "math")
+
+def create_specialist(llm, system_message: SystemMessage, tools: List[Any],
+                      return_intermediate_steps: bool = False) -> AgentExecutor:
+    """Build a tool-using specialist pipeline (prompt, agent and executor) once.
+
+    The returned executor keeps no per-call state, so one instance can be shared
+    across turns and across concurrent sessions; the history is passed in through
+    the ``chat_history`` placeholder on every call. Tool calls the model makes in
+    one turn run concurrently (see ``ParallelAgentExecutor``).
+    """
+    
+    # Create the prompt skeleton for the specialist
+    prompt = ChatPromptTemplate.from_messages([
+        system_message,
+        MessagesPlaceholder(variable_name="chat_history"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ])
+    
+    # Create the agent (this serializes the tool schemas once)
+    agent = create_openai_tools_agent(llm, tools, prompt)
+    
+    # Create the agent executor (tool calls of one turn run concurrently)
+    return ParallelAgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=False,
+        handle_parsing_errors=True,
+        return_intermediate_steps=return_intermediate_steps
+    )
+
+def conversation_history(state: TeamState) -> List[Any]:
+    """Build the history for a model call: the summary of earlier turns, then the recent turns.
+
+    The state already holds LangChain messages, so the history is passed through as is.
+    """
+    return summary_messages(state) + state["messages"]
+
+def response_update(output: str) -> Dict[str, Any]:
+    """Build the state update for a final answer: the response and its assistant message."""
+    return {"final_response": output, "messages": [AIMessage(content=output)]}
+
+def specialist_input(state: TeamState) -> Dict[str, Any]:
+    """Build the executor input (current query and history) from the team state."""
+    return {
+        "input": state["user_input"],
+        "chat_history": conversation_history(state),
+    }
+
+def create_specialist_node(agent_executor: AgentExecutor) -> RunnableLambda:
+    """Wrap a specialist executor as a graph node with sync and async implementations."""
+    
+    def specialist_node(state: TeamState) -> Dict[str, Any]:
+        response = agent_executor.invoke(specialist_input(state))
+        return response_update(response["output"])
+    
+    async def aspecialist_node(state: TeamState) -> Dict[str, Any]:
+        response = await agent_executor.ainvoke(specialist_input(state))
+        return response_update(response["output"])
+    
+    return RunnableLambda(specialist_node, afunc=aspecialist_node)
+
+def is_standalone_turn(state: TeamState) -> bool:
+    """Whether the turn has no earlier conversation, so its answer depends on the query alone."""
+    return not state.get("summary") and len(state["messages"]) <= 1
+
+def create_cached_node(agent_name: str, node: RunnableLambda, semantic_cache: SemanticCache) -> RunnableLambda:
+    """Wrap a specialist node so answers to near-duplicate queries come from ``semantic_cache``.
+    
+    Only standalone turns use the cache: a follow-up such as "and double that" is
+    answered from the chat history, so its text alone doesn't identify the answer.
+    """
+    
+    def cached_node(state: TeamState) -> Dict[str, Any]:
+        if not is_standalone_turn(state):
+            return node.invoke(state)
+        cached = semantic_cache.lookup(agent_name, state["user_input"])
+        if cached is not None:
+            return response_update(cached)
+        update = node.invoke(state)
+        if update["final_response"]:
+            semantic_cache.store(agent_name, state["user_input"], update["final_response"])
+        return update
+    
+    async def acached_node(state: TeamState) -> Dict[str, Any]:
+        if not is_standalone_turn(state):
+            return await node.ainvoke(state)
+        cached = semantic_cache.lookup(agent_name, state["user_input"])
+        if cached is not None:
+            return response_update(cached)
+        update = await node.ainvoke(state)
+        if update["final_response"]:
+            semantic_cache.store(agent_name, state["user_input"], update["final_response"])
+        return update
+    
+    return RunnableLambda(cached_node, afunc=acached_node)
+
+def create_fused_team(llm):
+    """Create the single-call team: one agent sees every specialist tool.
 
-def create_team():
-    """Create a team of agents with the local LM Studio model using LangGraph for orchestration."""
-    
-    # Initialize the model with LM Studio
-    llm = ChatOpenAI(
-        model_name="local-model",
-        openai_api_base="http://localhost:1234/v1",
-        openai_api_key="not-needed",
-        temperature=0.7
+    The router and specialist generations are fused into one LLM call. The tool
+    the model picks implies the route, which is still recorded in ``current_agent``
+    (``conversation`` when no tool is used).
+    """
+    
+    # A compact role prompt that covers all specialists
+    fused_system_message = SystemMessage(content=(
+        "You are an AI assistant team with four specialists:\n"
+        "- Research: factual questions; use search_web\n"
+        "- Math: calculations and numerical problems; use calculate (calculate_batch for many values)\n"
+        "- Weather: weather questions; use get_current_weather (get_weather_batch for several locations)\n"
+        "- Conversation: greetings, opinions and chit-chat; answer directly without tools, "
+        "and acknowledge users by name when they introduce themselves\n\n"
+        "Pick the single specialist that fits the query and use only its tool."
+    ))
+    
+    # Build one executor with every specialist tool
+    fused_executor = create_specialist(
+        llm, fused_system_message, [search_web, calculate, calculate_batch, get_current_weather, get_weather_batch],
+        return_intermediate_steps=True,
     )
     
+    # Turn the executor output into the state update
+    def fused_update(response: Dict[str, Any]) -> Dict[str, Any]:
+        # The first tool used decides which specialist handled the query
+        steps = response["intermediate_steps"]
+        agent_name = TOOL_ROUTES.get(steps[0][0].tool, "conversation") if steps else "conversation"
+        
+        # Return the final response and the implied route
+        return {"current_agent": agent_name, **response_update(response["output"])}
+    
+    # Define the fused team node (sync and async versions)
+    def fused_agent(state: TeamState) -> Dict[str, Any]:
+        return fused_update(fused_executor.invoke(specialist_input(state)))
+    
+    async def afused_agent(state: TeamState) -> Dict[str, Any]:
+        return fused_update(await fused_executor.ainvoke(specialist_input(state)))
+    
+    # Create the graph with a single node
+    workflow = StateGraph(TeamState)
+    workflow.add_node("team", RunnableLambda(fused_agent, afunc=afused_agent))
+    workflow.set_entry_point("team")
+    workflow.add_edge("team", END)
+    
+    # Compile the graph
+    return workflow.compile()
+
+def create_team(llm=None, mode: str = "router", fast_routing: bool = True, fast_router: Optional[FastRouter] = None,
+                route_model: Optional[RouteModel] = None, routing_log: Optional[RoutingLog] = None,
+                speculative: bool = False, speculative_agent: str = "conversation",
+                speculative_runner: Optional[SpeculativeRunner] = None,
+                semantic_cache: Optional[SemanticCache] = None,
+                semantic_cache_agents=SEMANTIC_CACHE_AGENTS):
+    """Create a team of agents with the local LM Studio model using LangGraph for orchestration.
+
+    Every specialist pipeline is built once here. The compiled graph holds no
+    per-session state, so a single team can serve all turns and concurrent sessions.
+    Every node has a native async implementation, so the graph supports ``ainvoke``,
+    ``astream`` and ``astream_events`` with many sessions on one event loop.
+    Pass ``llm`` to use a different chat model (e.g. in benchmarks).
+
+    ``mode="fused"`` builds the single-call team from ``create_fused_team`` instead of
+    the router + specialist graph; the routing options below only apply to the
+    default ``mode="router"``.
+
+    With ``fast_routing`` enabled, obvious queries are routed by ``fast_router``
+    (a default ``FastRouter`` if none is given) without an LLM call; pass your own
+    instance to read its hit/fallback counters. Queries the fast path is unsure
+    about are next offered to ``route_model`` (a learned classifier) and only then
+    to the LLM router. Every decision is appended to ``routing_log`` if given, which
+    is the training data for ``route_model``.
+
+    With ``speculative`` enabled, the most likely specialist (the fast router's best
+    guess, or ``speculative_agent``) starts concurrently with the LLM router; its result
+    is used if the router agrees and discarded otherwise. Pass your own
+    ``speculative_runner`` to read the hit rate and wasted-work ratio.
+
+    With a ``semantic_cache``, the specialists in ``semantic_cache_agents`` answer
+    paraphrases of earlier queries from the cache instead of calling the model
+    (first turns of a conversation only; follow-ups depend on the history).
+    """
+    
+    # Initialize the model with LM Studio (or LOCAL_MODEL_BASE_URL)
+    if llm is None:
+        llm = create_llm(temperature=0.7)
+    
+    # The fused team replaces the router and specialists with one call
+    if mode not in TEAM_MODES:
+        raise ValueError(f"Unknown team mode {mode!r}; expected one of {TEAM_MODES}")
+    if mode == "fused":
+        return create_fused_team(llm)
+    
     # Each agent will use its own specific tools
     
     # Create the system messages for each agent
@@ -68,12 +278,15 @@ def create_team():
     
     math_system_message = SystemMessage(content=(
         "You are the Math Agent, specialized in solving mathematical problems and performing calculations. "
-        "Use the calculate tool to solve mathematical expressions. Provide step-by-step explanations when appropriate."
+        "Use the calculate tool to solve mathematical expressions. When the same expression is needed for many values, "
+        "or for statistics over a list of numbers, make one calculate_batch call with named variables instead of "
+        "many calculate calls. Provide step-by-step explanations when appropriate."
     ))
     
     weather_system_message = SystemMessage(content=(
         "You are the Weather Agent, specialized in providing weather information. "
-        "Use the get_current_weather tool to retrieve weather data. Be specific about locations and conditions."
+        "Use the get_current_weather tool to retrieve weather data, or get_weather_batch to look up several "
+        "locations in one call. Be specific about locations and conditions."
     ))
     
     conversation_system_message = SystemMessage(content=(
@@ -82,183 +295,168 @@ def create_team():
         "When users introduce themselves, acknowledge them by name in your response."
     ))
     
-    # Define the router agent function
-    def router_agent(state: TeamState) -> Dict[str, Any]:
-        # Get the user's input
-        user_input = state["user_input"]
+    # Set up the deterministic fast-path router
+    if not fast_routing:
+        fast_router = None
+    elif fast_router is None:
+        fast_router = FastRouter()
+    
+    # Set up speculative execution of the most likely specialist
+    if not speculative:
+        speculative_runner = None
+    elif speculative_runner is None:
+        speculative_runner = SpeculativeRunner()
+    
+    # Build the specialist pipelines once
+    research_executor = create_specialist(llm, research_system_message, [search_web])
+    math_executor = create_specialist(llm, math_system_message, [calculate, calculate_batch])
+    weather_executor = create_specialist(llm, weather_system_message, [get_current_weather, get_weather_batch])
+    conversation_prompt = ChatPromptTemplate.from_messages([
+        conversation_system_message,
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{input}"),
+    ])
+    conversation_chain = conversation_prompt | llm
+    
+    # Record a routing decision and return the state update
+    def record_route(user_input: str, agent_name: str, source: str) -> Dict[str, Any]:
+        if routing_log is not None:
+            routing_log.write(user_input, agent_name, source)
+        return {"current_agent": agent_name, "final_response": None}
+    
+    # Route with the fast path and then the learned classifier; None means ask the LLM
+    def pre_route(user_input: str) -> Optional[Dict[str, Any]]:
+        # Skip the LLM round trip when the fast path is confident
+        if fast_router is not None:
+            agent_name = fast_router.route(user_input)
+            if agent_name is not None:
+                return record_route(user_input, agent_name, "fast")
         
-        # Create messages for the router
-        router_messages = [
+        # Then try the learned routing classifier
+        if route_model is not None:
+            agent_name = route_model.route(user_input)
+            if agent_name is not None:
+                return record_route(user_input, agent_name, "model")
+        return None
+    
+    # Pick the specialist to run speculatively while the LLM router decides
+    def guess_agent(user_input: str) -> str:
+        if fast_router is not None:
+            decision = fast_router.classify(user_input)
+            if decision.confidence > 0:
+                return decision.agent
+        return speculative_agent
+    
+    # Create messages for the router
+    def router_messages(user_input: str) -> List[Any]:
+        return [
             router_system_message,
             HumanMessage(content=f"Route this query to the appropriate agent: '{user_input}'")
         ]
-        
-        # Get the routing decision
-        response = llm.invoke(router_messages)
-        agent_name = response.content.strip()
-        
-        # Normalize the agent name
-        if "research" in agent_name.lower():
-            return {"current_agent": "research"}
-        elif "math" in agent_name.lower():
-            return {"current_agent": "math"}
-        elif "weather" in agent_name.lower():
-            return {"current_agent": "weather"}
-        else:
-            return {"current_agent": "conversation"}
-    
-    # Define the research agent function
-    def research_agent(state: TeamState) -> Dict[str, Any]:
-        # Get the user's input and conversation history
-        user_input = state["user_input"]
-        messages = state["messages"]
-        
-        # Convert messages to the correct format
-        formatted_messages = [
-            HumanMessage(content=msg["content"]) if msg["role"] == "user" else
-            SystemMessage(content=msg["content"]) if msg["role"] == "system" else
-            HumanMessage(content=msg["content"])
-            for msg in messages
-        ]
-        
-        # Create the prompt for the research agent
-        prompt = ChatPromptTemplate.from_messages([
-            research_system_message,
-            *formatted_messages,
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
-        
-        # Create the agent
-        agent = create_openai_tools_agent(llm, [search_web], prompt)
-        
-        # Create the agent executor
-        agent_executor = AgentExecutor(
-            agent=agent,
-            tools=[search_web],
-            verbose=False,
-            handle_parsing_errors=True,
-            return_intermediate_steps=False
-        )
-        
-        # Run the agent
-        response = agent_executor.invoke({"input": user_input})
-        
-        # Return the final response
-        return {"final_response": response["output"]}
     
-    # Define the math agent function
-    def math_agent(state: TeamState) -> Dict[str, Any]:
-        # Get the user's input and conversation history
+    # Define the router agent function
+    def router_agent(state: TeamState) -> Dict[str, Any]:
+        # Get the user's input
         user_input = state["user_input"]
-        messages = state["messages"]
         
-        # Convert messages to the correct format
-        formatted_messages = [
-            HumanMessage(content=msg["content"]) if msg["role"] == "user" else
-            SystemMessage(content=msg["content"]) if msg["role"] == "system" else
-            HumanMessage(content=msg["content"])
-            for msg in messages
-        ]
+        # Try the local routers first
+        update = pre_route(user_input)
+        if update is not None:
+            return update
         
-        # Create the prompt for the math agent
-        prompt = ChatPromptTemplate.from_messages([
-            math_system_message,
-            *formatted_messages,
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
+        # Start the most likely specialist while the LLM router decides
+        speculation = None
+        if speculative_runner is not None:
+            guess = guess_agent(user_input)
+            speculation = speculative_runner.start(guess, specialist_nodes[guess].invoke, state)
         
-        # Create the agent
-        agent = create_openai_tools_agent(llm, [calculate], prompt)
-        
-        # Create the agent executor
-        agent_executor = AgentExecutor(
-            agent=agent,
-            tools=[calculate],
-            verbose=False,
-            handle_parsing_errors=True,
-            return_intermediate_steps=False
-        )
+        # Get the routing decision
+        response = llm.invoke(router_messages(user_input))
         
-        # Run the agent
-        response = agent_executor.invoke({"input": user_input})
+        # Normalize the agent name
+        agent_name = parse_agent_name(response.content)
+        update = record_route(user_input, agent_name, "llm")
         
-        # Return the final response
-        return {"final_response": response["output"]}
+        # Use the speculative result if the router agreed with the guess
+        if speculation is not None:
+            result = speculation.resolve(agent_name)
+            if result is not None:
+                update.update(result)
+        return update
     
-    # Define the weather agent function
-    def weather_agent(state: TeamState) -> Dict[str, Any]:
-        # Get the user's input and conversation history
+    # Define the async router agent function
+    async def arouter_agent(state: TeamState) -> Dict[str, Any]:
+        # Get the user's input
         user_input = state["user_input"]
-        messages = state["messages"]
         
-        # Convert messages to the correct format
-        formatted_messages = [
-            HumanMessage(content=msg["content"]) if msg["role"] == "user" else
-            SystemMessage(content=msg["content"]) if msg["role"] == "system" else
-            HumanMessage(content=msg["content"])
-            for msg in messages
-        ]
+        # Try the local routers first
+        update = pre_route(user_input)
+        if update is not None:
+            return update
         
-        # Create the prompt for the weather agent
-        prompt = ChatPromptTemplate.from_messages([
-            weather_system_message,
-            *formatted_messages,
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
+        # Start the most likely specialist as a task while the LLM router decides
+        speculation = None
+        if speculative_runner is not None:
+            guess = guess_agent(user_input)
+            speculation = speculative_runner.start_async(guess, specialist_nodes[guess].ainvoke, state)
         
-        # Create the agent
-        agent = create_openai_tools_agent(llm, [get_current_weather], prompt)
-        
-        # Create the agent executor
-        agent_executor = AgentExecutor(
-            agent=agent,
-            tools=[get_current_weather],
-            verbose=False,
-            handle_parsing_errors=True,
-            return_intermediate_steps=False
-        )
+        # Get the routing decision
+        response = await llm.ainvoke(router_messages(user_input))
         
-        # Run the agent
-        response = agent_executor.invoke({"input": user_input})
+        # Normalize the agent name
+        agent_name = parse_agent_name(response.content)
+        update = record_route(user_input, agent_name, "llm")
         
-        # Return the final response
-        return {"final_response": response["output"]}
+        # Use the speculative result if the router agreed, otherwise cancel it
+        if speculation is not None:
+            result = await speculation.resolve(agent_name)
+            if result is not None:
+                update.update(result)
+        return update
     
     # Define the conversation agent function
+    def conversation_input(state: TeamState) -> Dict[str, Any]:
+        return {
+            "chat_history": conversation_history(state),
+            "input": state["user_input"],
+        }
+    
     def conversation_agent(state: TeamState) -> Dict[str, Any]:
-        # Get the user's input and conversation history
-        user_input = state["user_input"]
-        messages = state["messages"]
-        
-        # Create a list of messages for the conversation agent
-        conversation_messages = [
-            conversation_system_message,
-            *[HumanMessage(content=msg["content"]) if msg["role"] == "user" else
-              SystemMessage(content=msg["content"]) if msg["role"] == "system" else
-              HumanMessage(content=msg["content"])
-              for msg in messages],
-            HumanMessage(content=user_input)
-        ]
-        
         # Get the response directly (no tools needed)
-        response = llm.invoke(conversation_messages)
-        
-        # Return the final response
-        return {"final_response": response.content}
+        response = conversation_chain.invoke(conversation_input(state))
+        return response_update(response.content)
+    
+    async def aconversation_agent(state: TeamState) -> Dict[str, Any]:
+        response = await conversation_chain.ainvoke(conversation_input(state))
+        return response_update(response.content)
+    
+    # Map agent names to their nodes (also used for speculative execution)
+    specialist_nodes = {
+        "research": create_specialist_node(research_executor),
+        "math": create_specialist_node(math_executor),
+        "weather": create_specialist_node(weather_executor),
+        "conversation": RunnableLambda(conversation_agent, afunc=aconversation_agent),
+    }
+    
+    # Serve near-duplicate queries from the semantic cache
+    if semantic_cache is not None:
+        for agent_name in semantic_cache_agents:
+            specialist_nodes[agent_name] = create_cached_node(agent_name, specialist_nodes[agent_name], semantic_cache)
     
     # Define the conditional edge function to route to the appropriate agent
     def route_to_agent(state: TeamState) -> str:
+        # A confirmed speculative result already answered the query
+        if state.get("final_response") is not None:
+            return "done"
         return state["current_agent"]
     
     # Create the graph
     workflow = StateGraph(TeamState)
     
     # Add the nodes
-    workflow.add_node("router", router_agent)
-    workflow.add_node("research", research_agent)
-    workflow.add_node("math", math_agent)
-    workflow.add_node("weather", weather_agent)
-    workflow.add_node("conversation", conversation_agent)
+    workflow.add_node("router", RunnableLambda(router_agent, afunc=arouter_agent))
+    for agent_name, agent_node in specialist_nodes.items():
+        workflow.add_node(agent_name, agent_node)
     
     # Set the entry point
     workflow.set_entry_point("router")
@@ -271,7 +469,8 @@ def create_team():
             "research": "research",
             "math": "math",
             "weather": "weather",
-            "conversation": "conversation"
+            "conversation": "conversation",
+            "done": END
         }
     )
     
@@ -286,18 +485,49 @@ def create_team():
     
     return app
 
-def chat_loop():
-    """Run an interactive chat loop with the agent team using LangGraph for orchestration."""
+def chat_loop(speculative: bool = False, mode: str = "router", stream: bool = False,
+              max_history_tokens: int = 2000):
+    """Run an interactive chat loop with the agent team using LangGraph for orchestration.
+
+    With ``stream=True`` the specialist's tokens are printed as they are generated and
+    each turn reports its time to first token (TTFT) and tokens per second. Once the
+    history exceeds ``max_history_tokens``, older turns are folded into a summary.
+    """
     
     print("\n=== LM Studio Agent Team Chat ===")
     print("Type 'exit' or 'quit' to end the conversation.")
     
+    memory = None
+    semantic_cache = None
     try:
         # Create the agent team
-        team = create_team()
+        fast_router = FastRouter()
+        speculative_runner = SpeculativeRunner() if speculative else None
+        
+        # Use a trained routing model and log routing decisions if configured
+        model_path = os.environ.get("ROUTER_MODEL_PATH")
+        log_path = os.environ.get("ROUTER_LOG_PATH")
+        
+        # Answer paraphrased queries from the semantic cache if configured ("memory" or an .npz path)
+        semantic_cache_setting = os.environ.get("SEMANTIC_CACHE")
+        if semantic_cache_setting:
+            semantic_cache = SemanticCache(None if semantic_cache_setting == "memory" else semantic_cache_setting)
+        
+        team = create_team(
+            mode=mode,
+            fast_router=fast_router,
+            route_model=RouteModel(model_path) if model_path else None,
+            routing_log=RoutingLog(log_path) if log_path else None,
+            speculative=speculative,
+            speculative_runner=speculative_runner,
+            semantic_cache=semantic_cache,
+        )
+        
+        # Keep the history within budget; summaries are written in the background
+        memory = ConversationMemory(create_llm(temperature=0.0), max_tokens=max_history_tokens)
         
         # Initialize the conversation state
-        state = {"messages": []}
+        state = {"messages": [], "summary": None}
         
         # Chat loop
         while True:
@@ -309,29 +539,44 @@ def chat_loop():
                 print("\nAI: Goodbye! Have a great day!")
                 break
             
+            # Fold older turns into the summary if a background summary has finished
+            memory.prepare(state)
+            
             # Add the user message to the state
-            state["messages"].append({"role": "user", "content": user_input})
+            state["messages"].append(HumanMessage(content=user_input))
             
             # Update the state with the user input
             state["user_input"] = user_input
             
             # Get response from agent team
             try:
-                # Invoke the team with the current state
-                new_state = team.invoke(state)
-                
-                # Get the final response
-                agent_response = new_state["final_response"]
+                if stream:
+                    # Print specialist tokens as they arrive; the router's output is hidden
+                    print("\nAI: ", end="", flush=True)
+                    new_state, turn_stats = stream_turn(team, state, print_token)
+                    agent_response = new_state["final_response"]
+                    
+                    # Answers produced without streaming (e.g. a speculative result) are printed whole
+                    print(agent_response if turn_stats.tokens == 0 else "")
+                else:
+                    # Invoke the team with the current state
+                    new_state = team.invoke(state)
+                    agent_response = new_state["final_response"]
+                    
+                    # Display the response
+                    print(f"\nAI: {agent_response}")
                 
-                # Add the agent's response to the messages
-                state["messages"].append({"role": "assistant", "content": agent_response})
+                # The graph appended the agent's response to the messages
+                state["messages"] = new_state["messages"]
                 
-                # Display the response
-                print(f"\nAI: {agent_response}")
+                # Start summarizing older turns now that the response has been shown
+                memory.update(state)
                 
                 # Display which agent handled the query (for demonstration purposes)
                 agent_name = new_state["current_agent"].capitalize()
                 print(f"[Handled by {agent_name} Agent]")
+                if stream:
+                    print(turn_stats.summary())
                 
             except Exception as e:
                 print(f"\nError: {str(e)}")
@@ -341,12 +586,44 @@ def chat_loop():
         print("\n\nConversation ended by user.")
     except Exception as e:
         print(f"\n\nAn error occurred: {str(e)}")
+    else:
+        # Show how many routing decisions skipped the LLM router
+        if mode == "router":
+            stats = fast_router.stats()
+            print(f"\n[Fast-path router: {stats['hits']} hits, {stats['fallbacks']} fallbacks "
+                  f"({stats['hit_rate']:.0%} hit rate)]")
+        if speculative_runner is not None:
+            stats = speculative_runner.stats.stats()
+            print(f"[Speculation: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['wasted_work_ratio']:.0%} of speculative work wasted]")
+    
+    if memory is not None:
+        memory.close()
+    if semantic_cache is not None:
+        stats = semantic_cache.stats()
+        print(f"[Semantic cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries]")
+        if semantic_cache.path:
+            semantic_cache.save()
     
     print("\nThank you for chatting!")
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Chat with the LM Studio agent team.")
+    parser.add_argument("--speculative", action="store_true",
+                        help="Run the most likely specialist concurrently with the router")
+    parser.add_argument("--mode", choices=TEAM_MODES, default="router",
+                        help="'router' routes then runs a specialist; 'fused' does both in one LLM call")
+    parser.add_argument("--stream", action="store_true",
+                        help="Print tokens as they are generated and report TTFT and tokens/sec")
+    parser.add_argument("--max-history-tokens", type=int, default=2000,
+                        help="Token budget for the history before older turns are summarized")
+    args = parser.parse_args()
+    
     # Check if LM Studio is running
-    print("Connecting to LM Studio at http://localhost:1234/v1...")
+    print(f"Connecting to LM Studio at {get_base_url()}...")
     
     # Start the chat loop
-    chat_loop()
+    chat_loop(speculative=args.speculative, mode=args.mode, stream=args.stream,
+              max_history_tokens=args.max_history_tokens)
@@ -0,0 +1,3 @@
+"""
+Offline batch execution of queries through the agent graphs.
+"""
@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+"""
+Run a JSONL file of queries through the agent team (or the single agent) offline.
+
+Each input line is a JSON object with a ``query`` and optionally an ``id`` (the
+line number by default) and a ``session_id``. Queries with the same session run
+one after another, in file order, as turns of one conversation; all others run
+concurrently up to ``--concurrency`` at a time. The input is read as a stream,
+so files of any size can be processed.
+
+Each result is appended to the output JSONL as soon as it is known, in input
+order (the default) or in completion order (``--order completion``):
+
+    {"id": 3, "query": "...", "status": "ok", "response": "...", "agent": "math", "latency_ms": 812.4}
+
+Failed queries get ``"status": "error"`` and an ``"error"`` message. Progress,
+throughput and p50/p95/p99 latency are printed while the batch runs. The history
+of a session is kept within ``--max-history-tokens`` by folding older turns into
+a summary, as in the chat loops. Running the same command again after an
+interruption resumes it: queries that already have an ``ok`` result are skipped,
+and the conversation history of their sessions is rebuilt from the output. Failed
+queries are retried, so the output can then hold more than one line for an id
+(the last one wins).
+
+Usage:
+    python -m src.batch.runner queries.jsonl -o results.jsonl --concurrency 8
+    python -m src.batch.runner queries.jsonl -o results.jsonl --graph agent --order completion
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.agents.memory import ConversationMemory
+from src.utils.metrics import LatencyRecorder, format_summary
+
+ORDERS = ("input", "completion")
+GRAPHS = ("team", "agent")
+
+
+def read_queries(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the input records with their ``id`` filled in (the 1-based line number by default)."""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict) or not isinstance(record.get("query"), str):
+                raise ValueError(f"{path}:{line_number}: expected an object with a 'query' string")
+            record.setdefault("id", line_number)
+            yield record
+
+
+def load_completed(path: str) -> Tuple[Set[str], Dict[str, List[Any]]]:
+    """Read an earlier output: the ids with an ``ok`` result and the history of each session.
+
+    A line cut short by an interruption is removed so new results start on a fresh line.
+    """
+    done: Set[str] = set()
+    histories: Dict[str, List[Any]] = {}
+    if not os.path.exists(path):
+        return done, histories
+
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+    for line in data.splitlines():
+        try:
+            result = json.loads(line)
+        except ValueError:
+            continue
+        if result.get("status") != "ok":
+            continue
+        done.add(str(result["id"]))
+        if result.get("session_id") is not None:
+            histories.setdefault(str(result["session_id"]), []).extend(
+                [HumanMessage(content=result["query"]), AIMessage(content=result["response"])])
+    return done, histories
+
+
+class BatchSession:
+    """Conversation history shared by the queries of one ``session_id``."""
+
+    def __init__(self, messages: Optional[List[Any]] = None, memory: Optional[ConversationMemory] = None):
+        self.state: Dict[str, Any] = {"messages": messages or [], "summary": None}
+        self.memory = memory  # Keeps the history within budget (None keeps every turn)
+        self.lock = asyncio.Lock()  # Turns run one at a time, in the order they were started
+
+
+class BatchRunner:
+    """Runs queries through a compiled graph with bounded concurrency; see the module docstring."""
+
+    def __init__(self, graph, kind: str = "team", concurrency: int = 8, order: str = "input",
+                 timeout: float = 300.0, progress_interval: float = 10.0, window: Optional[int] = None,
+                 memory_llm=None, max_history_tokens: int = 2000):
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order {order!r}; expected one of {', '.join(ORDERS)}")
+        self.graph = graph
+        self.kind = kind
+        self.concurrency = concurrency
+        self.order = order
+        self.timeout = timeout
+        self.progress_interval = progress_interval
+        # Results started but not yet written; in input order a slow query holds back the ones after it
+        self.window = window or concurrency * 8
+        # Session histories are summarized by this model on one shared thread (None keeps every turn)
+        self.memory_llm = memory_llm
+        self.max_history_tokens = max_history_tokens
+        self._memory_executor: Optional[ThreadPoolExecutor] = None
+        self.latencies = LatencyRecorder()
+        self.errors = 0
+        self.skipped = 0
+
+    async def _answer(self, record: Dict[str, Any], session: Optional[BatchSession],
+                      slots: asyncio.Semaphore) -> Dict[str, Any]:
+        """Run one query and build its result line."""
+        result = {"id": record["id"], "query": record["query"]}
+        if session is not None:
+            result["session_id"] = record["session_id"]
+        state = {"messages": [HumanMessage(content=record["query"])], "summary": None, "user_input": record["query"]}
+        if session is not None:
+            # Fold older turns into the summary if a background summary has finished
+            if session.memory is not None:
+                session.memory.prepare(session.state)
+            state["messages"] = session.state["messages"] + state["messages"]
+            state["summary"] = session.state["summary"]
+
+        async with slots:
+            started = time.perf_counter()
+            try:
+                output = await asyncio.wait_for(self.graph.ainvoke(state), self.timeout)
+            except asyncio.TimeoutError:
+                self.errors += 1
+                result.update(status="error", error=f"No answer within {self.timeout:g} seconds")
+                return result
+            except Exception as e:
+                self.errors += 1
+                result.update(status="error", error=f"{type(e).__name__}: {e}")
+                return result
+            seconds = time.perf_counter() - started
+
+        self.latencies.record(seconds)
+        if session is not None:
+            session.state["messages"] = output["messages"]
+            if session.memory is not None:
+                session.memory.update(session.state)
+        if self.kind == "team":
+            result.update(status="ok", response=output["final_response"], agent=output["current_agent"])
+        else:
+            result.update(status="ok", response=output["agent_output"])
+        result["latency_ms"] = round(seconds * 1000, 1)
+        return result
+
+    def _new_memory(self) -> Optional[ConversationMemory]:
+        if self.memory_llm is None:
+            return None
+        return ConversationMemory(self.memory_llm, max_tokens=self.max_history_tokens, executor=self._memory_executor)
+
+    async def _run_one(self, record, session, slots, emit) -> None:
+        if session is None:
+            emit(await self._answer(record, None, slots))
+            return
+        async with session.lock:
+            emit(await self._answer(record, session, slots))
+
+    async def _report_progress(self) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            self.print_progress()
+
+    def print_progress(self) -> None:
+        print(f"[batch] {format_summary(self.latencies.summary())}, {self.errors} errors, {self.skipped} skipped")
+
+    async def run(self, input_path: str, output_path: str, resume: bool = True) -> Dict[str, Any]:
+        """Process ``input_path`` into ``output_path`` and return the latency summary."""
+        if resume:
+            done, histories = load_completed(output_path)
+        else:
+            done, histories = set(), {}
+            open(output_path, "w").close()
+        if self.memory_llm is not None and self._memory_executor is None:
+            self._memory_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory")
+        sessions = {session_id: BatchSession(messages, self._new_memory())
+                    for session_id, messages in histories.items()}
+
+        slots = asyncio.Semaphore(self.concurrency)
+        window = asyncio.Semaphore(self.window)
+        buffered: Dict[int, Optional[Dict[str, Any]]] = {}
+        next_index = 0
+        self.latencies = LatencyRecorder()
+        self.errors = self.skipped = 0
+        progress = asyncio.ensure_future(self._report_progress())
+        tasks = set()
+
+        with open(output_path, "a", encoding="utf-8") as out:
+            def write(result: Optional[Dict[str, Any]]) -> None:
+                if result is not None:
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    out.flush()
+                    window.release()
+
+            def emitter(index: int):
+                # Input order buffers results until every earlier one has been written
+                def emit(result: Optional[Dict[str, Any]]) -> None:
+                    nonlocal next_index
+                    if self.order == "completion":
+                        write(result)
+                        return
+                    buffered[index] = result
+                    while next_index in buffered:
+                        write(buffered.pop(next_index))
+                        next_index += 1
+                return emit
+
+            try:
+                for index, record in enumerate(read_queries(input_path)):
+                    if str(record["id"]) in done:
+                        self.skipped += 1
+                        emitter(index)(None)
+                        continue
+                    await window.acquire()
+                    session = None
+                    if record.get("session_id") is not None:
+                        session_id = str(record["session_id"])
+                        if session_id not in sessions:
+                            sessions[session_id] = BatchSession(memory=self._new_memory())
+                        session = sessions[session_id]
+                    task = asyncio.ensure_future(self._run_one(record, session, slots, emitter(index)))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if tasks:
+                    await asyncio.gather(*tasks)
+            finally:
+                progress.cancel()
+                for task in tasks:
+                    task.cancel()
+                if self._memory_executor is not None:
+                    self._memory_executor.shutdown(wait=False, cancel_futures=True)
+                    self._memory_executor = None
+
+        summary = self.latencies.summary()
+        summary.update(errors=self.errors, skipped=self.skipped)
+        return summary
+
+
+def build_graph(kind: str, mode: str = "router", speculative: bool = False):
+    """Build the team (``kind="team"``) or the single agent with the configured model."""
+    from src.llm.factory import create_llm
+
+    llm = create_llm(temperature=0.7)
+    if kind == "team":
+        from src.agents.team_agent import create_team
+        return create_team(llm=llm, mode=mode, speculative=speculative)
+    from src.agents.single_agent import create_agent
+    return create_agent(llm=llm)
+
+
+def main():
+    from src.agents.team_agent import TEAM_MODES
+    from src.llm.factory import create_llm, get_base_url
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of queries")
+    parser.add_argument("-o", "--output", help="JSONL file for the results (default: <input>.results.jsonl)")
+    parser.add_argument("--graph", choices=GRAPHS, default="team", help="Run through the team or the single agent")
+    parser.add_argument("--mode", choices=TEAM_MODES, default="router", help="Team mode")
+    parser.add_argument("--speculative", action="store_true", help="Enable speculative specialist execution")
+    parser.add_argument("--concurrency", type=int, default=8, help="Queries running at the same time")
+    parser.add_argument("--order", choices=ORDERS, default="input", help="Order of the output lines")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds per query")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="Seconds between progress lines")
+    parser.add_argument("--max-history-tokens", type=int, default=2000,
+                        help="Token budget of a session's history; older turns are summarized")
+    parser.add_argument("--restart", action="store_true", help="Overwrite the output instead of resuming")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.input)[0] + ".results.jsonl"
+    print(f"Using the model endpoint at {get_base_url()}")
+    runner = BatchRunner(build_graph(args.graph, args.mode, args.speculative), kind=args.graph,
+                         concurrency=args.concurrency, order=args.order, timeout=args.timeout,
+                         progress_interval=args.progress_interval, memory_llm=create_llm(temperature=0.0),
+                         max_history_tokens=args.max_history_tokens)
+    started = time.perf_counter()
+    try:
+        summary = asyncio.run(runner.run(args.input, output, resume=not args.restart))
+    except KeyboardInterrupt:
+        runner.print_progress()
+        print(f"Interrupted; run the same command again to resume. Results so far are in {output}")
+        return
+    print(f"Finished in {time.perf_counter() - started:.1f}s: {format_summary(summary)}, "
+          f"{summary['errors']} errors, {summary['skipped']} skipped (already done)")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,7 @@ except ImportError:
     print("python-dotenv not installed. Run: pip install python-dotenv")
 
 # Import LangChain components
-from langchain_openai import ChatOpenAI
+from src.llm.factory import create_llm
 from langchain_core.messages import SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
@@ -97,11 +97,7 @@ def main():
         langsmith_enabled = setup_langsmith()
         
         # Initialize the model
-        llm = ChatOpenAI(
-            model_name="local-model",
-            openai_api_base="http://localhost:1234/v1",
-            openai_api_key="not-needed"
-        )
+        llm = create_llm(temperature=None)
         
         # Enable tracing context if LangSmith is configured and available
         trace_context = None
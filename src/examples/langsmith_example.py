@@ -14,7 +14,7 @@ except ImportError:
     print("python-dotenv not installed. Run: pip install python-dotenv")
 
 # Import LangChain components
-from langchain_openai import ChatOpenAI
+from src.llm.factory import create_llm
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
@@ -61,33 +61,8 @@ def setup_langsmith():
     
     return True
 
-def main():
-    """Run a simple chain with LangSmith tracing."""
-    # Check LangSmith setup
-    langsmith_enabled = setup_langsmith()
-    
-    if langsmith_enabled:
-        print("\n=== LANGSMITH TRACING ENABLED ===")
-        print(f"Project: {os.environ.get('LANGSMITH_PROJECT', 'default')}")
-        print("View traces at: https://smith.langchain.com/")
-    
-    # Initialize the model using the local model
-    llm = ChatOpenAI(
-        model_name="local-model",
-        openai_api_base="http://localhost:1234/v1",
-        openai_api_key="not-needed"
-    )
-    
-    # For OpenAI (if you have an API key):
-    # Uncomment these lines and replace with your actual API key
-    # api_key = os.environ.get("OPENAI_API_KEY")
-    # if api_key:
-    #     llm = ChatOpenAI(
-    #         model_name="gpt-3.5-turbo",
-    #         openai_api_key=api_key,
-    #         temperature=0
-    #     )
-    
+def create_poem_chain(llm):
+    """Build the poem-then-sentiment chain; returns a function of the topic."""
     # Step 1: Create a prompt template for poem generation
     poem_prompt = ChatPromptTemplate.from_template(
         "Write a short poem about {topic}. Keep it under 4 lines."
@@ -119,8 +94,33 @@ def main():
             "sentiment_analysis": sentiment
         }
     
+    return generate_poem_and_analyze
+
+def main():
+    """Run a simple chain with LangSmith tracing."""
+    # Check LangSmith setup
+    langsmith_enabled = setup_langsmith()
+    
+    if langsmith_enabled:
+        print("\n=== LANGSMITH TRACING ENABLED ===")
+        print(f"Project: {os.environ.get('LANGSMITH_PROJECT', 'default')}")
+        print("View traces at: https://smith.langchain.com/")
+    
+    # Initialize the model using the local model
+    llm = create_llm(temperature=None)
+    
+    # For OpenAI (if you have an API key):
+    # Uncomment these lines and replace with your actual API key
+    # api_key = os.environ.get("OPENAI_API_KEY")
+    # if api_key:
+    #     llm = ChatOpenAI(
+    #         model_name="gpt-3.5-turbo",
+    #         openai_api_key=api_key,
+    #         temperature=0
+    #     )
+    
     # This is our chain function
-    poem_chain = generate_poem_and_analyze
+    poem_chain = create_poem_chain(llm)
     
     # Run the chain with tracing
     print("\n=== RUNNING CHAIN WITH LANGSMITH TRACING ===")
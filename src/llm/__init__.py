@@ -0,0 +1,3 @@
+"""
+Chat model construction shared by the agents, examples and server.
+"""
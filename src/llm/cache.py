@@ -0,0 +1,221 @@
+"""
+Two-tier response cache for the chat models.
+
+Identical requests (same messages and model parameters) are answered from an
+in-memory LRU tier, then from a SQLite tier that survives restarts, before the
+model is called. The cache plugs into LangChain's ``cache=`` hook, so every call
+path (``invoke``, ``ainvoke``, agents and the team router) uses it.
+
+Keys are built from the message list with per-run fields (message ids, response
+and usage metadata) stripped, so a replayed conversation hits the cache even
+though its messages were created in a different run.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+# Message fields that differ between runs but are not sent to the model
+VOLATILE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+def _strip_volatile(value: Any) -> Any:
+    """Remove per-run fields from the kwargs of serialized LangChain objects."""
+    if isinstance(value, list):
+        return [_strip_volatile(item) for item in value]
+    if isinstance(value, dict):
+        if value.get("lc") == 1 and isinstance(value.get("kwargs"), dict):
+            kwargs = {k: _strip_volatile(v) for k, v in value["kwargs"].items() if k not in VOLATILE_FIELDS}
+            return {**value, "kwargs": kwargs}
+        return {k: _strip_volatile(v) for k, v in value.items()}
+    return value
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Hash the normalized prompt and the model parameters into a cache key."""
+    try:
+        normalized = json.dumps(_strip_volatile(json.loads(prompt)), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        normalized = prompt  # Plain-text prompts from completion models
+    return hashlib.sha256(f"{llm_string}\x00{normalized}".encode("utf-8")).hexdigest()
+
+
+def _dump_generations(generations: Sequence[Any]) -> str:
+    """Serialize generations for the disk tier (chat generations keep their full message)."""
+    items = []
+    for generation in generations:
+        if isinstance(generation, ChatGeneration):
+            items.append({"message": message_to_dict(generation.message), "info": generation.generation_info})
+        else:
+            items.append({"text": generation.text, "info": generation.generation_info})
+    return json.dumps(items)
+
+
+def _load_generations(value: str) -> List[Any]:
+    generations = []
+    for item in json.loads(value):
+        if "message" in item:
+            message = messages_from_dict([item["message"]])[0]
+            generations.append(ChatGeneration(message=message, generation_info=item["info"]))
+        else:
+            generations.append(Generation(text=item["text"], generation_info=item["info"]))
+    return generations
+
+
+def _copy_generations(generations: Sequence[Any]) -> List[Any]:
+    # Callers may mutate the returned messages (e.g. assign ids), so never hand out the cached objects
+    return [generation.model_copy(deep=True) for generation in generations]
+
+
+class ResponseCache(BaseCache):
+    """LRU memory tier in front of an optional SQLite disk tier with TTL and size eviction.
+
+    Args:
+        path: SQLite file for the disk tier, or None for a memory-only cache.
+        max_memory_entries: Responses kept in memory (least recently used are evicted).
+        max_disk_bytes: Approximate size limit of the stored responses on disk.
+        ttl: Seconds a response stays valid, or None to keep responses until evicted.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_entries: int = 1024,
+                 max_disk_bytes: int = 256 * 1024 * 1024, ttl: Optional[float] = 7 * 24 * 3600):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (created, generations)
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "updates": 0,
+                          "expired": 0, "memory_evictions": 0, "disk_evictions": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # One connection shared by all threads; every use is serialized by self._lock
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def _remember(self, key: str, created: float, generations: Sequence[Any]) -> None:
+        """Put an entry in the memory tier (caller holds the lock)."""
+        self._memory[key] = (created, _copy_generations(generations))
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._counters["memory_evictions"] += 1
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return _copy_generations(entry[1])
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, size, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value, size, created = row
+                    if not self._expired(created, now):
+                        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                        generations = _load_generations(value)
+                        self._remember(key, created, generations)
+                        self._counters["disk_hits"] += 1
+                        return generations
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._disk_bytes -= size
+                    self._counters["expired"] += 1
+
+            self._counters["misses"] += 1
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        value = _dump_generations(return_val) if self._db is not None else None
+        with self._lock:
+            self._remember(key, now, return_val)
+            self._counters["updates"] += 1
+            if self._db is None:
+                return
+
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self._disk_bytes += len(value) - (old[0] if old else 0)
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Drop least recently used rows until the disk tier fits its size limit (caller holds the lock)."""
+        while self._disk_bytes > self.max_disk_bytes:
+            rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed LIMIT 64").fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                break
+            for key, size in rows:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._disk_bytes -= size
+                self._counters["disk_evictions"] += 1
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._disk_bytes = 0
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the disk tier and return how many were removed."""
+        if self._db is None or self.ttl is None:
+            return 0
+        with self._lock:
+            cutoff = time.time() - self.ttl
+            removed = self._db.execute("DELETE FROM responses WHERE created < ?", (cutoff,)).rowcount
+            self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._counters["expired"] += removed
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, the hit rate and the size of each tier."""
+        with self._lock:
+            stats = dict(self._counters)
+            lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+            stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_bytes"] = self._disk_bytes
+            return stats
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,304 @@
+"""
+Record/replay cassettes for the chat-completions traffic of the project's models.
+
+A cassette sits in the HTTP client of every ``ChatOpenAI`` built by
+``create_llm`` (when ``LLM_CASSETTE`` is set) and captures each request's
+response, streamed chunks included, with the time each chunk took to arrive.
+Replaying serves the same responses back without a model, either with the
+recorded timing or with none, so benchmarks of graph overhead and routing
+regression runs are offline and deterministic.
+
+Requests are matched on method, path and JSON body (the host is ignored, so a
+cassette recorded against LM Studio replays under any base URL). Identical
+requests recorded several times are replayed in the recorded order, cycling
+when they run out. The file is JSON lines, gzip-compressed when it ends in
+``.gz``, and every interaction is appended as soon as it completes:
+
+    {"key": "...", "method": "POST", "path": "/v1/chat/completions", "status": 200,
+     "content_type": "text/event-stream", "chunks": [[0.212, "data: {...}\\n\\n"], [0.025, "..."]]}
+
+Modes:
+
+- ``record``: call the model for every request and write a fresh cassette
+- ``replay``: only answer from the cassette; unknown requests get a 404 error
+- ``auto``: answer from the cassette when possible, record everything else
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, AsyncIterator, Optional
+
+import httpx
+
+CASSETTE_MODES = ("record", "replay", "auto")
+
+# Replay timing presets for LLM_CASSETTE_LATENCY (any number scales the recorded delays)
+LATENCY_PRESETS = {"original": 1.0, "zero": 0.0}
+
+
+def request_key(request: httpx.Request) -> str:
+    """Hash the method, path and canonical JSON body of a request."""
+    body = request.content
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    except ValueError:
+        pass  # Not JSON: match the raw bytes
+    digest = hashlib.sha256(f"{request.method} {request.url.path}\x00".encode("utf-8"))
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    """Recorded interactions, shared by the sync and async transports; see the module docstring."""
+
+    def __init__(self, path: str, mode: str = "auto", latency: float = 1.0):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {', '.join(CASSETTE_MODES)}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._positions: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+        if mode == "record":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            _open(path, "w").close()
+        elif os.path.exists(path):
+            with _open(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+        elif mode == "replay":
+            raise FileNotFoundError(f"Cassette {path} does not exist; record it first")
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """The next recorded response for ``key``, or None."""
+        if self.mode == "record":
+            return None
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                return None
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            self.hits += 1
+            return entries[position % len(entries)]
+
+    def record(self, key: str, request: httpx.Request, response: httpx.Response, chunks: List[List[Any]]) -> None:
+        entry = {
+            "key": key,
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", "application/json"),
+            "chunks": chunks,
+        }
+        with self._lock:
+            with _open(self.path, "a") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._entries.setdefault(key, []).append(entry)
+            self.recorded += 1
+
+    def miss_response(self, request: httpx.Request) -> httpx.Response:
+        # A 404 is reported by the OpenAI client without retrying
+        return httpx.Response(404, request=request, json={"error": {
+            "message": f"No recorded response for {request.method} {request.url.path} in cassette {self.path}",
+            "type": "cassette_miss"}})
+
+    def replay_headers(self, entry: Dict[str, Any]) -> Dict[str, str]:
+        return {"content-type": entry["content_type"]}
+
+    def delays(self, entry: Dict[str, Any]) -> Iterator[float]:
+        return (delay * self.latency for delay, _ in entry["chunks"])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "hits": self.hits, "misses": self.misses, "recorded": self.recorded,
+                    "interactions": sum(len(entries) for entries in self._entries.values())}
+
+    def transport(self, inner: Optional[httpx.BaseTransport] = None) -> "CassetteTransport":
+        return CassetteTransport(self, inner or httpx.HTTPTransport())
+
+    def async_transport(self, inner: Optional[httpx.AsyncBaseTransport] = None) -> "AsyncCassetteTransport":
+        return AsyncCassetteTransport(self, inner or httpx.AsyncHTTPTransport())
+
+
+def _decode(chunk: bytes) -> str:
+    # A chunk can end inside a multi-byte character; surrogateescape restores the exact bytes
+    return chunk.decode("utf-8", errors="surrogateescape")
+
+
+def _encode(text: str) -> bytes:
+    return text.encode("utf-8", errors="surrogateescape")
+
+
+def _finished(chunks: List[List[Any]]) -> bool:
+    # The OpenAI client closes an event stream at the [DONE] terminator without reading to the end
+    return "".join(text for _, text in chunks[-2:]).rstrip().endswith("data: [DONE]")
+
+
+def _prepare(request: httpx.Request) -> None:
+    # Uncompressed responses can be stored as text
+    request.headers["Accept-Encoding"] = "identity"
+
+
+class _RecordingStream(httpx.SyncByteStream):
+    """Passes a response through while noting each chunk and its delay; records it once fully read (or
+    read up to the ``[DONE]`` of an event stream)."""
+
+    def __init__(self, stream: httpx.SyncByteStream, started: float, on_complete: Callable[[List[List[Any]]], None]):
+        self._stream = stream
+        self._last = started
+        self._on_complete = on_complete
+        self._chunks: List[List[Any]] = []
+        self._complete = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._stream:
+            now = time.perf_counter()
+            self._chunks.append([round(now - self._last, 4), _decode(chunk)])
+            self._last = now
+            yield chunk
+        self._complete = True
+
+    def close(self) -> None:
+        self._stream.close()
+        if self._complete or _finished(self._chunks):
+            self._complete = False
+            self._on_complete(self._chunks)
+            self._chunks = []
+
+
+class _AsyncRecordingStream(httpx.AsyncByteStream):
+    """Async counterpart of ``_RecordingStream``."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, started: float, on_complete: Callable[[List[List[Any]]], None]):
+        self._stream = stream
+        self._last = started
+        self._on_complete = on_complete
+        self._chunks: List[List[Any]] = []
+        self._complete = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            now = time.perf_counter()
+            self._chunks.append([round(now - self._last, 4), _decode(chunk)])
+            self._last = now
+            yield chunk
+        self._complete = True
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+        if self._complete or _finished(self._chunks):
+            self._complete = False
+            self._on_complete(self._chunks)
+            self._chunks = []
+
+
+class _ReplayStream(httpx.SyncByteStream):
+    def __init__(self, cassette: Cassette, entry: Dict[str, Any]):
+        self._cassette = cassette
+        self._entry = entry
+
+    def __iter__(self) -> Iterator[bytes]:
+        for delay, (_, text) in zip(self._cassette.delays(self._entry), self._entry["chunks"]):
+            if delay > 0:
+                time.sleep(delay)
+            yield _encode(text)
+
+
+class _AsyncReplayStream(httpx.AsyncByteStream):
+    def __init__(self, cassette: Cassette, entry: Dict[str, Any]):
+        self._cassette = cassette
+        self._entry = entry
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        import asyncio
+
+        for delay, (_, text) in zip(self._cassette.delays(self._entry), self._entry["chunks"]):
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield _encode(text)
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport that replays from a cassette or records through ``inner``."""
+
+    def __init__(self, cassette: Cassette, inner: httpx.BaseTransport):
+        self.cassette = cassette
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        entry = self.cassette.lookup(key)
+        if entry is not None:
+            return httpx.Response(entry["status"], headers=self.cassette.replay_headers(entry),
+                                  stream=_ReplayStream(self.cassette, entry), request=request)
+        if self.cassette.mode == "replay":
+            return self.cassette.miss_response(request)
+
+        _prepare(request)
+        started = time.perf_counter()
+        response = self.inner.handle_request(request)
+        stream = _RecordingStream(response.stream, started,
+                                  lambda chunks: self.cassette.record(key, request, response, chunks))
+        return httpx.Response(response.status_code, headers=response.headers, stream=stream,
+                              extensions=response.extensions, request=request)
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of ``CassetteTransport``."""
+
+    def __init__(self, cassette: Cassette, inner: httpx.AsyncBaseTransport):
+        self.cassette = cassette
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        entry = self.cassette.lookup(key)
+        if entry is not None:
+            return httpx.Response(entry["status"], headers=self.cassette.replay_headers(entry),
+                                  stream=_AsyncReplayStream(self.cassette, entry), request=request)
+        if self.cassette.mode == "replay":
+            return self.cassette.miss_response(request)
+
+        _prepare(request)
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        stream = _AsyncRecordingStream(response.stream, started,
+                                       lambda chunks: self.cassette.record(key, request, response, chunks))
+        return httpx.Response(response.status_code, headers=response.headers, stream=stream,
+                              extensions=response.extensions, request=request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def parse_latency(setting: Optional[str]) -> float:
+    """``original`` (default), ``zero`` or a number that scales the recorded delays."""
+    if not setting:
+        return 1.0
+    if setting in LATENCY_PRESETS:
+        return LATENCY_PRESETS[setting]
+    return float(setting)
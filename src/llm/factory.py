@@ -0,0 +1,103 @@
+"""
+Factory for the project's ChatOpenAI instances.
+
+Every entry point talks to an OpenAI-compatible endpoint (LM Studio by default). The
+endpoint and model name can be overridden with the ``LOCAL_MODEL_BASE_URL`` and
+``LOCAL_MODEL_NAME`` environment variables, e.g. to point the agents at a local stub.
+
+Setting ``LLM_CACHE`` turns on the shared response cache for every model the factory
+creates: ``LLM_CACHE=memory`` keeps responses in memory only, any other value is the
+path of the SQLite file for the persistent tier (``LLM_CACHE_TTL`` sets the expiry
+in seconds).
+
+Setting ``LLM_CASSETTE`` to a file path records or replays the HTTP traffic of every
+model the factory creates (see ``src.llm.cassette``): ``LLM_CASSETTE_MODE`` is
+``record``, ``replay`` or ``auto`` (the default) and ``LLM_CASSETTE_LATENCY`` replays
+with the ``original`` timing (the default), ``zero`` delay or a scale factor.
+"""
+
+import os
+import threading
+from typing import Any, Optional
+
+from langchain_openai import ChatOpenAI
+from openai import DefaultAsyncHttpxClient, DefaultHttpxClient
+
+from src.llm.cache import ResponseCache
+from src.llm.cassette import Cassette, parse_latency
+
+# Default LM Studio endpoint and model name
+DEFAULT_BASE_URL = "http://localhost:1234/v1"
+DEFAULT_MODEL_NAME = "local-model"
+
+
+def get_base_url() -> str:
+    """Return the configured OpenAI-compatible endpoint."""
+    return os.environ.get("LOCAL_MODEL_BASE_URL") or DEFAULT_BASE_URL
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache configured by ``LLM_CACHE``, or None if it is off."""
+    global _default_cache
+    setting = os.environ.get("LLM_CACHE")
+    if not setting:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            ttl = os.environ.get("LLM_CACHE_TTL")
+            _default_cache = ResponseCache(
+                path=None if setting == "memory" else setting,
+                **({"ttl": float(ttl)} if ttl else {}),
+            )
+        return _default_cache
+
+
+_default_cassette: Optional[Cassette] = None
+_default_cassette_lock = threading.Lock()
+
+
+def get_default_cassette() -> Optional[Cassette]:
+    """Return the process-wide cassette configured by ``LLM_CASSETTE``, or None if it is off."""
+    global _default_cassette
+    path = os.environ.get("LLM_CASSETTE")
+    if not path:
+        return None
+    with _default_cassette_lock:
+        if _default_cassette is None:
+            _default_cassette = Cassette(
+                path,
+                mode=os.environ.get("LLM_CASSETTE_MODE") or "auto",
+                latency=parse_latency(os.environ.get("LLM_CASSETTE_LATENCY")),
+            )
+        return _default_cassette
+
+
+def create_llm(temperature: Optional[float] = 0.7, base_url: Optional[str] = None,
+               model_name: Optional[str] = None, cache: Any = None, **kwargs: Any) -> ChatOpenAI:
+    """Create a ChatOpenAI client for the local model endpoint.
+
+    Pass a ``ResponseCache`` (or any LangChain cache) as ``cache`` to reuse responses
+    to identical requests; by default the cache configured by ``LLM_CACHE`` is used.
+    ``cache=False`` disables caching for this model. When ``LLM_CASSETTE`` is set, the
+    model's HTTP clients record to or replay from that cassette.
+    """
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    if cache is None:
+        cache = get_default_cache()
+    if cache is not None:
+        kwargs["cache"] = cache
+    cassette = get_default_cassette()
+    if cassette is not None:
+        kwargs.setdefault("http_client", DefaultHttpxClient(transport=cassette.transport()))
+        kwargs.setdefault("http_async_client", DefaultAsyncHttpxClient(transport=cassette.async_transport()))
+    return ChatOpenAI(
+        model_name=model_name or os.environ.get("LOCAL_MODEL_NAME") or DEFAULT_MODEL_NAME,
+        openai_api_base=base_url or get_base_url(),
+        openai_api_key="not-needed",  # LM Studio doesn't need a real key
+        **kwargs
+    )
@@ -0,0 +1,266 @@
+"""
+Semantic cache for answers to near-duplicate queries.
+
+Queries are embedded with a hashed bag of content-word and character n-grams (NumPy
+only, no model download) and matched against a dense in-memory index with one
+matrix-vector product. A cached answer is returned when the cosine similarity is
+above the threshold, so paraphrases such as "capital of France?" and "what's
+France's capital" share an answer.
+
+Two guards keep near-misses from being served: entries are only compared within the
+same namespace (e.g. the specialist that answered), and the numbers and arithmetic
+operators, tense and negation of the query must match exactly, so "25 * 16" never
+answers "25 * 17" and "who was ..." never answers "who is ...".
+The index evicts the least recently used entries, expires entries after a TTL, and
+can be saved to and loaded from an ``.npz`` file.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z]+|\d+(?:\.\d+)?|[-+*/^%=<>]")
+LITERAL_PATTERN = re.compile(r"\d+(?:\.\d+)?|[-+*/^%=<>]")
+
+# Words that carry no meaning for matching queries. Negations and the auxiliaries that
+# mark past or future tense are not stopwords: they are matched exactly (see TENSE_WORDS)
+STOPWORDS = frozenset("""
+a an the of in on at to for from by with about as into is are be being am
+do does what whats which who whom how when where why this that these those it its
+i me my you your we our they their he she him her please tell give show can could would
+should may might must like s t just right now today currently there here some
+any get know let us want need
+""".split())
+
+# Words that change the answer without changing the topic: "who is the president" and
+# "who was the president" (or "... is not ...") must not share an answer. Present tense
+# is the default, so "what is" and "tell me" still match. "isn't" is tokenized as "isn t".
+TENSE_WORDS = {"was": "past", "were": "past", "did": "past", "been": "past", "had": "past",
+               "will": "future", "shall": "future"}
+NEGATION_WORDS = frozenset("""
+not no never nor cannot isn aren wasn weren don doesn didn won wouldn shouldn couldn hasn haven hadn
+""".split())
+
+
+class HashedEmbedder:
+    """Embeds text as an L2-normalized hashed bag of content words and character trigrams."""
+
+    def __init__(self, dim: int = 1024, trigram_weight: float = 0.35):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+
+    def content_words(self, text: str) -> List[str]:
+        """Return the words and literals (numbers, operators) of a query without stopwords."""
+        return [token for token in TOKEN_PATTERN.findall(text.lower().replace("'", " "))
+                if token not in STOPWORDS]
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in self.content_words(text):
+            vector[zlib.crc32(f"w:{word}".encode("utf-8")) % self.dim] += 1.0
+            if not word[0].isalpha():
+                continue  # Literals match exactly, so their trigrams add nothing
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                vector[zlib.crc32(f"c:{padded[i:i + 3]}".encode("utf-8")) % self.dim] += self.trigram_weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+def query_signature(text: str) -> int:
+    """Hash what must match exactly between a query and a cached entry.
+
+    That is the numbers and operators of the query, its tense and whether it is negated.
+    """
+    words = TOKEN_PATTERN.findall(text.lower().replace("'", " "))
+    qualifiers = sorted({TENSE_WORDS[word] for word in words if word in TENSE_WORDS}
+                        | ({"negated"} if NEGATION_WORDS.intersection(words) else set()))
+    literals = LITERAL_PATTERN.findall(text.lower())
+    return zlib.crc32(" ".join(literals + ["|"] + qualifiers).encode("utf-8"))
+
+
+class SemanticCache:
+    """Thread-safe nearest-neighbour cache of answers keyed by query meaning.
+
+    Args:
+        path: ``.npz`` file the index is loaded from (if it exists) and saved to.
+        threshold: Minimum cosine similarity for a cached answer to be returned.
+        max_entries: Entries kept before the least recently used one is replaced.
+        ttl: Seconds an answer stays valid, or None to keep answers until evicted.
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: float = 0.9, max_entries: int = 5000,
+                 ttl: Optional[float] = 24 * 3600, embedder: Optional[HashedEmbedder] = None):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embedder = embedder or HashedEmbedder()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._allocate(min(max_entries, 64))
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _allocate(self, capacity: int) -> None:
+        """Create empty index arrays (slots are reused after eviction)."""
+        self._vectors = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+        self._namespaces = np.zeros(capacity, dtype=np.int64)   # Hashed namespace, -1 for a free slot
+        self._namespaces[:] = -1
+        self._signatures = np.zeros(capacity, dtype=np.int64)
+        self._created = np.zeros(capacity, dtype=np.float64)
+        self._accessed = np.zeros(capacity, dtype=np.float64)
+        self._queries: List[Optional[str]] = [None] * capacity
+        self._answers: List[Optional[str]] = [None] * capacity
+        self._size = 0  # Slots in use or freed; slots beyond this have never been used
+
+    def _grow(self) -> None:
+        capacity = min(len(self._answers) * 2, self.max_entries)
+        extra = capacity - len(self._answers)
+        self._vectors = np.vstack([self._vectors, np.zeros((extra, self.embedder.dim), dtype=np.float32)])
+        self._namespaces = np.concatenate([self._namespaces, np.full(extra, -1, dtype=np.int64)])
+        self._signatures = np.concatenate([self._signatures, np.zeros(extra, dtype=np.int64)])
+        self._created = np.concatenate([self._created, np.zeros(extra)])
+        self._accessed = np.concatenate([self._accessed, np.zeros(extra)])
+        self._queries.extend([None] * extra)
+        self._answers.extend([None] * extra)
+
+    @staticmethod
+    def _namespace_id(namespace: str) -> int:
+        return zlib.crc32(namespace.encode("utf-8"))
+
+    def _free_expired(self, now: float) -> None:
+        """Mark expired entries as free slots (caller holds the lock)."""
+        if self.ttl is None:
+            return
+        expired = (self._namespaces[:self._size] >= 0) & (now - self._created[:self._size] > self.ttl)
+        for slot in np.flatnonzero(expired):
+            self._namespaces[slot] = -1
+            self._queries[slot] = self._answers[slot] = None
+
+    def _search(self, namespace: str, query: str, now: float) -> Tuple[int, float]:
+        """Return the best matching slot and its similarity, or (-1, 0.0) (caller holds the lock)."""
+        if self._size == 0:
+            return -1, 0.0
+        candidates = ((self._namespaces[:self._size] == self._namespace_id(namespace))
+                      & (self._signatures[:self._size] == query_signature(query)))
+        if self.ttl is not None:
+            candidates &= now - self._created[:self._size] <= self.ttl
+        if not candidates.any():
+            return -1, 0.0
+        similarities = self._vectors[:self._size] @ self.embedder.embed(query)
+        similarities[~candidates] = -1.0
+        best = int(np.argmax(similarities))
+        return best, float(similarities[best])
+
+    def lookup(self, namespace: str, query: str) -> Optional[str]:
+        """Return the cached answer for a query with the same meaning, or None."""
+        now = time.time()
+        with self._lock:
+            slot, similarity = self._search(namespace, query, now)
+            if slot < 0 or similarity < self.threshold:
+                self.misses += 1
+                return None
+            self._accessed[slot] = now
+            self.hits += 1
+            return self._answers[slot]
+
+    def store(self, namespace: str, query: str, answer: str) -> None:
+        """Cache an answer, replacing a near-identical entry or the least recently used one."""
+        now = time.time()
+        vector = self.embedder.embed(query)
+        if not vector.any():
+            return  # Nothing to match on (e.g. only stopwords)
+        with self._lock:
+            self._free_expired(now)
+            slot, similarity = self._search(namespace, query, now)
+            if slot < 0 or similarity < 0.999:
+                slot = self._free_slot()
+            self._vectors[slot] = vector
+            self._namespaces[slot] = self._namespace_id(namespace)
+            self._signatures[slot] = query_signature(query)
+            self._created[slot] = self._accessed[slot] = now
+            self._queries[slot] = query
+            self._answers[slot] = answer
+
+    def _free_slot(self) -> int:
+        """Return an unused slot, growing the index or evicting the least recently used entry."""
+        free = np.flatnonzero(self._namespaces[:self._size] < 0)
+        if len(free):
+            return int(free[0])
+        if self._size == len(self._answers) and self._size < self.max_entries:
+            self._grow()
+        if self._size < len(self._answers):
+            self._size += 1
+            return self._size - 1
+        self.evictions += 1
+        return int(np.argmin(self._accessed[:self._size]))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int((self._namespaces[:self._size] >= 0).sum())
+
+    def stats(self) -> Dict[str, Any]:
+        # One consistent snapshot; the lock is not reentrant, so entries are counted here, not via len()
+        with self._lock:
+            entries = int((self._namespaces[:self._size] >= 0).sum())
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "evictions": evictions,
+        }
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the live entries to an ``.npz`` file."""
+        path = path or self.path
+        with self._lock:
+            live = np.flatnonzero(self._namespaces[:self._size] >= 0)
+            metadata = {
+                "dim": self.embedder.dim,
+                "queries": [self._queries[i] for i in live],
+                "answers": [self._answers[i] for i in live],
+            }
+            arrays = {
+                "vectors": self._vectors[live],
+                "namespaces": self._namespaces[live],
+                "signatures": self._signatures[live],
+                "created": self._created[live],
+                "accessed": self._accessed[live],
+            }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(path, metadata=np.array(json.dumps(metadata)), **arrays)
+
+    def load(self, path: str) -> None:
+        """Replace the index with the entries saved in ``path``."""
+        with np.load(path) as data:
+            metadata = json.loads(str(data["metadata"]))
+            if metadata["dim"] != self.embedder.dim:
+                raise ValueError(f"{path} was saved with dim={metadata['dim']}, expected {self.embedder.dim}")
+            count = min(len(metadata["answers"]), self.max_entries)
+            # Keep the most recently used entries if the file holds more than max_entries
+            keep = np.argsort(data["accessed"])[::-1][:count]
+            with self._lock:
+                self._allocate(max(count, min(self.max_entries, 64)))
+                self._vectors[:count] = data["vectors"][keep]
+                self._namespaces[:count] = data["namespaces"][keep]
+                self._signatures[:count] = data["signatures"][keep]
+                self._created[:count] = data["created"][keep]
+                self._accessed[:count] = data["accessed"][keep]
+                for slot, index in enumerate(keep):
+                    self._queries[slot] = metadata["queries"][index]
+                    self._answers[slot] = metadata["answers"][index]
+                self._size = count
@@ -0,0 +1,3 @@
+"""
+Local full-text search over a document corpus, used by the search tool.
+"""
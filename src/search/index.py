@@ -0,0 +1,480 @@
+#!/usr/bin/env python
+"""
+BM25 search index over a local document corpus.
+
+An index is a directory of immutable segments (see ``src.search.segment``) plus a
+``manifest.json`` that lists the live segments, their tombstones (deleted
+documents) and the corpus files that have been indexed. Updates never rewrite a
+segment: new and changed files go into a new segment, and the documents of changed
+or removed files are tombstoned in the old ones. ``compact`` merges segments and
+drops tombstoned documents. Readers pick up a new manifest on their next query.
+
+The corpus is a directory of ``.txt``/``.md`` files (one document each; the first
+line is the title) and ``.jsonl`` files (one ``{"id", "title", "text"}`` document
+per line).
+
+Usage:
+    python -m src.search.index build data/corpus --index data/search_index
+    python -m src.search.index update data/corpus --index data/search_index
+    python -m src.search.index query "capital of australia" --index data/search_index
+    python -m src.search.index compact --index data/search_index
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.search.segment import IMPACT_SCALE, Segment, build_segment, merge_segments, term_hash, tokenize
+
+MANIFEST = "manifest.json"
+CORPUS_EXTENSIONS = (".txt", ".md", ".jsonl")
+
+# Documents per segment written by build/update, and the target size for compaction
+DEFAULT_SEGMENT_DOCS = 250_000
+
+
+def scan_corpus(root: str) -> Dict[str, List[int]]:
+    """Return ``{relative path: [mtime_ns, size]}`` for every corpus file under ``root``."""
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(CORPUS_EXTENSIONS):
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                files[os.path.relpath(path, root).replace(os.sep, "/")] = [stat.st_mtime_ns, stat.st_size]
+    return files
+
+
+def read_source(root: str, source: str) -> Iterable[Dict[str, Any]]:
+    """Yield the documents of one corpus file."""
+    path = os.path.join(root, source)
+    with open(path, encoding="utf-8") as f:
+        if source.endswith(".jsonl"):
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    record = json.loads(line)
+                    yield {"id": str(record.get("id", f"{source}:{line_number}")),
+                           "title": record.get("title", ""), "text": record.get("text", "")}
+        else:
+            text = f.read()
+            title = next((line.strip().lstrip("#").strip() for line in text.splitlines() if line.strip()), "")
+            yield {"id": source, "title": title, "text": text}
+
+
+def score_segment(segment: Segment, starts: np.ndarray, ends: np.ndarray, bounds: np.ndarray,
+                  weights: np.ndarray, k: int, threshold: float = 0.0,
+                  deleted: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the top ``k`` live documents of one segment and their BM25 scores.
+
+    ``starts``/``ends`` are the postings ranges of the query terms, ``bounds`` their
+    largest impact in this segment and ``weights`` their IDFs divided by the impact
+    scale. Documents that cannot score above ``threshold`` (the k-th best score of
+    the segments searched before) may be left out.
+
+    Long posting lists are skipped where possible (MaxScore): lists whose combined
+    upper bounds cannot lift a document above the k-th best score are not scanned,
+    only probed for the documents found in the other lists that are close enough to
+    the cut to need their contribution.
+    """
+    terms = [i for i in range(len(starts)) if starts[i] < ends[i]]
+    if not terms:
+        return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.float32)
+    upper = {i: float(bounds[i] * weights[i]) for i in terms}
+    terms.sort(key=upper.get)
+
+    # Any document's partial score is a lower bound of its score, so the k-th best
+    # impact of the most selective list is a safe threshold to start from (unless
+    # some of those documents are deleted)
+    best = terms[-1]
+    impacts = segment.postings_impacts[starts[best]:ends[best]]
+    if deleted is None and len(impacts) >= k:
+        threshold = max(threshold, float(np.partition(impacts, -k)[-k]) * float(weights[best]))
+
+    # Lists with the lowest upper bounds that together cannot beat the threshold (the
+    # most selective list is always scanned, as the threshold may come from it)
+    reach = np.cumsum([upper[i] for i in terms])
+    split = min(int(np.searchsorted(reach, threshold, side="right")), len(terms) - 1)
+    optional, essential = terms[:split], terms[split:]
+
+    docs = [segment.postings_docs[starts[i]:ends[i]] for i in essential]
+    scores = [segment.postings_impacts[starts[i]:ends[i]] * weights[i] for i in essential]
+    if len(essential) == 1:
+        docs, scores = docs[0], scores[0]
+    else:
+        # Sum the scores of documents that match several lists
+        docs = np.concatenate(docs)
+        order = np.argsort(docs, kind="stable")  # Merges the already sorted lists
+        docs = docs[order]
+        first = np.flatnonzero(np.concatenate(([True], docs[1:] != docs[:-1])))
+        docs, scores = docs[first], np.add.reduceat(np.concatenate(scores)[order], first)
+    if deleted is not None:
+        keep = ~deleted[docs]
+        docs, scores = docs[keep], scores[keep]
+
+    if optional and len(docs):
+        # Probe the skipped lists only for documents that could still make the cut
+        if len(scores) >= k:
+            threshold = max(threshold, float(np.partition(scores, -k)[-k]))
+        candidates = np.flatnonzero(scores + reach[split - 1] > threshold)
+        for i in optional:
+            postings = segment.postings_docs[starts[i]:ends[i]]
+            positions = np.minimum(np.searchsorted(postings, docs[candidates]), len(postings) - 1)
+            hit = postings[positions] == docs[candidates]
+            scores[candidates[hit]] += segment.postings_impacts[starts[i] + positions[hit]] * weights[i]
+
+    if len(docs) > k:
+        top = np.argpartition(scores, -k)[-k:]
+        return docs[top], scores[top]
+    return docs, scores
+
+
+def manifest_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime, size) of an index's manifest, which changes with every write; None if there is none."""
+    try:
+        stat = os.stat(os.path.join(path, MANIFEST))
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _Snapshot:
+    """The segments and collection statistics of one manifest generation."""
+
+    def __init__(self, segments: List[Segment], deleted: List[Optional[np.ndarray]]):
+        self.segments = segments
+        self.deleted = deleted  # Boolean mask per segment, or None without tombstones
+        self.n_docs = sum(segment.n_docs - (int(mask.sum()) if mask is not None else 0)
+                          for segment, mask in zip(segments, deleted))
+        # Tombstoned documents still count towards the BM25 statistics (as their postings
+        # do towards document frequencies) until compaction
+        self.total_docs = sum(segment.n_docs for segment in segments)
+        self.avg_length = sum(segment.meta["total_length"] for segment in segments) / max(self.total_docs, 1)
+
+
+class SearchIndex:
+    """A segmented BM25 index stored in ``path``.
+
+    Queries are thread-safe and lock-free: they run against an immutable snapshot
+    that is swapped when the manifest changes. Writes (``add_documents``,
+    ``delete_sources``, ``update_from_corpus``, ``compact``) assume a single writer.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._manifest_stamp: Optional[Tuple[int, int]] = None
+        self._manifest: Dict[str, Any] = {"segments": [], "sources": {}, "generation": 0, "next_segment": 1}
+        self._snapshot = _Snapshot([], [])
+        self.refresh()
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, MANIFEST))
+
+    def version(self) -> Optional[Tuple[int, int]]:
+        """Changes whenever the index on disk does; cheap enough to check before every query."""
+        return manifest_stamp(self.path)
+
+    def refresh(self) -> None:
+        """Reopen the index if another process (or this one) wrote a new manifest."""
+        stamp = manifest_stamp(self.path)
+        if stamp is None:
+            return
+        if stamp == self._manifest_stamp:
+            return
+        with self._lock:
+            if stamp == self._manifest_stamp:
+                return
+            with open(os.path.join(self.path, MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+            self._open(manifest)
+            self._manifest_stamp = stamp
+
+    def _open(self, manifest: Dict[str, Any]) -> None:
+        """Switch to a manifest, reusing segments that are already open (caller holds the lock)."""
+        opened = {segment.name: segment for segment in self._snapshot.segments}
+        segments, deleted = [], []
+        for entry in manifest["segments"]:
+            segment = opened.get(entry["name"]) or Segment(os.path.join(self.path, entry["name"]))
+            mask = None
+            if entry.get("tombstones"):
+                mask = np.zeros(segment.n_docs, dtype=bool)
+                mask[np.load(os.path.join(segment.path, entry["tombstones"]))] = True
+            segments.append(segment)
+            deleted.append(mask)
+        self._manifest = manifest
+        # Segments dropped from the manifest are closed when the last query using them finishes
+        self._snapshot = _Snapshot(segments, deleted)
+
+    def _commit(self, manifest: Dict[str, Any]) -> None:
+        """Atomically write a new manifest and switch to it (caller holds the lock)."""
+        manifest["generation"] += 1
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = os.path.join(self.path, MANIFEST + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST))
+        self._open(manifest)
+        stat = os.stat(os.path.join(self.path, MANIFEST))
+        self._manifest_stamp = (stat.st_mtime_ns, stat.st_size)
+
+    def __len__(self) -> int:
+        return self._snapshot.n_docs
+
+    # Queries
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Return the top ``k`` documents for ``query`` as dicts with ``id``, ``title``, ``text`` and ``score``."""
+        self.refresh()
+        snapshot = self._snapshot
+        tokens = tokenize(query)
+        if not tokens or not snapshot.segments:
+            return []
+        hashes = np.unique(np.fromiter((term_hash(token) for token in tokens), dtype=np.uint64, count=len(tokens)))
+
+        # Collection-wide document frequencies, so scores are comparable across segments
+        lookups = [segment.lookup(hashes) for segment in snapshot.segments]
+        df = sum(ends - starts for starts, ends, _ in lookups)
+        n = max(snapshot.total_docs, 1)
+        weights = (np.log1p((n - df + 0.5) / (df + 0.5)) / IMPACT_SCALE).astype(np.float32)
+
+        # The k-th best score so far lets later segments skip documents that cannot make the cut
+        best_scores, best_refs = np.zeros(0, dtype=np.float32), []
+        threshold = 0.0
+        for number, (segment, deleted, (starts, ends, bounds)) in enumerate(
+                zip(snapshot.segments, snapshot.deleted, lookups)):
+            docs, scores = score_segment(segment, starts, ends, bounds, weights, k, threshold, deleted)
+            best_scores = np.concatenate([best_scores, scores])
+            best_refs.extend((number, int(doc)) for doc in docs)
+            if len(best_refs) > k:
+                top = np.argpartition(best_scores, -k)[-k:]
+                best_scores, best_refs = best_scores[top], [best_refs[i] for i in top]
+            if len(best_refs) == k:
+                threshold = float(best_scores.min())
+        if not best_refs:
+            return []
+
+        results = []
+        for i in np.argsort(-best_scores, kind="stable"):
+            number, doc = best_refs[i]
+            document = snapshot.segments[number].document(doc)
+            document["score"] = float(best_scores[i])
+            results.append(document)
+        return results
+
+    # Writes
+
+    def add_documents(self, documents: Sequence[Dict[str, Any]], sources: Sequence[str]) -> Optional[str]:
+        """Index documents (with the corpus file each came from) into a new segment; returns its name."""
+        if not documents:
+            return None
+        with self._lock:
+            manifest = json.loads(json.dumps(self._manifest))
+            name = f"seg-{manifest['next_segment']:06d}"
+            manifest["next_segment"] += 1
+            os.makedirs(self.path, exist_ok=True)
+            build_segment(os.path.join(self.path, name), documents, sources)
+            manifest["segments"].append({"name": name, "tombstones": None})
+            self._commit(manifest)
+            return name
+
+    def delete_sources(self, sources: Iterable[str]) -> int:
+        """Tombstone every document that came from one of ``sources``; returns how many were deleted."""
+        sources = set(sources)
+        deleted = 0
+        replaced = []
+        with self._lock:
+            manifest = json.loads(json.dumps(self._manifest))
+            for entry, segment, mask in zip(manifest["segments"], self._snapshot.segments, self._snapshot.deleted):
+                numbers = [i for i, source in enumerate(segment.sources) if source in sources]
+                if not numbers:
+                    continue
+                new_mask = np.isin(segment.doc_sources, numbers)
+                if mask is not None:
+                    new_mask |= mask
+                    deleted -= int(mask.sum())
+                deleted += int(new_mask.sum())
+                name = f"tombstones-{manifest['generation'] + 1}.npy"
+                np.save(os.path.join(segment.path, name), np.flatnonzero(new_mask).astype(np.uint32))
+                if entry["tombstones"]:
+                    replaced.append(os.path.join(segment.path, entry["tombstones"]))
+                entry["tombstones"] = name
+            if deleted:
+                self._commit(manifest)
+        # Readers load tombstones into memory when they open a manifest, so old files can go
+        for path in replaced:
+            os.remove(path)
+        return deleted
+
+    def update_from_corpus(self, root: str, segment_docs: int = DEFAULT_SEGMENT_DOCS,
+                           select: Optional[Callable[[str], bool]] = None) -> Dict[str, int]:
+        """Bring the index in line with the corpus directory ``root``.
+
+        Files that are new or whose size or modification time changed are (re)indexed,
+        and the documents of changed and removed files are tombstoned. ``select``
+        limits the index to the corpus files (relative paths) it returns True for.
+        """
+        current = scan_corpus(root)
+        if select is not None:
+            current = {source: stamp for source, stamp in current.items() if select(source)}
+        indexed = self._manifest.get("sources", {})
+        changed = [source for source, stamp in current.items() if indexed.get(source) != stamp]
+        removed = [source for source in indexed if source not in current]
+        # Changed files are deleted even if the manifest does not list them yet, in case an
+        # earlier update was interrupted after indexing them
+        deleted = self.delete_sources(changed + removed)
+
+        added = 0
+        batch, batch_sources = [], []
+        for source in sorted(changed):
+            for document in read_source(root, source):
+                batch.append(document)
+                batch_sources.append(source)
+                if len(batch) >= segment_docs:
+                    added += len(batch)
+                    print(f"Indexing {len(batch)} documents ({added} so far)")
+                    self.add_documents(batch, batch_sources)
+                    batch, batch_sources = [], []
+        if batch:
+            added += len(batch)
+            self.add_documents(batch, batch_sources)
+
+        with self._lock:
+            manifest = json.loads(json.dumps(self._manifest))
+            manifest["sources"] = current
+            self._commit(manifest)
+        return {"files_changed": len(changed), "files_removed": len(removed),
+                "documents_added": added, "documents_deleted": deleted}
+
+    def compact(self, max_segment_docs: int = DEFAULT_SEGMENT_DOCS) -> int:
+        """Merge segments and drop tombstoned documents; returns the number of segments afterwards.
+
+        Consecutive segments are merged while their live documents fit in
+        ``max_segment_docs``; a segment without tombstones that is left on its own is
+        kept as it is.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            manifest = json.loads(json.dumps(self._manifest))
+            groups: List[List[int]] = []
+            size = 0
+            for i, (segment, mask) in enumerate(zip(snapshot.segments, snapshot.deleted)):
+                live = segment.n_docs - (int(mask.sum()) if mask is not None else 0)
+                if groups and size + live <= max_segment_docs:
+                    groups[-1].append(i)
+                    size += live
+                else:
+                    groups.append([i])
+                    size = live
+
+            entries, obsolete = [], []
+            for group in groups:
+                if len(group) == 1 and snapshot.deleted[group[0]] is None:
+                    entries.append(manifest["segments"][group[0]])
+                    continue
+                segments = [snapshot.segments[i] for i in group]
+                masks = [~snapshot.deleted[i] if snapshot.deleted[i] is not None
+                         else np.ones(snapshot.segments[i].n_docs, dtype=bool) for i in group]
+                obsolete.extend(segment.path for segment in segments)
+                if not any(mask.any() for mask in masks):
+                    continue  # Every document was deleted
+                name = f"seg-{manifest['next_segment']:06d}"
+                manifest["next_segment"] += 1
+                merge_segments(os.path.join(self.path, name), segments, masks)
+                entries.append({"name": name, "tombstones": None})
+
+            manifest["segments"] = entries
+            self._commit(manifest)
+        # Open readers keep their mmaps of removed segments until they reopen the index
+        for path in obsolete:
+            shutil.rmtree(path, ignore_errors=True)
+        return len(entries)
+
+    def close(self) -> None:
+        """Close the segments and release their memory maps (the next query reopens them)."""
+        with self._lock:
+            segments = self._snapshot.segments
+            self._snapshot = _Snapshot([], [])
+            self._manifest_stamp = None
+        for segment in segments:
+            segment.close()
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "documents": snapshot.n_docs,
+            "deleted": sum(int(mask.sum()) for mask in snapshot.deleted if mask is not None),
+            "segments": len(snapshot.segments),
+            "terms": sum(segment.meta["terms"] for segment in snapshot.segments),
+            "postings": sum(segment.meta["postings"] for segment in snapshot.segments),
+            "avg_length": round(snapshot.avg_length, 1),
+        }
+
+
+def build_index(corpus: str, path: str, segment_docs: int = DEFAULT_SEGMENT_DOCS) -> SearchIndex:
+    """Build a fresh index of ``corpus`` in ``path``, replacing any index already there."""
+    if os.path.exists(path):
+        if os.listdir(path) and not SearchIndex.exists(path):
+            raise ValueError(f"{path} exists and is not a search index")
+        shutil.rmtree(path)
+    index = SearchIndex(path)
+    index.update_from_corpus(corpus, segment_docs)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default="data/search_index", help="Index directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Index a corpus directory from scratch")
+    build_parser.add_argument("corpus", help="Directory of .txt, .md and .jsonl files")
+    build_parser.add_argument("--segment-docs", type=int, default=DEFAULT_SEGMENT_DOCS)
+
+    update_parser = subparsers.add_parser("update", help="Index new and changed corpus files")
+    update_parser.add_argument("corpus")
+    update_parser.add_argument("--segment-docs", type=int, default=DEFAULT_SEGMENT_DOCS)
+
+    query_parser = subparsers.add_parser("query", help="Search the index")
+    query_parser.add_argument("query")
+    query_parser.add_argument("-k", type=int, default=5, help="Number of results")
+
+    compact_parser = subparsers.add_parser("compact", help="Merge segments and drop deleted documents")
+    compact_parser.add_argument("--max-segment-docs", type=int, default=DEFAULT_SEGMENT_DOCS)
+
+    subparsers.add_parser("stats", help="Show index statistics")
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "build":
+        index = build_index(args.corpus, args.index, args.segment_docs)
+        print(f"Built {args.index} in {time.perf_counter() - start:.1f}s: {index.stats()}")
+    elif args.command == "update":
+        index = SearchIndex(args.index)
+        changes = index.update_from_corpus(args.corpus, args.segment_docs)
+        print(f"Updated {args.index} in {time.perf_counter() - start:.1f}s: {changes}")
+    elif args.command == "compact":
+        index = SearchIndex(args.index)
+        segments = index.compact(args.max_segment_docs)
+        print(f"Compacted {args.index} to {segments} segments in {time.perf_counter() - start:.1f}s")
+    elif args.command == "stats":
+        print(json.dumps(SearchIndex(args.index).stats(), indent=2))
+    else:
+        index = SearchIndex(args.index)
+        start = time.perf_counter()
+        results = index.search(args.query, args.k)
+        elapsed = time.perf_counter() - start
+        for result in results:
+            print(f"{result['score']:.3f}  {result['id']}  {result['title'] or result['text'][:80]}")
+        print(f"{len(results)} results in {elapsed * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Immutable on-disk index segments.
+
+A segment is a directory of flat NumPy arrays that are opened with ``mmap`` and
+never rewritten, so opening an index costs a few ``open`` calls however large it
+is, and only the pages a query touches are read:
+
+    terms.npy          uint64  sorted 64-bit hashes of the indexed terms
+    term_offsets.npy   int64   postings of term i are [term_offsets[i], term_offsets[i + 1])
+    term_max_impacts.npy uint8 largest impact in each term's postings (for query pruning)
+    postings_docs.npy  uint32  segment-local document numbers, ascending within a term
+    postings_tfs.npy   uint16  term frequency of the term in that document
+    postings_impacts.npy uint8 the BM25 term-frequency factor of the posting, quantized
+    doc_lengths.npy    uint32  number of indexed terms per document
+    doc_sources.npy    uint32  index into meta.json "sources" (the file a document came from)
+    doc_offsets.npy    int64   byte offsets of each document's record in docs.jsonl
+    docs.jsonl                 one {"id", "title", "text"} record per document
+    meta.json                  counts and the list of source files
+
+Terms are stored as hashes rather than strings, which keeps the dictionary a
+single sorted array that is searched with ``np.searchsorted``; with 64-bit hashes
+collisions are negligible. The length-normalized BM25 term-frequency factor is
+precomputed per posting at write time (with the segment's average document
+length), so a query only multiplies it by each term's IDF. Deletions are recorded outside the segment as
+tombstones (see ``src.search.index``).
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import unicodedata
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+# BM25 parameters baked into the precomputed impacts
+K1 = 1.2
+B = 0.75
+IMPACT_SCALE = 255 / (K1 + 1)  # Impacts are below K1 + 1 and stored as uint8
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+# Words too common to be useful for ranking; dropping them keeps posting lists short
+STOPWORDS = frozenset("""
+a an and are as at be been but by can do does for from had has have he her his how i if in into is it
+its me my no not of on or our she so than that the their them then there these they this to too us
+was we were what when where which who why will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase ``text`` and split it into indexable words, without stopwords or accents."""
+    text = text.lower()
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return [token for token in TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+
+@lru_cache(maxsize=65536)
+def term_hash(term: str) -> int:
+    """Stable 64-bit hash of a term (Python's ``hash`` differs between processes)."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def invert(token_lists: Iterable[Sequence[str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Turn tokenized documents into postings.
+
+    Returns ``(term_hashes, docs, tfs, doc_lengths)`` with one entry per distinct
+    (term, document) pair, sorted by term hash and then document. Documents are
+    consumed one at a time and only their term ids are kept, so a generator of
+    token lists is inverted without holding every token string in memory.
+    """
+    vocabulary: Dict[str, int] = {}
+    term_ids = array("q")
+    doc_lengths = array("I")
+    for tokens in token_lists:
+        term_ids.extend([vocabulary.setdefault(token, len(vocabulary)) for token in tokens])
+        doc_lengths.append(len(tokens))
+    n_docs = max(len(doc_lengths), 1)
+    doc_lengths = np.frombuffer(doc_lengths, dtype=np.uint32)
+    doc_ids = np.repeat(np.arange(len(doc_lengths), dtype=np.int64), doc_lengths)
+
+    # Count each (term, document) pair; the combined key sorts by term id, then document
+    pairs, tfs = np.unique(np.frombuffer(term_ids, dtype=np.int64) * n_docs + doc_ids, return_counts=True)
+    del term_ids, doc_ids
+    term_ids, docs = np.divmod(pairs, n_docs)
+
+    # Reorder by term hash; the sort is stable so documents stay ascending within a term
+    hashes = np.fromiter((term_hash(term) for term in vocabulary), dtype=np.uint64, count=len(vocabulary))
+    posting_hashes = hashes[term_ids]
+    order = np.argsort(posting_hashes, kind="stable")
+    return (posting_hashes[order], docs[order].astype(np.uint32),
+            np.minimum(tfs[order], np.iinfo(np.uint16).max).astype(np.uint16), doc_lengths)
+
+
+def write_segment(path: str, posting_hashes: np.ndarray, docs: np.ndarray, tfs: np.ndarray,
+                  doc_lengths: np.ndarray, records: Iterable[bytes], doc_sources: np.ndarray,
+                  sources: List[str]) -> Dict[str, Any]:
+    """Write a segment directory from postings sorted by (term hash, document).
+
+    ``records`` yields one encoded JSON line per document. The segment is written to
+    a temporary directory and renamed into place, so readers never see it half-written.
+    Returns the segment's metadata.
+    """
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    terms, starts = np.unique(posting_hashes, return_index=True)
+    term_offsets = np.append(starts, len(posting_hashes)).astype(np.int64)
+
+    # BM25 term-frequency factor tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+    avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 1.0
+    norms = K1 * (1.0 - B + B * doc_lengths.astype(np.float32) / max(avg_length, 1.0))
+    tf = tfs.astype(np.float32)
+    impacts = tf * (K1 + 1.0) / (tf + norms[docs])
+    impacts = np.clip(np.rint(impacts * IMPACT_SCALE), 1, 255).astype(np.uint8)
+    max_impacts = np.maximum.reduceat(impacts, starts) if len(impacts) else np.zeros(0, dtype=np.uint8)
+
+    doc_offsets = np.zeros(len(doc_lengths) + 1, dtype=np.int64)
+    with open(os.path.join(tmp_path, "docs.jsonl"), "wb") as f:
+        for i, record in enumerate(records):
+            f.write(record)
+            doc_offsets[i + 1] = doc_offsets[i] + len(record)
+
+    arrays = {
+        "terms": terms.astype(np.uint64),
+        "term_offsets": term_offsets,
+        "term_max_impacts": max_impacts,
+        "postings_docs": docs.astype(np.uint32),
+        "postings_tfs": tfs.astype(np.uint16),
+        "postings_impacts": impacts,
+        "doc_lengths": doc_lengths.astype(np.uint32),
+        "doc_sources": doc_sources.astype(np.uint32),
+        "doc_offsets": doc_offsets,
+    }
+    for name, column in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), column)
+
+    meta = {
+        "format": FORMAT_VERSION,
+        "docs": int(len(doc_lengths)),
+        "terms": int(len(terms)),
+        "postings": int(len(docs)),
+        "total_length": int(doc_lengths.sum(dtype=np.int64)),
+        "k1": K1,
+        "b": B,
+        "sources": sources,
+    }
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.rename(tmp_path, path)
+    return meta
+
+
+class Segment:
+    """Read-only view of a segment directory; arrays are memory-mapped, not loaded."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"{path} has unsupported format {self.meta.get('format')}")
+        for name in ("terms", "term_offsets", "term_max_impacts", "postings_docs", "postings_tfs", "postings_impacts",
+                     "doc_lengths", "doc_sources", "doc_offsets"):
+            # Plain ndarray views of the maps; slicing np.memmap objects is several times slower
+            setattr(self, name, np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")))
+        self._docs_file = open(os.path.join(path, "docs.jsonl"), "rb")
+
+    @property
+    def n_docs(self) -> int:
+        return self.meta["docs"]
+
+    @property
+    def sources(self) -> List[str]:
+        return self.meta["sources"]
+
+    def lookup(self, hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the postings ``(starts, ends, max_impacts)`` of each term hash (empty for unknown terms)."""
+        positions = np.searchsorted(self.terms, hashes)
+        found = positions < len(self.terms)
+        found[found] = self.terms[positions[found]] == hashes[found]
+        starts = np.zeros(len(hashes), dtype=np.int64)
+        ends = np.zeros(len(hashes), dtype=np.int64)
+        starts[found] = self.term_offsets[positions[found]]
+        ends[found] = self.term_offsets[positions[found] + 1]
+        max_impacts = np.zeros(len(hashes), dtype=np.float32)
+        max_impacts[found] = self.term_max_impacts[positions[found]]
+        return starts, ends, max_impacts
+
+    def document(self, doc: int) -> Dict[str, Any]:
+        """Read one stored document."""
+        start, end = int(self.doc_offsets[doc]), int(self.doc_offsets[doc + 1])
+        return json.loads(os.pread(self._docs_file.fileno(), end - start, start).decode("utf-8"))
+
+    def iter_records(self, docs: Iterable[int]) -> Iterable[bytes]:
+        """Yield the raw stored records of the given documents."""
+        for doc in docs:
+            start, end = int(self.doc_offsets[doc]), int(self.doc_offsets[doc + 1])
+            yield os.pread(self._docs_file.fileno(), end - start, start)
+
+    def postings(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return all postings as ``(term_hashes, docs, tfs)`` (used when merging segments)."""
+        hashes = np.repeat(np.asarray(self.terms), np.diff(self.term_offsets))
+        return hashes, np.asarray(self.postings_docs), np.asarray(self.postings_tfs)
+
+    def close(self) -> None:
+        self._docs_file.close()
+
+
+def encode_record(document: Dict[str, Any]) -> bytes:
+    """Encode a document as one line of docs.jsonl."""
+    return (json.dumps({"id": document["id"], "title": document.get("title", ""),
+                        "text": document["text"]}, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def build_segment(path: str, documents: Sequence[Dict[str, Any]], document_sources: Sequence[str],
+                  text_fields: Sequence[str] = ("title", "text")) -> Dict[str, Any]:
+    """Index ``documents`` (dicts with ``id``, ``title`` and ``text``) into a new segment."""
+    token_lists = (tokenize(" ".join(document.get(field) or "" for field in text_fields))
+                   for document in documents)
+    posting_hashes, docs, tfs, doc_lengths = invert(token_lists)
+    sources = sorted(set(document_sources))
+    source_ids = {source: i for i, source in enumerate(sources)}
+    doc_sources = np.fromiter((source_ids[source] for source in document_sources),
+                              dtype=np.uint32, count=len(documents))
+    return write_segment(path, posting_hashes, docs, tfs, doc_lengths,
+                         (encode_record(document) for document in documents), doc_sources, sources)
+
+
+def merge_segments(path: str, segments: Sequence[Segment], live_masks: Sequence[np.ndarray]) -> Dict[str, Any]:
+    """Write the live documents of several segments into one new segment.
+
+    Postings are merged numerically (no re-tokenizing); documents are renumbered
+    in segment order, skipping the ones whose ``live_masks`` entry is False.
+    """
+    all_hashes, all_docs, all_tfs, lengths, doc_sources = [], [], [], [], []
+    source_ids: Dict[str, int] = {}
+    base = 0
+    for segment, live in zip(segments, live_masks):
+        new_numbers = np.cumsum(live, dtype=np.int64) - 1 + base
+        hashes, docs, tfs = segment.postings()
+        keep = live[docs]
+        all_hashes.append(hashes[keep])
+        all_docs.append(new_numbers[docs[keep]])
+        all_tfs.append(tfs[keep])
+        lengths.append(np.asarray(segment.doc_lengths)[live])
+
+        # Map this segment's source numbers onto the merged source list
+        remap = np.array([source_ids.setdefault(source, len(source_ids)) for source in segment.sources],
+                         dtype=np.uint32)
+        doc_sources.append(remap[np.asarray(segment.doc_sources)[live]])
+        base += int(live.sum())
+
+    hashes = np.concatenate(all_hashes) if all_hashes else np.zeros(0, dtype=np.uint64)
+    docs = np.concatenate(all_docs) if all_docs else np.zeros(0, dtype=np.int64)
+    tfs = np.concatenate(all_tfs) if all_tfs else np.zeros(0, dtype=np.uint16)
+    order = np.lexsort((docs, hashes))
+
+    def records():
+        for segment, live in zip(segments, live_masks):
+            yield from segment.iter_records(np.flatnonzero(live))
+
+    return write_segment(path, hashes[order], docs[order], tfs[order],
+                         np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.uint32),
+                         records(), np.concatenate(doc_sources) if doc_sources else np.zeros(0, dtype=np.uint32),
+                         list(source_ids))
@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+"""
+Sharded search index queried in parallel across processes.
+
+Corpus files are partitioned over N shards by a hash of their path, and each shard
+is an ordinary segmented index (``src.search.index``) in its own subdirectory. A
+query fans out to a pool of worker processes, one task per shard, and the per-shard
+top-k lists are merged. Shard ``i`` always goes to worker ``i % workers``, so each
+worker only ever opens its own shards.
+
+Workers open a shard the first time it is queried and keep an LRU of open shards.
+The least recently used shards are closed (releasing their memory maps) when a
+worker holds more than ``max_open_shards``, or when it is under memory pressure:
+its resident memory is above ``memory_budget``, or the machine (or the container's
+cgroup) has less than ``min_available`` bytes left.
+
+Each shard scores with its own document frequencies, as distributed search engines
+do by default; with files hashed across shards the statistics of large shards are
+nearly identical, and no extra round trip is needed to collect global ones.
+
+Usage:
+    python -m src.search.sharded build data/corpus --index data/search_shards --shards 4
+    python -m src.search.sharded update data/corpus --index data/search_shards
+    python -m src.search.sharded query "capital of australia" --index data/search_shards
+    python -m src.search.sharded compact --index data/search_shards
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from src.search.index import DEFAULT_SEGMENT_DOCS, SearchIndex, manifest_stamp
+
+SHARDS_FILE = "shards.json"
+
+# Close shards when less memory than this is available to the process
+DEFAULT_MIN_AVAILABLE = 128 * 1024 * 1024
+
+
+def resident_bytes() -> Optional[int]:
+    """Resident memory of this process, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def available_bytes() -> Optional[int]:
+    """Memory still available: the cgroup headroom in a limited container, else MemAvailable."""
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            limit = f.read().strip()
+        if limit != "max":
+            with open("/sys/fs/cgroup/memory.current") as f:
+                used = int(f.read())
+            # Inactive page cache (e.g. index pages not touched lately) is reclaimed before OOM
+            with open("/sys/fs/cgroup/memory.stat") as f:
+                stats = dict(line.split() for line in f)
+            return int(limit) - used + int(stats.get("inactive_file", 0))
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class ShardCache:
+    """LRU of open shard indexes that closes shards under memory pressure."""
+
+    def __init__(self, max_open_shards: Optional[int] = None, memory_budget: Optional[int] = None,
+                 min_available: int = DEFAULT_MIN_AVAILABLE):
+        self.max_open_shards = max_open_shards
+        self.memory_budget = memory_budget
+        self.min_available = min_available
+        self._open: "OrderedDict[str, SearchIndex]" = OrderedDict()
+        self.opened = 0
+        self.evicted = 0
+
+    def get(self, path: str) -> SearchIndex:
+        """Return the open index of a shard, opening it on first use."""
+        index = self._open.get(path)
+        if index is None:
+            index = self._open[path] = SearchIndex(path)
+            self.opened += 1
+        self._open.move_to_end(path)
+        return index
+
+    def under_pressure(self) -> bool:
+        if self.max_open_shards is not None and len(self._open) > self.max_open_shards:
+            return True
+        if self.memory_budget is not None and (resident_bytes() or 0) > self.memory_budget:
+            return True
+        available = available_bytes()
+        return available is not None and available < self.min_available
+
+    def relieve(self) -> None:
+        """Close least recently used shards while under pressure (the last one used stays open)."""
+        while len(self._open) > 1 and self.under_pressure():
+            _, index = self._open.popitem(last=False)
+            index.close()
+            self.evicted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "open_shards": len(self._open),
+            "opened": self.opened,
+            "evicted": self.evicted,
+            "resident_bytes": resident_bytes(),
+        }
+
+
+# Shard cache of a worker process (or of the coordinator when it searches in-process)
+_cache: Optional[ShardCache] = None
+
+
+def _init_worker(max_open_shards: Optional[int], memory_budget: Optional[int], min_available: int) -> None:
+    global _cache
+    _cache = ShardCache(max_open_shards, memory_budget, min_available)
+
+
+def _search_shard(path: str, query: str, k: int) -> List[Dict[str, Any]]:
+    results = _cache.get(path).search(query, k)
+    _cache.relieve()
+    return results
+
+
+def _open_shard(path: str) -> None:
+    _cache.get(path)
+    _cache.relieve()
+
+
+def _worker_stats() -> Dict[str, Any]:
+    return _cache.stats()
+
+
+class ShardedSearchIndex:
+    """A set of shard indexes searched in parallel by worker processes.
+
+    Args:
+        path: Directory holding ``shards.json`` and one subdirectory per shard.
+        workers: Worker processes (default: one per shard, at most one per CPU);
+            0 searches the shards one after another in this process.
+        max_open_shards: Shards a worker keeps open at most (default: no limit).
+        memory_budget: Resident bytes per worker above which shards are closed.
+        min_available: Close shards when less memory than this is left.
+    """
+
+    def __init__(self, path: str, workers: Optional[int] = None, max_open_shards: Optional[int] = None,
+                 memory_budget: Optional[int] = None, min_available: int = DEFAULT_MIN_AVAILABLE):
+        self.path = path
+        with open(os.path.join(path, SHARDS_FILE), encoding="utf-8") as f:
+            self.n_shards = json.load(f)["shards"]
+        self.shard_paths = [os.path.join(path, f"shard-{i:03d}") for i in range(self.n_shards)]
+        self.workers = min(self.n_shards, os.cpu_count() or 1) if workers is None else workers
+        self._limits = (max_open_shards, memory_budget, min_available)
+        self._local = ShardCache(*self._limits)
+        self._executors: Optional[List[ProcessPoolExecutor]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, SHARDS_FILE))
+
+    def version(self) -> Tuple[Optional[Tuple[int, int]], ...]:
+        """Changes whenever any shard on disk does (the workers pick the change up on their next query)."""
+        return tuple(manifest_stamp(path) for path in self.shard_paths)
+
+    def shard_of(self, source: str) -> int:
+        """The shard a corpus file (relative path) belongs to."""
+        return zlib.crc32(source.encode("utf-8")) % self.n_shards
+
+    def _pool(self) -> List[ProcessPoolExecutor]:
+        """Start the workers on first use; each is a one-process pool so shards keep their worker."""
+        with self._lock:
+            if self._executors is None:
+                # Spawned rather than forked: the agents and the server run threads
+                context = multiprocessing.get_context("spawn")
+                self._executors = [
+                    ProcessPoolExecutor(1, mp_context=context, initializer=_init_worker, initargs=self._limits)
+                    for _ in range(self.workers)
+                ]
+            return self._executors
+
+    def warm_up(self) -> None:
+        """Start the workers and open every shard ahead of the first query."""
+        if not self.workers:
+            for path in self.shard_paths:
+                self._local.get(path)
+            return
+        executors = self._pool()
+        futures = [executors[i % self.workers].submit(_open_shard, path) for i, path in enumerate(self.shard_paths)]
+        for future in futures:
+            future.result()
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Search every shard and return the merged top ``k`` (each result records its ``shard``)."""
+        if self.workers:
+            executors = self._pool()
+            futures = [executors[i % self.workers].submit(_search_shard, path, query, k)
+                       for i, path in enumerate(self.shard_paths)]
+            per_shard = [future.result() for future in futures]
+        else:
+            per_shard = []
+            for path in self.shard_paths:
+                per_shard.append(self._local.get(path).search(query, k))
+                self._local.relieve()
+
+        results = []
+        for shard, shard_results in enumerate(per_shard):
+            for result in shard_results:
+                result["shard"] = shard
+                results.append(result)
+        results.sort(key=lambda result: -result["score"])
+        return results[:k]
+
+    def update_from_corpus(self, root: str, segment_docs: int = DEFAULT_SEGMENT_DOCS) -> Dict[str, int]:
+        """Update every shard from the corpus files hashed to it; returns the summed changes."""
+        totals: Dict[str, int] = {}
+        for shard, path in enumerate(self.shard_paths):
+            index = SearchIndex(path)
+            changes = index.update_from_corpus(root, segment_docs, select=lambda source: self.shard_of(source) == shard)
+            index.close()
+            for key, value in changes.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def compact(self, max_segment_docs: int = DEFAULT_SEGMENT_DOCS) -> int:
+        """Compact every shard; returns the total number of segments afterwards."""
+        segments = 0
+        for path in self.shard_paths:
+            index = SearchIndex(path)
+            segments += index.compact(max_segment_docs)
+            index.close()
+        return segments
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-shard index statistics and, once started, the shard caches of the workers."""
+        shards = []
+        for path in self.shard_paths:
+            index = SearchIndex(path)
+            shards.append(index.stats())
+            index.close()
+        stats = {
+            "documents": sum(shard["documents"] for shard in shards),
+            "shards": shards,
+            "workers": self.workers,
+        }
+        if self._executors is not None:
+            stats["worker_caches"] = [executor.submit(_worker_stats).result() for executor in self._executors]
+        elif not self.workers:
+            stats["worker_caches"] = [self._local.stats()]
+        return stats
+
+    def close(self) -> None:
+        """Stop the workers and close the shards opened in this process."""
+        with self._lock:
+            executors, self._executors = self._executors, None
+        for executor in executors or []:
+            executor.shutdown()
+        self._local = ShardCache(*self._limits)
+
+
+def build_sharded_index(corpus: str, path: str, shards: int, segment_docs: int = DEFAULT_SEGMENT_DOCS,
+                        **kwargs: Any) -> ShardedSearchIndex:
+    """Build a fresh sharded index of ``corpus`` in ``path``, replacing any index already there."""
+    if os.path.exists(path):
+        if os.listdir(path) and not ShardedSearchIndex.exists(path):
+            raise ValueError(f"{path} exists and is not a sharded search index")
+        shutil.rmtree(path)
+    os.makedirs(path)
+    with open(os.path.join(path, SHARDS_FILE), "w", encoding="utf-8") as f:
+        json.dump({"shards": shards}, f)
+    index = ShardedSearchIndex(path, **kwargs)
+    index.update_from_corpus(corpus, segment_docs)
+    return index
+
+
+def open_index(path: str, **kwargs: Any) -> Union[SearchIndex, ShardedSearchIndex]:
+    """Open a sharded or a single index; ``kwargs`` configure the workers of a sharded one."""
+    if ShardedSearchIndex.exists(path):
+        return ShardedSearchIndex(path, **kwargs)
+    return SearchIndex(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default="data/search_shards", help="Sharded index directory")
+    parser.add_argument("--workers", type=int, help="Worker processes (0 searches in-process)")
+    parser.add_argument("--max-open-shards", type=int, help="Shards each worker keeps open at most")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Index a corpus directory from scratch")
+    build_parser.add_argument("corpus", help="Directory of .txt, .md and .jsonl files")
+    build_parser.add_argument("--shards", type=int, default=4)
+    build_parser.add_argument("--segment-docs", type=int, default=DEFAULT_SEGMENT_DOCS)
+
+    update_parser = subparsers.add_parser("update", help="Index new and changed corpus files")
+    update_parser.add_argument("corpus")
+    update_parser.add_argument("--segment-docs", type=int, default=DEFAULT_SEGMENT_DOCS)
+
+    query_parser = subparsers.add_parser("query", help="Search the index")
+    query_parser.add_argument("query")
+    query_parser.add_argument("-k", type=int, default=5, help="Number of results")
+
+    compact_parser = subparsers.add_parser("compact", help="Merge segments and drop deleted documents")
+    compact_parser.add_argument("--max-segment-docs", type=int, default=DEFAULT_SEGMENT_DOCS)
+
+    subparsers.add_parser("stats", help="Show index statistics")
+
+    args = parser.parse_args()
+    options = {"workers": args.workers, "max_open_shards": args.max_open_shards}
+
+    start = time.perf_counter()
+    if args.command == "build":
+        index = build_sharded_index(args.corpus, args.index, args.shards, args.segment_docs, **options)
+        print(f"Built {args.index} with {args.shards} shards in {time.perf_counter() - start:.1f}s")
+    elif args.command == "update":
+        changes = ShardedSearchIndex(args.index, **options).update_from_corpus(args.corpus, args.segment_docs)
+        print(f"Updated {args.index} in {time.perf_counter() - start:.1f}s: {changes}")
+    elif args.command == "compact":
+        segments = ShardedSearchIndex(args.index, **options).compact(args.max_segment_docs)
+        print(f"Compacted {args.index} to {segments} segments in {time.perf_counter() - start:.1f}s")
+    elif args.command == "stats":
+        print(json.dumps(ShardedSearchIndex(args.index, **options).stats(), indent=2))
+    else:
+        index = ShardedSearchIndex(args.index, **options)
+        index.warm_up()
+        start = time.perf_counter()
+        results = index.search(args.query, args.k)
+        elapsed = time.perf_counter() - start
+        for result in results:
+            print(f"{result['score']:.3f}  shard {result['shard']}  {result['id']}  "
+                  f"{result['title'] or result['text'][:80]}")
+        print(f"{len(results)} results in {elapsed * 1000:.2f}ms")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+#!/usr/bin/env python
+"""
+HTTP server for the agent team and the single agent.
+
+Serves both graphs over plain asyncio with per-session conversation state, JSON
+requests and responses, server-sent-event token streaming, a concurrency limit and
+graceful shutdown. Each session's history is kept within a token budget by
+``ConversationMemory``, which folds older turns into a summary in the background.
+The model endpoint is taken from ``LOCAL_MODEL_BASE_URL``, so the server can be
+tested against a local stub of the OpenAI-compatible API.
+
+Endpoints:
+    POST   /v1/team/chat          {"message": "...", "session_id": "...", "stream": false}
+    POST   /v1/agent/chat         same body, served by the single agent
+    DELETE /v1/sessions/<id>      forget a session
+    GET    /health                liveness and load information
+
+Usage:
+    python -m src.server.app --host 0.0.0.0 --port 8000 --max-concurrency 8
+"""
+
+import argparse
+import asyncio
+import functools
+import os
+import signal
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from src.agents.memory import ConversationMemory
+from src.agents.streaming import token_text
+from src.server.http import HTTPError, EventStream, read_request, write_json
+
+
+class Session:
+    """Conversation state for one client session."""
+
+    def __init__(self, session_id: str, memory: Optional[ConversationMemory] = None):
+        self.session_id = session_id
+        self.state: Dict[str, Any] = {"messages": [], "summary": None}
+        self.memory = memory  # Keeps the history within budget (None keeps every turn)
+        self.lock = asyncio.Lock()  # Turns of one session run one at a time
+        self.last_used = time.monotonic()
+
+
+class SessionStore:
+    """In-memory sessions with idle expiry and a size bound (least recently used first)."""
+
+    def __init__(self, ttl: float = 1800.0, max_sessions: int = 10000,
+                 memory_factory: Optional[Callable[[], ConversationMemory]] = None):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.memory_factory = memory_factory
+        self._sessions: "OrderedDict[Tuple[str, str], Session]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, kind: str, session_id: Optional[str]) -> Session:
+        """Return the session for ``session_id``, creating it (and an id) if needed."""
+        self.evict_expired()
+        session_id = session_id or uuid.uuid4().hex
+        key = (kind, session_id)
+        session = self._sessions.get(key)
+        if session is None:
+            memory = self.memory_factory() if self.memory_factory else None
+            session = self._sessions[key] = Session(session_id, memory)
+            while len(self._sessions) > self.max_sessions:
+                # Evict the least recently used session that is not running a turn
+                idle = next((k for k, s in self._sessions.items() if k != key and not s.lock.locked()), None)
+                if idle is None:
+                    break  # Every other session is busy; stay over the bound until one finishes
+                del self._sessions[idle]
+        self._sessions.move_to_end(key)
+        session.last_used = time.monotonic()
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        """Forget a session for every graph; return whether it existed."""
+        keys = [key for key in self._sessions if key[1] == session_id]
+        for key in keys:
+            del self._sessions[key]
+        return bool(keys)
+
+    def evict_expired(self) -> None:
+        """Drop sessions that have been idle for longer than the TTL."""
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff or session.lock.locked():
+                break
+            del self._sessions[key]
+
+
+class AgentServer:
+    """Serves the team graph and the single-agent graph over HTTP."""
+
+    def __init__(self, team, agent, max_concurrency: int = 8, max_queue: int = 64,
+                 request_timeout: float = 300.0, session_ttl: float = 1800.0, max_sessions: int = 10000,
+                 memory_llm=None, max_history_tokens: int = 2000):
+        self.graphs = {"team": team, "agent": agent}
+        # Sessions share one summarizer model and thread; without a model histories are unbounded
+        self._memory_executor: Optional[ThreadPoolExecutor] = None
+        memory_factory = None
+        if memory_llm is not None:
+            self._memory_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory")
+            memory_factory = functools.partial(ConversationMemory, memory_llm, max_tokens=max_history_tokens,
+                                               executor=self._memory_executor)
+        self.sessions = SessionStore(session_ttl, max_sessions, memory_factory)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.request_timeout = request_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._active = 0
+        self._connections: Dict[asyncio.Task, bool] = {}  # task -> busy with a request
+        self._draining = False
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    # Connection handling
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests on one connection until it is closed."""
+        task = asyncio.current_task()
+        self._connections[task] = False
+        try:
+            while not self._draining:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    await write_json(writer, e.status, {"error": e.message}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                self._connections[task] = True
+                keep_alive = await self.dispatch(request, writer)
+                self._connections[task] = False
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def dispatch(self, request, writer) -> bool:
+        """Route a request to its handler; return whether the connection can be reused."""
+        keep_alive = request.keep_alive and not self._draining
+        try:
+            if request.method == "GET" and request.path == "/health":
+                await write_json(writer, 200, self.health(), keep_alive)
+                return keep_alive
+            if request.method == "POST" and request.path in ("/v1/team/chat", "/v1/agent/chat"):
+                kind = request.path.split("/")[2]
+                return await self.chat(kind, request, writer, keep_alive)
+            if request.method == "DELETE" and request.path.startswith("/v1/sessions/"):
+                session_id = request.path[len("/v1/sessions/"):]
+                if not self.sessions.delete(session_id):
+                    raise HTTPError(404, f"Unknown session {session_id}")
+                await write_json(writer, 200, {"deleted": session_id}, keep_alive)
+                return keep_alive
+            raise HTTPError(404, f"No route for {request.method} {request.path}")
+        except HTTPError as e:
+            await write_json(writer, e.status, {"error": e.message}, keep_alive)
+            return keep_alive
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "draining" if self._draining else "ok",
+            "active_requests": self._active,
+            "queued_requests": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "sessions": len(self.sessions),
+        }
+
+    # Chat handling
+
+    async def _acquire_slot(self) -> None:
+        """Wait for a concurrency slot, rejecting the request if the queue is full."""
+        if self._draining:
+            raise HTTPError(503, "Server is shutting down")
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            raise HTTPError(503, "Server busy, try again later")
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._active += 1
+
+    def _release_slot(self) -> None:
+        self._active -= 1
+        self._semaphore.release()
+
+    async def chat(self, kind: str, request, writer, keep_alive: bool) -> bool:
+        """Run one conversation turn through the team or the single agent."""
+        body = request.json()
+        message = body.get("message") if isinstance(body, dict) else None
+        if not isinstance(message, str) or not message.strip():
+            raise HTTPError(400, "Request body must contain a non-empty 'message' string")
+        session_id = body.get("session_id")
+        if session_id is not None and not isinstance(session_id, str):
+            raise HTTPError(400, "'session_id' must be a string")
+        stream = bool(body.get("stream")) or "text/event-stream" in request.headers.get("accept", "")
+
+        session = self.sessions.get(kind, session_id)
+        # Take the session lock first, so later turns of a busy session don't hold
+        # concurrency slots while they wait for it (and the session can't be evicted)
+        async with session.lock:
+            await self._acquire_slot()
+            try:
+                state = session.state
+                # Fold older turns into the summary if a background summary has finished
+                if session.memory is not None:
+                    session.memory.prepare(state)
+                state["messages"].append(HumanMessage(content=message))
+                state["user_input"] = message
+                try:
+                    if stream:
+                        result = await self._stream_turn(kind, session, writer)
+                    else:
+                        result = await asyncio.wait_for(self.graphs[kind].ainvoke(state), self.request_timeout)
+                except asyncio.TimeoutError:
+                    state["messages"].pop()
+                    raise HTTPError(504, "The model did not answer in time")
+                except Exception as e:
+                    state["messages"].pop()
+                    if stream:
+                        return False  # The event stream is already under way; just close it
+                    raise HTTPError(502, f"Agent error: {e}")
+                if result is None:
+                    # The stream failed after its headers were sent and ended with an error event
+                    state["messages"].pop()
+                    return False
+
+                payload = self._turn_payload(kind, session, result)
+                # The graph appended the assistant's reply to the history
+                state["messages"] = result["messages"]
+                if session.memory is not None:
+                    session.memory.update(state)
+            finally:
+                self._release_slot()
+
+        if stream:
+            return False
+        await write_json(writer, 200, payload, keep_alive)
+        return keep_alive
+
+    def _turn_payload(self, kind: str, session: Session, result: Dict[str, Any]) -> Dict[str, Any]:
+        if kind == "team":
+            return {
+                "session_id": session.session_id,
+                "response": result["final_response"],
+                "agent": result["current_agent"],
+            }
+        return {"session_id": session.session_id, "response": result["agent_output"]}
+
+    async def _stream_turn(self, kind: str, session: Session, writer) -> Optional[Dict[str, Any]]:
+        """Stream specialist tokens as server-sent events and return the final state.
+
+        Once the events have started, failures are reported with an ``error`` event
+        (an HTTP error status can no longer be sent) and None is returned.
+        """
+        events = EventStream(writer)
+        await events.start()
+        await events.send("session", {"session_id": session.session_id})
+
+        final_state: Dict[str, Any] = {}
+        streamed = False
+        try:
+            # The deadline covers the whole turn, including waits with no event at all
+            async with asyncio.timeout(self.request_timeout):
+                async for mode, payload in self.graphs[kind].astream(session.state,
+                                                                     stream_mode=["messages", "values"]):
+                    if mode == "values":
+                        final_state = payload
+                        continue
+                    text = token_text(*payload)
+                    if text is not None:
+                        streamed = True
+                        await events.send("token", {"token": text})
+        except TimeoutError:
+            await events.send("error", {"error": "The model did not answer in time"})
+            return None
+        except Exception as e:
+            await events.send("error", {"error": f"Agent error: {e}"})
+            return None
+
+        payload = self._turn_payload(kind, session, final_state)
+        # Answers produced without streaming (e.g. a speculative result) are sent whole
+        if not streamed:
+            await events.send("token", {"token": payload["response"]})
+        await events.send("done", payload)
+        return final_state
+
+    # Lifecycle
+
+    async def start(self, host: str, port: int) -> None:
+        self._server = await asyncio.start_server(self.handle_connection, host, port)
+
+    async def shutdown(self, timeout: float = 30.0) -> None:
+        """Stop accepting connections and wait for in-flight requests to finish."""
+        self._draining = True
+        if self._server is not None:
+            self._server.close()
+
+        # Idle keep-alive connections can be closed right away
+        for task, busy in list(self._connections.items()):
+            if not busy:
+                task.cancel()
+        pending = [task for task in self._connections]
+        if pending:
+            done, still_running = await asyncio.wait(pending, timeout=timeout)
+            for task in still_running:
+                task.cancel()
+        if self._memory_executor is not None:
+            self._memory_executor.shutdown(wait=False, cancel_futures=True)
+
+    async def serve(self, host: str, port: int, shutdown_timeout: float = 30.0) -> None:
+        """Serve until SIGINT or SIGTERM, then shut down gracefully."""
+        await self.start(host, port)
+        print(f"Serving the agent team on http://{host}:{port} "
+              f"(max {self.max_concurrency} concurrent requests)")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Signal handlers are not available on Windows event loops
+        await stop.wait()
+
+        print("Shutting down, waiting for in-flight requests...")
+        await self.shutdown(shutdown_timeout)
+        print("Server stopped")
+
+
+def main():
+    # Import the agents here so importing AgentServer doesn't build the model stack
+    from src.agents.team_agent import create_team, TEAM_MODES
+    from src.agents.single_agent import create_agent
+    from src.llm.factory import create_llm, get_base_url
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--max-concurrency", type=int, default=int(os.environ.get("MAX_CONCURRENCY", "8")),
+                        help="Requests processed at the same time; others wait in a queue")
+    parser.add_argument("--max-queue", type=int, default=int(os.environ.get("MAX_QUEUE", "64")),
+                        help="Requests allowed to wait for a slot before the server answers 503")
+    parser.add_argument("--request-timeout", type=float, default=300.0, help="Seconds per conversation turn")
+    parser.add_argument("--session-ttl", type=float, default=1800.0, help="Seconds before idle sessions expire")
+    parser.add_argument("--max-history-tokens", type=int, default=2000,
+                        help="Token budget of a session's history; older turns are summarized")
+    parser.add_argument("--shutdown-timeout", type=float, default=30.0,
+                        help="Seconds to wait for in-flight requests on shutdown")
+    parser.add_argument("--mode", choices=TEAM_MODES, default="router", help="Team mode")
+    parser.add_argument("--speculative", action="store_true", help="Enable speculative specialist execution")
+    args = parser.parse_args()
+
+    print(f"Using the model endpoint at {get_base_url()}")
+    llm = create_llm(temperature=0.7)
+    server = AgentServer(
+        team=create_team(llm=llm, mode=args.mode, speculative=args.speculative),
+        agent=create_agent(llm=llm),
+        max_concurrency=args.max_concurrency,
+        max_queue=args.max_queue,
+        request_timeout=args.request_timeout,
+        session_ttl=args.session_ttl,
+        memory_llm=create_llm(temperature=0.0),
+        max_history_tokens=args.max_history_tokens,
+    )
+    asyncio.run(server.serve(args.host, args.port, args.shutdown_timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Minimal HTTP/1.1 primitives on top of asyncio streams.
+
+Only what the agent server and the model stub need: parsing requests with a
+Content-Length body, writing JSON responses with keep-alive, and server-sent
+event streams.
+"""
+
+import asyncio
+import json
+from http import HTTPStatus
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+# Limits that protect the server from oversized requests
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class HTTPError(Exception):
+    """An error that is reported to the client with the given status code."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    """A parsed HTTP request."""
+
+    def __init__(self, method: str, target: str, version: str, headers: Dict[str, str], body: bytes):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path
+        self.query = dict(parse_qsl(url.query))
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self) -> bool:
+        """Whether the client wants to reuse the connection."""
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def json(self) -> Any:
+        """Decode the body as JSON, raising a 400 error if it is invalid."""
+        if not self.body:
+            return {}
+        try:
+            return json.loads(self.body)
+        except ValueError as e:
+            raise HTTPError(400, f"Invalid JSON body: {e}")
+
+
+async def read_request(reader: asyncio.StreamReader, max_body: int = MAX_BODY_BYTES) -> Optional[Request]:
+    """Read one request from the stream, or return None if the client closed the connection."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise HTTPError(400, "Incomplete request")
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431, "Request headers too large")
+    if len(head) > MAX_HEADER_BYTES:
+        raise HTTPError(431, "Request headers too large")
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HTTPError(411, "Chunked request bodies are not supported; send Content-Length")
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length > max_body:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target, version, headers, body)
+
+
+def format_response(status: int, body: bytes, content_type: str = "application/json",
+                    keep_alive: bool = True, headers: Optional[Dict[str, str]] = None) -> bytes:
+    """Serialize a complete HTTP response."""
+    lines = [
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def write_json(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool = True,
+                     headers: Optional[Dict[str, str]] = None) -> None:
+    """Write a JSON response."""
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(format_response(status, body, "application/json", keep_alive, headers))
+    await writer.drain()
+
+
+class EventStream:
+    """A server-sent event response. The connection is closed when the stream ends."""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+
+    async def start(self) -> None:
+        head = (
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: text/event-stream\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        self.writer.write(head.encode("latin-1"))
+        await self.writer.drain()
+
+    async def send(self, event: str, data: Any) -> None:
+        """Send one event with a JSON payload."""
+        self.writer.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        await self.writer.drain()
+
+    async def send_data(self, data: Any) -> None:
+        """Send an unnamed event (as OpenAI-style streams do); strings are sent as is, e.g. "[DONE]"."""
+        payload = data if isinstance(data, str) else json.dumps(data)
+        self.writer.write(f"data: {payload}\n\n".encode("utf-8"))
+        await self.writer.drain()
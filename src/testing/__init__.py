@@ -0,0 +1,3 @@
+"""
+Test doubles for performance testing without a real model.
+"""
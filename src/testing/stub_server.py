@@ -0,0 +1,502 @@
+#!/usr/bin/env python
+"""
+Local stand-in for an OpenAI-compatible chat-completions endpoint.
+
+Lets the agent graphs, tools and server be benchmarked and load-tested on any
+CPU-only machine, without LM Studio or a model. Answers are deterministic and
+their timing is configurable:
+
+- ``--ttft``: seconds before the first token (or before a non-streamed answer)
+- ``--tps``: tokens per second after that (0 sends the whole answer at once)
+- ``--slots``: generations served at the same time; other requests queue, like
+  the parallel slots of a local inference server
+- ``--error-rate`` / ``--error-status``: fail that share of requests
+
+By default the stub plays along with the graphs in this repo: it answers the
+team router with an agent name (chosen by the fast-path router's rules), calls
+the offered tool that fits the query, answers from the tool results once they
+come back, and otherwise replies with ``--reply-tokens`` words. A ``--script``
+file of rules (a JSON list, first match wins) overrides this:
+
+    [{"match": "weather", "tool_calls": [{"name": "get_current_weather", "arguments": {"location": "Paris"}}]},
+     {"match": "weather", "after_tool": true, "content": "It is sunny in Paris."},
+     {"system": "Router Agent", "content": "research", "ttft": 0.05},
+     {"match": "fail me", "error": 503}]
+
+``match`` and ``system`` are regular expressions searched in the last user
+message and the system message; ``after_tool`` rules only apply once the last
+message is a tool result (and other rules only before). ``{query}`` in
+``content`` is replaced by the last user message.
+
+Endpoints:
+    POST /v1/chat/completions   chat completions, streamed with "stream": true
+    GET  /v1/models             the served model name
+    GET  /stats                 requests, queue depth, tokens and latency percentiles
+    POST /stats/reset           clear the counters
+
+Usage:
+    python -m src.testing.stub_server --port 1234 --ttft 0.2 --tps 40 --slots 4
+    LOCAL_MODEL_BASE_URL=http://localhost:1234/v1 python -m src.agents.team_agent
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from src.agents.routing import ARITHMETIC_PATTERN, FastRouter
+from src.server.http import HTTPError, EventStream, read_request, write_json
+from src.utils.metrics import LatencyRecorder, percentiles
+
+# The tools the default behaviour calls for each route, most preferred first
+ROUTE_TOOLS = {
+    "math": ("calculate", "calculate_batch"),
+    "weather": ("get_current_weather", "get_weather_batch"),
+    "research": ("search_web",),
+}
+
+ROUTER_PROMPT = re.compile(r"^Route this query to the appropriate agent: '(?P<query>.*)'$", re.DOTALL)
+EXPRESSION_PATTERN = re.compile(r"[-+*/%^().\d\s]*\d[-+*/%^().\d\s]*")
+LOCATION_PATTERN = re.compile(r"\b(?:in|at|for)\s+(?P<location>[A-Z][\w'-]*(?:[\s,]+[A-Z][\w'-]*)*)")
+FILLER = ("the stub model keeps this answer deterministic so every run of a benchmark "
+          "sends the same number of tokens back to the caller").split()
+
+
+def message_text(message: Dict[str, Any]) -> str:
+    """The text of a chat message whose content is a string or a list of parts."""
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count (about four characters per token), used for usage reporting."""
+    return max(1, len(text) // 4)
+
+
+class StubReply:
+    """What the stub answers to one request."""
+
+    def __init__(self, content: str = "", tool_calls: Optional[List[Dict[str, Any]]] = None,
+                 error: Optional[int] = None, ttft: Optional[float] = None, tps: Optional[float] = None):
+        self.content = content
+        self.tool_calls = tool_calls or []
+        self.error = error
+        self.ttft = ttft
+        self.tps = tps
+
+    def tokens(self) -> List[str]:
+        """The content split into streamed tokens (words with their trailing space)."""
+        return re.findall(r"\S+\s*", self.content)
+
+
+class StubModel:
+    """Decides the reply to a chat-completions request; see the module docstring."""
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None, reply_tokens: int = 32):
+        self.rules = [dict(rule, _match=re.compile(rule["match"], re.IGNORECASE) if "match" in rule else None,
+                           _system=re.compile(rule["system"], re.IGNORECASE) if "system" in rule else None)
+                      for rule in rules or []]
+        self.reply_tokens = reply_tokens
+        self.router = FastRouter()
+
+    def reply(self, body: Dict[str, Any]) -> StubReply:
+        messages = body.get("messages") or []
+        system = " ".join(message_text(m) for m in messages if m.get("role") == "system")
+        users = [message_text(m) for m in messages if m.get("role") == "user"]
+        query = users[-1] if users else ""
+        after_tool = bool(messages) and messages[-1].get("role") == "tool"
+
+        for rule in self.rules:
+            if rule.get("after_tool", False) != after_tool:
+                continue
+            if rule["_match"] is not None and not rule["_match"].search(query):
+                continue
+            if rule["_system"] is not None and not rule["_system"].search(system):
+                continue
+            return StubReply(
+                content=rule.get("content", "").replace("{query}", query),
+                tool_calls=rule.get("tool_calls"),
+                error=rule.get("error"),
+                ttft=rule.get("ttft"),
+                tps=rule.get("tps"),
+            )
+        return self.default_reply(body, query, after_tool)
+
+    def default_reply(self, body: Dict[str, Any], query: str, after_tool: bool) -> StubReply:
+        # The team router asks for an agent name
+        routed = ROUTER_PROMPT.match(query)
+        if routed:
+            return StubReply(content=self.route(routed.group("query")))
+
+        # Answer from the tool results of this turn
+        if after_tool:
+            results = []
+            for message in reversed(body["messages"]):
+                if message.get("role") != "tool":
+                    break
+                results.append(message_text(message))
+            return StubReply(content="Here is what I found: " + " ".join(reversed(results)))
+
+        # Call the offered tool that fits the query
+        tools = {tool["function"]["name"]: tool["function"] for tool in body.get("tools") or []
+                 if tool.get("type") == "function"}
+        if tools:
+            name = self.pick_tool(query, tools)
+            if name is not None:
+                return StubReply(tool_calls=[{"name": name, "arguments": self.arguments(query, tools[name])}])
+
+        words = query.split()[:8]
+        filler = itertools.islice(itertools.cycle(FILLER), max(0, self.reply_tokens - len(words) - 3))
+        return StubReply(content=f"Stub reply to: {' '.join(words)}. " + " ".join(filler))
+
+    def route(self, query: str) -> str:
+        decision = self.router.classify(query)
+        if decision.confidence > 0:
+            return decision.agent
+        return "research" if query.rstrip().endswith("?") else "conversation"
+
+    def pick_tool(self, query: str, tools: Dict[str, Any]) -> Optional[str]:
+        route = self.route(query)
+        if route == "conversation" and len(tools) > 1:
+            return None  # The fused team answers chit-chat without tools
+        for name in ROUTE_TOOLS.get(route, ()):
+            if name in tools:
+                return name
+        return next(iter(tools))
+
+    def arguments(self, query: str, function: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill the tool's required parameters from the query."""
+        parameters = function.get("parameters") or {}
+        properties = parameters.get("properties") or {}
+        arguments: Dict[str, Any] = {}
+        for name in parameters.get("required") or list(properties):
+            kind = (properties.get(name) or {}).get("type", "string")
+            if name == "expression":
+                match = ARITHMETIC_PATTERN.match(query)
+                expressions = EXPRESSION_PATTERN.findall(query)
+                arguments[name] = (match.group("expr") if match
+                                   else max(expressions, key=len).strip() if expressions else "1 + 1")
+            elif name in ("location", "locations"):
+                match = LOCATION_PATTERN.search(query)
+                location = match.group("location").strip(" ,") if match else query
+                arguments[name] = [location] if kind == "array" else location
+            elif kind == "array":
+                arguments[name] = [query]
+            elif kind == "object":
+                arguments[name] = {}
+            elif kind in ("number", "integer"):
+                arguments[name] = 1
+            else:
+                arguments[name] = query
+        return arguments
+
+
+class StubServer:
+    """Serves ``StubModel`` replies over the OpenAI chat-completions API."""
+
+    def __init__(self, model: Optional[StubModel] = None, ttft: float = 0.0, tps: float = 0.0, slots: int = 4,
+                 error_rate: float = 0.0, error_status: int = 500, model_name: str = "stub-model",
+                 seed: Optional[int] = 0):
+        self.model = model or StubModel()
+        self.ttft = ttft
+        self.tps = tps
+        self.slots = slots
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.model_name = model_name
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set = set()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.reset_stats()
+
+    # Statistics
+
+    def reset_stats(self) -> None:
+        self.requests = 0
+        self.completed = 0
+        self.errors = 0
+        self.active = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tool_calls = 0
+        self.latencies = LatencyRecorder()
+        self.queue_waits: List[float] = []
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "requests": self.requests,
+            "completed": self.completed,
+            "errors": self.errors,
+            "active": self.active,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "slots": self.slots,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tool_calls": self.tool_calls,
+            "latency": self.latencies.summary(),
+            "queue_wait_ms": {name: value * 1000 for name, value in percentiles(self.queue_waits).items()},
+        }
+        # Percentiles of no values are NaN, which is not valid JSON
+        for key in ("latency", "queue_wait_ms"):
+            stats[key] = {name: None if value != value else value for name, value in stats[key].items()}
+        return stats
+
+    # Connection handling
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    await write_json(writer, e.status, {"error": {"message": e.message}}, keep_alive=False)
+                    break
+                if request is None or not await self.dispatch(request, writer):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass  # Closed by close(); ending normally keeps asyncio from logging the cancellation
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def dispatch(self, request, writer) -> bool:
+        """Route a request to its handler; return whether the connection can be reused."""
+        keep_alive = request.keep_alive
+        try:
+            if request.method == "POST" and request.path.endswith("/chat/completions"):
+                return await self.chat_completion(request, writer, keep_alive)
+            if request.method == "GET" and request.path.endswith("/models"):
+                await write_json(writer, 200, {"object": "list", "data": [
+                    {"id": self.model_name, "object": "model", "owned_by": "stub"}]}, keep_alive)
+            elif request.method == "GET" and request.path == "/stats":
+                await write_json(writer, 200, self.stats(), keep_alive)
+            elif request.method == "POST" and request.path == "/stats/reset":
+                self.reset_stats()
+                await write_json(writer, 200, {"reset": True}, keep_alive)
+            else:
+                raise HTTPError(404, f"No route for {request.method} {request.path}")
+        except HTTPError as e:
+            await write_json(writer, e.status, {"error": {"message": e.message, "type": "invalid_request_error"}},
+                             keep_alive)
+        return keep_alive
+
+    # Chat completions
+
+    async def chat_completion(self, request, writer, keep_alive: bool) -> bool:
+        body = request.json()
+        if not isinstance(body, dict) or not isinstance(body.get("messages"), list):
+            raise HTTPError(400, "Request body must contain a 'messages' list")
+        self.requests += 1
+        started = time.perf_counter()
+        reply = self.model.reply(body)
+        stream = bool(body.get("stream"))
+
+        # Injected and scripted failures are answered right away, without taking a slot
+        status = reply.error or (self.error_status if self._random.random() < self.error_rate else None)
+        if status:
+            self.errors += 1
+            await write_json(writer, status, {"error": {"message": f"Injected error {status}",
+                                                        "type": "server_error", "code": status}}, keep_alive)
+            return keep_alive
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.slots)
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.queue_waits.append(time.perf_counter() - started)
+        self.active += 1
+        try:
+            if stream:
+                await self._stream(body, reply, writer)
+                keep_alive = False
+            else:
+                await asyncio.sleep(self._generation_seconds(reply))
+                await write_json(writer, 200, self._completion(body, reply), keep_alive)
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+        self.completed += 1
+        self.prompt_tokens += self._prompt_tokens(body)
+        self.completion_tokens += len(reply.tokens())
+        self.tool_calls += len(reply.tool_calls)
+        self.latencies.record(time.perf_counter() - started)
+        return keep_alive
+
+    def _ttft(self, reply: StubReply) -> float:
+        return self.ttft if reply.ttft is None else reply.ttft
+
+    def _tps(self, reply: StubReply) -> float:
+        return self.tps if reply.tps is None else reply.tps
+
+    def _generation_seconds(self, reply: StubReply) -> float:
+        tps = self._tps(reply)
+        return self._ttft(reply) + (len(reply.tokens()) / tps if tps > 0 else 0.0)
+
+    @staticmethod
+    def _prompt_tokens(body: Dict[str, Any]) -> int:
+        return sum(count_tokens(message_text(message)) for message in body["messages"])
+
+    def _tool_calls(self, reply: StubReply, request_id: int) -> List[Dict[str, Any]]:
+        return [{"id": f"call_{request_id}_{i}", "type": "function",
+                 "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}))}}
+                for i, call in enumerate(reply.tool_calls)]
+
+    def _completion(self, body: Dict[str, Any], reply: StubReply) -> Dict[str, Any]:
+        request_id = next(self._ids)
+        message: Dict[str, Any] = {"role": "assistant", "content": reply.content or None}
+        if reply.tool_calls:
+            message["tool_calls"] = self._tool_calls(reply, request_id)
+        prompt_tokens, completion_tokens = self._prompt_tokens(body), len(reply.tokens())
+        return {
+            "id": f"chatcmpl-stub-{request_id}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model") or self.model_name,
+            "choices": [{"index": 0, "message": message,
+                         "finish_reason": "tool_calls" if reply.tool_calls else "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    async def _stream(self, body: Dict[str, Any], reply: StubReply, writer) -> None:
+        request_id = next(self._ids)
+        base = {"id": f"chatcmpl-stub-{request_id}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": body.get("model") or self.model_name}
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+            return dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+
+        events = EventStream(writer)
+        await events.start()
+        await asyncio.sleep(self._ttft(reply))
+        await events.send_data(chunk({"role": "assistant", "content": ""}))
+
+        tps = self._tps(reply)
+        for i, token in enumerate(reply.tokens()):
+            if i and tps > 0:
+                await asyncio.sleep(1 / tps)
+            await events.send_data(chunk({"content": token}))
+        for i, call in enumerate(self._tool_calls(reply, request_id)):
+            await events.send_data(chunk({"tool_calls": [dict(call, index=i)]}))
+        await events.send_data(chunk({}, "tool_calls" if reply.tool_calls else "stop"))
+
+        if (body.get("stream_options") or {}).get("include_usage"):
+            prompt_tokens, completion_tokens = self._prompt_tokens(body), len(reply.tokens())
+            await events.send_data(dict(base, choices=[], usage={
+                "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}))
+        await events.send_data("[DONE]")
+
+    # Lifecycle
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start listening (port 0 picks a free port) and return the base URL of the API."""
+        self._semaphore = asyncio.Semaphore(self.slots)
+        self._server = await asyncio.start_server(self.handle_connection, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/v1"
+
+    async def close(self) -> None:
+        """Stop listening and drop open connections (idle keep-alive ones included)."""
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve from a background thread with its own event loop (for sync callers); return the base URL."""
+        started = threading.Event()
+        result: Dict[str, str] = {}
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            result["url"] = self._loop.run_until_complete(self.start(host, port))
+            started.set()
+            self._loop.run_forever()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=serve, name="stub-server", daemon=True)
+        self._thread.start()
+        started.wait()
+        return result["url"]
+
+    def stop_thread(self) -> None:
+        if self._thread is not None:
+            asyncio.run_coroutine_threadsafe(self.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+
+def load_rules(path: Optional[str]) -> List[Dict[str, Any]]:
+    if not path:
+        return []
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    if not isinstance(rules, list):
+        raise ValueError(f"{path}: expected a JSON list of rules")
+    return rules
+
+
+async def serve(server: StubServer, host: str, port: int) -> None:
+    url = await server.start(host, port)
+    print(f"Stub model serving {url} (ttft {server.ttft:g}s, {server.tps:g} tokens/s, {server.slots} slots, "
+          f"{server.error_rate:.0%} errors)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1234, help="Port (1234 is LM Studio's default)")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--tps", type=float, default=40.0, help="Tokens per second after the first (0: instant)")
+    parser.add_argument("--slots", type=int, default=4, help="Requests generated at the same time")
+    parser.add_argument("--reply-tokens", type=int, default=32, help="Length of default replies in words")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures")
+    parser.add_argument("--script", help="JSON file of scripted reply rules")
+    parser.add_argument("--model-name", default="stub-model", help="Model name reported by /v1/models")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for error injection")
+    args = parser.parse_args()
+
+    server = StubServer(StubModel(load_rules(args.script), args.reply_tokens), ttft=args.ttft, tps=args.tps,
+                        slots=args.slots, error_rate=args.error_rate, error_status=args.error_status,
+                        model_name=args.model_name, seed=args.seed)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        print("Stub model stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+Safe, compiled arithmetic expressions for the math tools.
+
+Expressions are parsed with ``ast`` and checked against a whitelist of node types
+(numbers, arithmetic operators, whitelisted functions and constants, and any
+variable names the caller allows). Attribute access, subscripts, comprehensions,
+lambdas and builtins are rejected, so an expression can only compute a number.
+Powers and factorials go through guarded helpers that refuse results too large to
+compute quickly, and so do ``*``, ``//`` and ``%`` in expressions that use them. Checked expressions are compiled once and kept in an LRU, so a
+repeated expression costs a single ``eval`` of cached bytecode.
+
+``evaluate_batch`` evaluates the same compiled expression over arrays of variable
+values in one vectorized pass, with the math functions swapped for their NumPy
+equivalents.
+"""
+
+import ast
+import functools
+import math
+from functools import lru_cache
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Limits that keep pathological inputs from tying up the process
+MAX_EXPRESSION_LENGTH = 1000
+MAX_EXPRESSION_DEPTH = 1000      # Levels of nesting in the parsed tree
+MAX_INTEGER_BITS = 100_000       # Largest integer result of **, *, // and %, in bits
+MAX_MODULAR_POW_BITS = 4096      # Largest exponent and modulus of pow(a, b, m), in bits
+MAX_FACTORIAL = 1000
+MAX_BATCH_VALUES = 100_000       # Largest number of results evaluate_batch computes
+
+ALLOWED_BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+ALLOWED_UNARY_OPERATORS = (ast.UAdd, ast.USub)
+# Operators whose integer results need bounding once powers or factorials are involved
+GUARDED_OPERATORS = {ast.Mult: "__mul__", ast.FloorDiv: "__floordiv__", ast.Mod: "__mod__"}
+# Functions that can return integers much larger than any literal in a 1000-character expression
+LARGE_RESULT_FUNCTIONS = frozenset({"pow", "factorial"})
+BITWISE_OPERATORS = (ast.BitXor, ast.BitAnd, ast.BitOr, ast.LShift, ast.RShift, ast.Invert)
+
+
+class ExpressionError(ValueError):
+    """Raised for expressions that are invalid, not allowed, or too expensive to evaluate."""
+
+
+def safe_pow(base: Any, exponent: Any, modulus: Any = None) -> Any:
+    """``base ** exponent`` (or ``pow(base, exponent, modulus)``) that refuses integer results
+    larger than ``MAX_INTEGER_BITS``."""
+    if modulus is not None:
+        # Modular powers stay smaller than the modulus, but take one multiplication per exponent bit
+        for value in (exponent, modulus):
+            if isinstance(value, int) and value.bit_length() > MAX_MODULAR_POW_BITS:
+                raise ExpressionError(f"pow() with a modulus is limited to {MAX_MODULAR_POW_BITS}-bit "
+                                      f"exponents and moduli")
+        return pow(base, exponent, modulus)
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        if exponent * math.log2(abs(base)) > MAX_INTEGER_BITS:
+            raise ExpressionError(f"{_describe(base)} ** {exponent} is too large to compute")
+    try:
+        return base ** exponent
+    except OverflowError:
+        raise ExpressionError(f"{_describe(base)} ** {_describe(exponent)} is too large to represent")
+
+
+def _describe(value: Any) -> str:
+    # Intermediate integers can have thousands of digits
+    if isinstance(value, int) and value.bit_length() > 64:
+        return f"a {value.bit_length()}-bit integer"
+    return repr(value)
+
+
+def _check_integer_bits(bits: int, symbol: str, left: Any, right: Any) -> None:
+    if bits > MAX_INTEGER_BITS:
+        raise ExpressionError(f"{_describe(left)} {symbol} {_describe(right)} is too large to compute")
+
+
+def safe_mul(left: Any, right: Any) -> Any:
+    """``left * right`` that refuses integer results larger than ``MAX_INTEGER_BITS``."""
+    if isinstance(left, int) and isinstance(right, int):
+        # The product has at most the operands' combined bit length
+        _check_integer_bits(left.bit_length() + right.bit_length(), "*", left, right)
+    return left * right
+
+
+def safe_floordiv(left: Any, right: Any) -> Any:
+    """``left // right`` that refuses integer operands larger than ``MAX_INTEGER_BITS``."""
+    if isinstance(left, int) and isinstance(right, int):
+        # Long division takes time proportional to the product of the operand sizes
+        _check_integer_bits(max(left.bit_length(), right.bit_length()), "//", left, right)
+    return left // right
+
+
+def safe_mod(left: Any, right: Any) -> Any:
+    """``left % right`` that refuses integer operands larger than ``MAX_INTEGER_BITS``."""
+    if isinstance(left, int) and isinstance(right, int):
+        _check_integer_bits(max(left.bit_length(), right.bit_length()), "%", left, right)
+    return left % right
+
+
+def safe_gcd(*args: Any) -> int:
+    """``math.gcd`` that also accepts integral floats such as ``12.0``."""
+    integers = []
+    for value in args:
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if not isinstance(value, int):
+            raise ExpressionError("gcd() is only defined for integers")
+        integers.append(value)
+    return math.gcd(*integers)
+
+
+def safe_factorial(n: Any) -> int:
+    if isinstance(n, float) and n.is_integer():
+        n = int(n)
+    if not isinstance(n, int) or n < 0:
+        raise ExpressionError("factorial() is only defined for non-negative integers")
+    if n > MAX_FACTORIAL:
+        raise ExpressionError(f"factorial({n}) is too large to compute (limit {MAX_FACTORIAL})")
+    return math.factorial(n)
+
+
+# Functions and constants available in expressions
+MATH_FUNCTIONS: Dict[str, Callable] = {
+    name: getattr(math, name)
+    for name in (
+        "sqrt", "exp", "log", "log10", "log2", "sin", "cos", "tan", "asin", "acos", "atan", "atan2",
+        "sinh", "cosh", "tanh", "hypot", "degrees", "radians", "floor", "ceil", "trunc", "fabs",
+    )
+}
+MATH_FUNCTIONS.update({"abs": abs, "round": round, "min": min, "max": max,
+                       "pow": safe_pow, "factorial": safe_factorial, "gcd": safe_gcd})
+MATH_CONSTANTS: Dict[str, float] = {"pi": math.pi, "e": math.e, "tau": math.tau, "inf": math.inf}
+
+
+# Globals for evaluating compiled expressions (no builtins)
+_DEFAULT_NAMESPACE: Dict[str, Any] = {
+    "__builtins__": {}, "__pow__": safe_pow, "__mul__": safe_mul, "__floordiv__": safe_floordiv,
+    "__mod__": safe_mod, **MATH_CONSTANTS, **MATH_FUNCTIONS,
+}
+
+
+def _guarded_call(node: ast.BinOp, helper: str) -> ast.Call:
+    """``a <op> b`` as a call of a guarded helper such as ``__pow__``."""
+    func = ast.copy_location(ast.Name(id=helper, ctx=ast.Load()), node)
+    return ast.copy_location(ast.Call(func=func, args=[node.left, node.right], keywords=[]), node)
+
+
+def _check_node(node: ast.AST, names: frozenset, functions: frozenset) -> None:
+    """Raise ExpressionError if this node (not its children) is outside the whitelist."""
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ExpressionError(f"Unsupported literal {node.value!r}")
+    elif isinstance(node, ast.BinOp):
+        if isinstance(node.op, BITWISE_OPERATORS):
+            hint = " (use ** for powers)" if isinstance(node.op, ast.BitXor) else ""
+            raise ExpressionError(f"Bitwise operators are not supported{hint}")
+        if not isinstance(node.op, ALLOWED_BINARY_OPERATORS):
+            raise ExpressionError(f"Unsupported operator {type(node.op).__name__}")
+    elif isinstance(node, ast.UnaryOp):
+        if not isinstance(node.op, ALLOWED_UNARY_OPERATORS):
+            raise ExpressionError(f"Unsupported operator {type(node.op).__name__}")
+    elif isinstance(node, ast.Name):
+        if node.id not in names:
+            raise ExpressionError(f"Unknown name {node.id!r}")
+    elif isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in functions:
+            raise ExpressionError("Only calls to the supported math functions are allowed")
+        if node.keywords:
+            raise ExpressionError("Keyword arguments are not supported")
+    else:
+        raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+
+
+def _check_and_guard(tree: ast.Expression, names: frozenset, functions: frozenset) -> bool:
+    """Check every node against the whitelist and rewrite ``a ** b`` into guarded calls.
+
+    When the expression has powers or factorials, ``*``, ``//`` and ``%`` are rewritten
+    into guarded calls too; without them no integer can outgrow the literals, and the
+    operators are left alone. The tree is walked with an explicit stack: a flat sum of
+    hundreds of terms is a left-leaning tree hundreds of levels deep, too deep for a
+    recursive visitor. Returns whether anything was rewritten.
+    """
+    # Each entry is a node, its depth and how to put a rewritten node in its place
+    stack = [(tree.body, 1, lambda new: setattr(tree, "body", new))]
+    rewritten = False
+    large_results = False
+    # Operators to guard if large results are possible, parents before their children
+    operators = []
+    while stack:
+        node, depth, replace = stack.pop()
+        if depth > MAX_EXPRESSION_DEPTH:
+            raise ExpressionError(f"Expression is nested more than {MAX_EXPRESSION_DEPTH} levels deep")
+        _check_node(node, names, functions)
+        if isinstance(node, ast.BinOp):
+            if isinstance(node.op, ast.Pow):
+                node = _guarded_call(node, "__pow__")
+                replace(node)
+                rewritten = large_results = True
+            else:
+                if type(node.op) in GUARDED_OPERATORS:
+                    operators.append((node, replace))
+                stack.append((node.left, depth + 1, lambda new, node=node: setattr(node, "left", new)))
+                stack.append((node.right, depth + 1, lambda new, node=node: setattr(node, "right", new)))
+                continue
+        if isinstance(node, ast.UnaryOp):
+            stack.append((node.operand, depth + 1, lambda new, node=node: setattr(node, "operand", new)))
+        elif isinstance(node, ast.Call):
+            large_results = large_results or node.func.id in LARGE_RESULT_FUNCTIONS
+            for index, arg in enumerate(node.args):
+                stack.append((arg, depth + 1, lambda new, args=node.args, index=index: args.__setitem__(index, new)))
+
+    if large_results and operators:
+        # Children first, so each call is built from its already rewritten operands
+        for node, replace in reversed(operators):
+            replace(_guarded_call(node, GUARDED_OPERATORS[type(node.op)]))
+        rewritten = True
+    return rewritten
+
+
+class CompiledExpression:
+    """A checked expression compiled to bytecode."""
+
+    def __init__(self, source: str, code: Any, variables: Tuple[str, ...]):
+        self.source = source
+        self.code = code
+        self.variables = variables
+
+    def evaluate(self, values: Optional[Mapping[str, Any]] = None,
+                 functions: Optional[Mapping[str, Any]] = None) -> Any:
+        """Evaluate with the given variable values (and optionally replacement functions)."""
+        if values is None and functions is None:
+            namespace = _DEFAULT_NAMESPACE  # Expressions cannot assign, so the namespace can be shared
+        else:
+            namespace = {**_DEFAULT_NAMESPACE, **(functions or {}), **(values or {})}
+        try:
+            return eval(self.code, namespace)
+        except ExpressionError:
+            raise
+        except OverflowError as e:
+            # Float overflows report an errno tuple such as (34, 'Numerical result out of range')
+            raise ExpressionError("Result is too large to represent") from e
+        except (ArithmeticError, ValueError, TypeError) as e:
+            raise ExpressionError(str(e)) from e
+        except (RecursionError, MemoryError) as e:
+            raise ExpressionError("Expression is too complex to evaluate") from e
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(source: str, variables: Tuple[str, ...] = ()) -> CompiledExpression:
+    """Check and compile an expression; results are memoized per (source, variables)."""
+    if len(source) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f"Expression is longer than {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression: {e.msg}") from e
+    except (RecursionError, MemoryError) as e:
+        raise ExpressionError("Expression is too deeply nested") from e
+
+    names = frozenset(MATH_CONSTANTS) | frozenset(variables)
+    rewritten = _check_and_guard(tree, names, frozenset(MATH_FUNCTIONS))
+    try:
+        # Compiling a tree converts it back recursively, so unchanged expressions are
+        # compiled from the source, which handles deeper nesting
+        code = compile(tree if rewritten else source.strip(), "<expression>", "eval")
+    except (RecursionError, MemoryError) as e:
+        raise ExpressionError("Expression is too deeply nested") from e
+    return CompiledExpression(source, code, variables)
+
+
+def _integral_arrays(name: str, *args: Any) -> list:
+    # Batch values are floats; functions defined only for integers need integral ones, cast to int64
+    arrays = [np.asarray(arg, dtype=np.float64) for arg in args]
+    if any(np.any(~np.isfinite(array) | (array != np.floor(array))) for array in arrays):
+        raise ExpressionError(f"{name}() is only defined for integers")
+    return [array.astype(np.int64) for array in arrays]
+
+
+def _array_pow(base: Any, exponent: Any, modulus: Any = None) -> Any:
+    if modulus is not None:
+        modular_pow = np.vectorize(lambda b, e, m: pow(int(b), int(e), int(m)), otypes=[np.float64])
+        return modular_pow(*_integral_arrays("pow() with a modulus", base, exponent, modulus))
+    # Batch values are floats, so large powers overflow to inf instead of growing without bound
+    return np.power(base, exponent)
+
+
+def _array_factorial(n: Any) -> Any:
+    n = np.asarray(n, dtype=np.float64)
+    if np.any((n < 0) | (n != np.floor(n))):
+        raise ExpressionError("factorial() is only defined for non-negative integers")
+    if n.size and n.max() > 170:
+        raise ExpressionError("factorial() of values above 170 overflows a float")
+    return np.vectorize(math.factorial, otypes=[np.float64])(n.astype(np.int64))
+
+
+def _variadic(ufunc: np.ufunc, name: str) -> Callable:
+    """Fold a binary ufunc over any number of arguments, like the builtin ``min(a, b, c)``."""
+
+    def fold(*args: Any) -> Any:
+        if not args:
+            raise ExpressionError(f"{name}() expects at least one argument")
+        return functools.reduce(ufunc, args)
+    return fold
+
+
+def _array_gcd(*args: Any) -> Any:
+    # np.gcd has no loop for floats
+    return _variadic(np.gcd, "gcd")(*_integral_arrays("gcd", *args)).astype(np.float64)
+
+
+# Vectorized equivalents of MATH_FUNCTIONS for evaluate_batch
+NUMPY_FUNCTIONS: Dict[str, Callable] = {
+    "sqrt": np.sqrt, "exp": np.exp, "log": np.log, "log10": np.log10, "log2": np.log2,
+    "sin": np.sin, "cos": np.cos, "tan": np.tan, "asin": np.arcsin, "acos": np.arccos, "atan": np.arctan,
+    "atan2": np.arctan2, "sinh": np.sinh, "cosh": np.cosh, "tanh": np.tanh, "hypot": _variadic(np.hypot, "hypot"),
+    "degrees": np.degrees, "radians": np.radians, "floor": np.floor, "ceil": np.ceil, "trunc": np.trunc,
+    "fabs": np.fabs, "gcd": _array_gcd, "abs": np.abs, "round": np.round,
+    "min": _variadic(np.minimum, "min"), "max": _variadic(np.maximum, "max"),
+    "pow": _array_pow, "factorial": _array_factorial, "__pow__": _array_pow,
+    "__mul__": np.multiply, "__floordiv__": np.floor_divide, "__mod__": np.mod,
+}
+
+
+def evaluate_batch(source: str, variables: Mapping[str, Sequence[float]]) -> np.ndarray:
+    """Evaluate an expression for every row of ``variables`` at once.
+
+    Each variable is a list of values; lists of length one are broadcast against the
+    others, which must all have the same length. Returns a float array with one
+    result per row (``nan`` or ``inf`` where the math is undefined).
+    """
+    names = tuple(sorted(variables))
+    arrays = {}
+    for name in names:
+        if not name.isidentifier() or name in MATH_FUNCTIONS or name in MATH_CONSTANTS:
+            raise ExpressionError(f"Invalid variable name {name!r}")
+        try:
+            arrays[name] = np.asarray(variables[name], dtype=np.float64).reshape(-1)
+        except (TypeError, ValueError):
+            raise ExpressionError(f"Values of {name!r} must be a list of numbers")
+
+    lengths = {len(array) for array in arrays.values()} - {1}
+    if len(lengths) > 1:
+        raise ExpressionError(f"Variables must have the same number of values, got {sorted(lengths)}")
+    size = lengths.pop() if lengths else 1
+    if size > MAX_BATCH_VALUES:
+        raise ExpressionError(f"At most {MAX_BATCH_VALUES} values can be evaluated at once")
+
+    compiled = compile_expression(source, names)
+    with np.errstate(all="ignore"):
+        result = compiled.evaluate(arrays, NUMPY_FUNCTIONS)
+    return np.broadcast_to(np.asarray(result, dtype=np.float64), (size,))
+
+
+def format_result(value: Any) -> str:
+    """Format a result; integers too long to print in full are shown in scientific notation."""
+    if isinstance(value, int) and value.bit_length() > 13000:  # About 4000 decimal digits
+        exponent = math.log10(abs(value))
+        mantissa = 10 ** (exponent - math.floor(exponent))
+        return f"{'-' if value < 0 else ''}{mantissa:.6f}e+{math.floor(exponent)}"
+    return str(value)
+
+
+def evaluate_expression(source: str) -> Any:
+    """Compile (or reuse) and evaluate a constant expression."""
+    return compile_expression(source).evaluate()
@@ -2,14 +2,63 @@
 Math tools for LangChain agents.
 """
 
+from typing import Dict, List
+
+import numpy as np
 from langchain.tools import tool
 
+from src.tools.expression import ExpressionError, evaluate_batch, evaluate_expression, format_result
+
 @tool
 def calculate(expression: str) -> str:
     """Calculate the result of a mathematical expression."""
     try:
-        # Be careful with eval - in production you'd want to use a safer alternative
-        result = eval(expression)
-        return f"The result of {expression} is {result}"
-    except Exception as e:
+        # Parsed against a whitelist and compiled once; repeated expressions reuse the bytecode
+        result = evaluate_expression(expression)
+        return f"The result of {expression} is {format_result(result)}"
+    except ExpressionError as e:
+        return f"Error calculating {expression}: {str(e)}"
+
+
+# Results listed in full up to this many; longer batches show a preview
+BATCH_PREVIEW_VALUES = 20
+
+
+def _format_number(value: float) -> str:
+    return f"{value:.10g}"
+
+
+@tool
+def calculate_batch(expression: str, variables: Dict[str, List[float]]) -> str:
+    """Evaluate one expression for many values at once and summarize the results.
+
+    Use named variables in the expression and give a list of values for each, e.g.
+    expression="x ** 2 + y", variables={"x": [1, 2, 3], "y": [10]}. Lists of length
+    one are reused for every row. Returns the count, min, max, mean, median, standard
+    deviation and sum of the results, plus the values themselves for short batches.
+    """
+    try:
+        # One vectorized NumPy pass instead of one tool call per value
+        results = evaluate_batch(expression, variables)
+    except ExpressionError as e:
         return f"Error calculating {expression}: {str(e)}"
+
+    finite = results[np.isfinite(results)]
+    lines = [f"Evaluated {expression} for {len(results)} values"]
+    if len(finite):
+        stats = {
+            "min": finite.min(), "max": finite.max(), "mean": finite.mean(),
+            "median": np.median(finite), "std": finite.std(), "sum": finite.sum(),
+        }
+        lines.append(", ".join(f"{name}={_format_number(value)}" for name, value in stats.items()))
+    if len(finite) < len(results):
+        undefined = len(results) - len(finite)
+        lines.append(f"{undefined} result{'s are' if undefined > 1 else ' is'} undefined or infinite (nan/inf)")
+
+    shown = results[:BATCH_PREVIEW_VALUES]
+    values = ", ".join(_format_number(value) for value in shown)
+    if len(results) > len(shown):
+        lines.append(f"First {len(shown)} results: {values}, ...")
+    else:
+        lines.append(f"Results: {values}")
+    return "\n".join(lines)
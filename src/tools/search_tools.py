@@ -1,13 +1,71 @@
 """
 Search tools for LangChain agents.
+
+``search_web`` answers from the local BM25 index in ``SEARCH_INDEX`` (default
+``data/search_index``, built with ``python -m src.search.index build``) when it
+exists, and from a small set of canned answers otherwise. A sharded index (built
+with ``python -m src.search.sharded build``) is searched by ``SEARCH_WORKERS``
+worker processes (default: one per shard, up to the CPU count).
 """
 
+import os
+import threading
+from typing import Hashable, Optional, Union
+
 from langchain.tools import tool
 
+from src.search.index import SearchIndex
+from src.search.sharded import ShardedSearchIndex, open_index
+from src.tools.tool_cache import cached_tool
+
+DEFAULT_SEARCH_INDEX = "data/search_index"
+SEARCH_RESULTS = 3
+SNIPPET_CHARS = 300
+
+_index: Optional[Union[SearchIndex, ShardedSearchIndex]] = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> Optional[Union[SearchIndex, ShardedSearchIndex]]:
+    """Open the configured search index once; returns None if it has not been built."""
+    global _index
+    path = os.environ.get("SEARCH_INDEX") or DEFAULT_SEARCH_INDEX
+    with _index_lock:
+        if _index is None or _index.path != path:
+            if isinstance(_index, ShardedSearchIndex):
+                _index.close()
+            _index = None
+            if SearchIndex.exists(path) or ShardedSearchIndex.exists(path):
+                workers = os.environ.get("SEARCH_WORKERS")
+                _index = open_index(path, **({"workers": int(workers)} if workers else {}))
+        return _index
+
+
+def _snippet(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= SNIPPET_CHARS else text[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "..."
+
+
 @tool
 def search_web(query: str) -> str:
     """Search the web for information about a query."""
-    # This is a mock implementation - in a real app, you would use a search API
+    index = get_search_index()
+    # The index version is part of the cache key, so an index update is seen by the next query
+    return _search(query, index.version() if index is not None else None)
+
+
+# Search results change slowly, so repeated queries are answered from the cache for an hour
+@cached_tool(ttl=3600, maxsize=1024)
+def _search(query: str, version: Hashable) -> str:
+    index = get_search_index()
+    if index is not None:
+        results = index.search(query, SEARCH_RESULTS)
+        if not results:
+            return f"No results found for: {query}"
+        return "\n".join(f"{i}. {result['title'] or result['id']}: {_snippet(result['text'])}"
+                         for i, result in enumerate(results, 1))
+
+    # This is a mock implementation - build a search index for real results
     
     # Handle common queries with hardcoded responses for better demo experience
     query_lower = query.lower()
@@ -0,0 +1,226 @@
+"""
+Result caching for tool functions.
+
+``cached_tool`` memoizes a tool's results for a per-tool TTL with a size bound,
+remembers failures for a shorter TTL (so a failing backend is not hammered), and
+coalesces concurrent identical calls so only one backend call is in flight per
+key ("single-flight"). It works for sync and async functions and goes underneath
+LangChain's ``@tool`` decorator, which still sees the original signature and
+docstring:
+
+    @tool
+    @cached_tool(ttl=3600)
+    def search_web(query: str) -> str:
+        ...
+"""
+
+import asyncio
+import copy
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def normalize_argument(value: Any) -> Any:
+    """Treat strings that differ only in case or surrounding whitespace as the same argument."""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    return value
+
+
+class ToolCache:
+    """Thread-safe TTL + LRU store of tool results and errors."""
+
+    def __init__(self, ttl: float, maxsize: int, error_ttl: float):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.error_ttl = error_ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, bool, Any]]" = OrderedDict()  # key -> (expires, ok, value)
+        self._inflight: Dict[Hashable, Future] = {}
+        self._ainflight: Dict[Tuple[int, Hashable], "asyncio.Future"] = {}
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[bool, Any]]:
+        """Return (ok, value) for a live entry, or None (caller holds the lock)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, ok, value = entry
+        if time.monotonic() >= expires:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return ok, value
+
+    def put(self, key: Hashable, ok: bool, value: Any) -> None:
+        """Store a result or an error (caller holds the lock)."""
+        ttl = self.ttl if ok else self.error_ttl
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, ok, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "hit_rate": (self.hits + self.coalesced) / calls if calls else 0.0,
+            }
+
+
+def _fresh_error(error: BaseException) -> BaseException:
+    """A copy of an exception without its traceback, so every caller raises its own instance."""
+    try:
+        return copy.copy(error)
+    except Exception:
+        # The exception cannot be rebuilt from its args
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def _unwrap(ok: bool, value: Any) -> Any:
+    if ok:
+        return value
+    raise _fresh_error(value)
+
+
+def cached_tool(ttl: float = 300.0, maxsize: int = 1024, error_ttl: float = 30.0,
+                normalize: Callable[[Any], Any] = normalize_argument) -> Callable:
+    """Cache a tool function's results; see the module docstring.
+
+    Args:
+        ttl: Seconds a successful result is reused.
+        maxsize: Results kept before the least recently used one is dropped.
+        error_ttl: Seconds an exception is re-raised without calling the backend (0 disables).
+        normalize: Applied to every argument to build the cache key.
+
+    The wrapped function gets a ``cache`` attribute with ``stats()`` and ``clear()``.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        cache = ToolCache(ttl, maxsize, error_ttl)
+        signature = inspect.signature(func)
+
+        def make_key(args, kwargs) -> Hashable:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return tuple((name, normalize(value)) for name, value in bound.arguments.items())
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                # In-flight calls are per event loop; a future cannot be awaited from another loop
+                flight_key = (id(asyncio.get_running_loop()), key)
+                while True:
+                    with cache._lock:
+                        cached = cache.get(key)
+                        if cached is not None:
+                            return _unwrap(*cached)
+                        pending = cache._ainflight.get(flight_key)
+                        if pending is None:
+                            pending = asyncio.get_running_loop().create_future()
+                            cache._ainflight[flight_key] = pending
+                            cache.misses += 1
+                            leader = True
+                        else:
+                            cache.coalesced += 1
+                            leader = False
+                    if leader:
+                        break
+                    # wait() neither cancels the shared call when this waiter is cancelled nor
+                    # raises the leader's exception instance
+                    await asyncio.wait({pending})
+                    if pending.cancelled():
+                        # The leader was cancelled, not this waiter: run the call again (the
+                        # first waiter to get here becomes the new leader)
+                        with cache._lock:
+                            cache.coalesced -= 1  # Counted again by the retry
+                        continue
+                    error = pending.exception()
+                    return _unwrap(error is None, error if error is not None else pending.result())
+
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    with cache._lock:
+                        cache.errors += 1
+                        cache.put(key, False, _fresh_error(e))
+                        del cache._ainflight[flight_key]
+                    pending.set_exception(e)
+                    pending.exception()  # Mark as retrieved when no one else is waiting
+                    raise
+                except BaseException:
+                    # Cancelled: don't cache the cancellation; waiters see a cancelled future and retry
+                    with cache._lock:
+                        del cache._ainflight[flight_key]
+                    pending.cancel()
+                    raise
+                with cache._lock:
+                    cache.put(key, True, result)
+                    del cache._ainflight[flight_key]
+                pending.set_result(result)
+                return result
+
+            async_wrapper.cache = cache
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            with cache._lock:
+                cached = cache.get(key)
+                if cached is not None:
+                    return _unwrap(*cached)
+                pending = cache._inflight.get(key)
+                if pending is None:
+                    pending = cache._inflight[key] = Future()
+                    cache.misses += 1
+                    leader = True
+                else:
+                    cache.coalesced += 1
+                    leader = False
+            if not leader:
+                # exception() waits like result() but does not raise the leader's instance
+                error = pending.exception()
+                return _unwrap(error is None, error if error is not None else pending.result())
+
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                with cache._lock:
+                    if isinstance(e, Exception):
+                        cache.errors += 1
+                        cache.put(key, False, _fresh_error(e))
+                    del cache._inflight[key]
+                pending.set_exception(e)
+                raise
+            with cache._lock:
+                cache.put(key, True, result)
+                del cache._inflight[key]
+            pending.set_result(result)
+            return result
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
@@ -2,10 +2,42 @@
 Weather tools for LangChain agents.
 """
 
+from typing import List
+
 from langchain.tools import tool
 
+from src.weather.service import get_weather_service
+
+# Locations accepted by one get_weather_batch call
+MAX_BATCH_LOCATIONS = 50
+
+
 @tool
 def get_current_weather(location: str) -> str:
     """Get the current weather in a given location."""
-    # This is a mock implementation - in a real app, you would use a weather API
-    return f"The weather in {location} is currently sunny and 72 degrees. (This is a mock response - implement real weather API as needed.)"
+    # Provider is set by WEATHER_PROVIDER (stub data by default); see src/weather/service.py.
+    # The service caches reports per location and ten-minute bucket, so no cached_tool here
+    try:
+        report = get_weather_service().get(location)
+    except LookupError:
+        return f"No weather data found for {location}."
+    return f"The weather in {location} is currently {report.describe()}."
+
+
+@tool
+def get_weather_batch(locations: List[str]) -> str:
+    """Get the current weather for several locations at once, e.g. ["Paris", "Berlin", "Rome"]."""
+    if not locations:
+        return "Error: no locations given."
+    if len(locations) > MAX_BATCH_LOCATIONS:
+        return f"Error: at most {MAX_BATCH_LOCATIONS} locations per call, got {len(locations)}."
+    # The service caches per location and time bucket, so this needs no cached_tool of its own
+    lines = []
+    for location, report in get_weather_service().get_many(locations):
+        if isinstance(report, LookupError):
+            lines.append(f"{location}: no weather data found")
+        elif isinstance(report, Exception):
+            lines.append(f"{location}: error - {report}")
+        else:
+            lines.append(f"{location}: {report.describe()}")
+    return "\n".join(lines)
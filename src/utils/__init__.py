@@ -0,0 +1,3 @@
+"""
+Shared helpers: latency and throughput metrics.
+"""
@@ -0,0 +1,70 @@
+"""
+Latency and throughput metrics for the batch runner, benchmarks and load tests.
+
+``LatencyRecorder`` collects durations from any number of threads or tasks and
+reports count, mean and percentiles; ``percentile`` interpolates linearly
+between the closest ranks, like ``numpy.percentile``'s default.
+"""
+
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+DEFAULT_PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """The ``q``-th percentile (0-100) of already sorted values; NaN for no values."""
+    if not sorted_values:
+        return math.nan
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def percentiles(values: Iterable[float], qs: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, float]:
+    """``{"p50": ..., "p95": ..., "p99": ...}`` for the given values."""
+    ordered = sorted(values)
+    return {f"p{q:g}": percentile(ordered, q) for q in qs}
+
+
+class LatencyRecorder:
+    """Thread-safe collection of durations (in seconds) with summary statistics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: List[float] = []
+        self.started = time.perf_counter()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._values.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def values(self) -> List[float]:
+        with self._lock:
+            return list(self._values)
+
+    def summary(self, qs: Sequence[float] = DEFAULT_PERCENTILES, elapsed: Optional[float] = None) -> Dict[str, float]:
+        """Count, throughput (per second of ``elapsed``, default since creation), mean and percentiles, in ms."""
+        values = self.values()
+        if elapsed is None:
+            elapsed = time.perf_counter() - self.started
+        summary = {
+            "count": len(values),
+            "throughput": len(values) / elapsed if elapsed > 0 else 0.0,
+            "mean_ms": sum(values) / len(values) * 1000 if values else math.nan,
+        }
+        summary.update({f"{name}_ms": value * 1000 for name, value in percentiles(values, qs).items()})
+        return summary
+
+
+def format_summary(summary: Dict[str, float]) -> str:
+    """One-line rendering of ``LatencyRecorder.summary()``."""
+    latencies = ", ".join(f"{name[:-3]} {value:.0f}ms" for name, value in summary.items()
+                          if name.startswith("p") and name.endswith("_ms"))
+    return f"{summary['count']} done, {summary['throughput']:.2f}/s, {latencies}"
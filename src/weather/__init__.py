@@ -0,0 +1,3 @@
+"""
+Weather data providers and the cached, concurrent lookup service used by the weather tools.
+"""
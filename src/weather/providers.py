@@ -0,0 +1,104 @@
+"""
+Pluggable sources of current weather for the weather tools.
+
+A provider is any object with a ``get(location) -> WeatherReport`` method that
+raises ``LookupError`` for unknown locations. Two are built in:
+
+- ``StubWeatherProvider``: deterministic made-up weather, the default, so the
+  agents work offline and repeated questions get consistent answers.
+- ``DatasetWeatherProvider``: conditions read from a local JSON file.
+
+``load_provider`` picks one from a spec string such as ``"stub"``,
+``"dataset:data/weather.json"`` or ``"mypackage.weather:ApiProvider"`` (any class
+that can be constructed without arguments).
+"""
+
+import importlib
+import json
+import time
+import zlib
+from typing import Any, Dict, NamedTuple, Optional
+
+from src.tools.tool_cache import normalize_argument
+
+CONDITIONS = ("sunny", "partly cloudy", "cloudy", "light rain", "rain", "thunderstorms", "fog", "windy", "snow")
+
+
+class WeatherReport(NamedTuple):
+    """Current conditions at one location."""
+
+    location: str
+    condition: str
+    temperature_c: float
+    humidity: Optional[int] = None
+    wind_kph: Optional[float] = None
+    source: str = ""
+
+    def describe(self) -> str:
+        parts = [f"{self.condition}, {self.temperature_c:.0f}°C ({self.temperature_c * 9 / 5 + 32:.0f}°F)"]
+        if self.humidity is not None:
+            parts.append(f"humidity {self.humidity}%")
+        if self.wind_kph is not None:
+            parts.append(f"wind {self.wind_kph:.0f} km/h")
+        text = ", ".join(parts)
+        return f"{text} ({self.source})" if self.source else text
+
+
+class StubWeatherProvider:
+    """Made-up weather derived from a hash of the location, stable within each ``period``."""
+
+    def __init__(self, period: float = 3600.0):
+        self.period = period
+
+    def get(self, location: str, now: Optional[float] = None) -> WeatherReport:
+        period = int((time.time() if now is None else now) // self.period)
+        seed = zlib.crc32(f"{normalize_argument(location)}|{period}".encode("utf-8"))
+        return WeatherReport(
+            location=location,
+            condition=CONDITIONS[seed % len(CONDITIONS)],
+            temperature_c=float((seed >> 8) % 40 - 5),
+            humidity=30 + (seed >> 16) % 60,
+            wind_kph=float((seed >> 24) % 40),
+            source="stub data",
+        )
+
+
+class DatasetWeatherProvider:
+    """Weather from a JSON file of ``{"location": {"condition", "temperature_c", ...}}``.
+
+    Locations match case-insensitively, and "Paris, France" falls back to "Paris".
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            data: Dict[str, Dict[str, Any]] = json.load(f)
+        self._records = {normalize_argument(name): record for name, record in data.items()}
+
+    def get(self, location: str) -> WeatherReport:
+        key = normalize_argument(location)
+        record = self._records.get(key) or self._records.get(key.split(",")[0].strip())
+        if record is None:
+            raise LookupError(f"No weather data for {location}")
+        return WeatherReport(
+            location=location,
+            condition=record["condition"],
+            temperature_c=float(record["temperature_c"]),
+            humidity=record.get("humidity"),
+            wind_kph=record.get("wind_kph"),
+            source=record.get("source", ""),
+        )
+
+
+def load_provider(spec: Optional[str] = None) -> Any:
+    """Create a provider from a spec string (see the module docstring); None means the stub."""
+    if not spec or spec == "stub":
+        return StubWeatherProvider()
+    if spec.startswith("dataset:"):
+        return DatasetWeatherProvider(spec[len("dataset:"):])
+    if spec.endswith(".json"):
+        return DatasetWeatherProvider(spec)
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown weather provider {spec!r}; use stub, dataset:<path> or module:Class")
+    return getattr(importlib.import_module(module_name), class_name)()
@@ -0,0 +1,100 @@
+"""
+Cached, concurrent weather lookups on top of a pluggable provider.
+
+Reports are cached per (location, time bucket): every lookup in the same
+``bucket_seconds`` window reuses one provider call, and the next window fetches
+fresh conditions. Failures are cached briefly so an unknown location or a
+failing backend is not retried on every call. ``get_many`` dedupes the
+locations of a batch and resolves the rest concurrently on a bounded thread
+pool, returning results in input order.
+
+The tools use a process-wide service configured from the environment:
+
+- ``WEATHER_PROVIDER``: provider spec for ``load_provider`` (default: stub)
+- ``WEATHER_WORKERS``: concurrent provider calls per batch (default: 8)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from src.tools.tool_cache import cached_tool, normalize_argument
+from src.weather.providers import WeatherReport, load_provider
+
+DEFAULT_BUCKET_SECONDS = 600
+DEFAULT_WORKERS = 8
+
+
+class WeatherService:
+    """Resolve locations to weather reports through a provider, with caching and batching."""
+
+    def __init__(self, provider: Any, bucket_seconds: float = DEFAULT_BUCKET_SECONDS,
+                 max_workers: int = DEFAULT_WORKERS, maxsize: int = 1024, error_ttl: float = 60.0):
+        self.provider = provider
+        self.bucket_seconds = bucket_seconds
+        self.max_workers = max_workers
+        # A bucket's entries are never looked up again once the window has passed
+        self._lookup = cached_tool(ttl=bucket_seconds, maxsize=maxsize, error_ttl=error_ttl)(self._fetch)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _fetch(self, location: str, bucket: int) -> WeatherReport:
+        return self.provider.get(location)
+
+    def _bucket(self) -> int:
+        return int(time.time() // self.bucket_seconds)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="weather")
+            return self._executor
+
+    def get(self, location: str) -> WeatherReport:
+        """Weather for one location; raises the provider's error (e.g. LookupError)."""
+        return self._lookup(location, self._bucket())
+
+    def get_many(self, locations: List[str]) -> List[Tuple[str, Union[WeatherReport, Exception]]]:
+        """Weather for each location, in input order, with the error in place of a failed report."""
+        bucket = self._bucket()
+        unique: Dict[Any, str] = {}
+        for location in locations:
+            unique.setdefault(normalize_argument(location), location)
+
+        def resolve(location: str) -> Union[WeatherReport, Exception]:
+            try:
+                return self._lookup(location, bucket)
+            except Exception as e:
+                return e
+
+        if len(unique) == 1:
+            results = [resolve(location) for location in unique.values()]
+        else:
+            results = list(self._pool().map(resolve, unique.values()))
+        resolved = dict(zip(unique, results))
+        return [(location, resolved[normalize_argument(location)]) for location in locations]
+
+    def stats(self) -> Dict[str, Any]:
+        return self._lookup.cache.stats()
+
+    def close(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+_service: Optional[WeatherService] = None
+_service_lock = threading.Lock()
+
+
+def get_weather_service() -> WeatherService:
+    """The process-wide service, created from the environment on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = WeatherService(load_provider(os.getenv("WEATHER_PROVIDER")),
+                                      max_workers=int(os.getenv("WEATHER_WORKERS", DEFAULT_WORKERS)))
+        return _service